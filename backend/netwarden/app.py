@@ -7,11 +7,25 @@ from typing import cast
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from netwarden.connections.pool import session_pool
+from netwarden.connections.restconf.transport import restconf_transport
+from netwarden.connections.ssh.parsing import parser_pool
 from netwarden.constants import LOGGING_DICT
-from netwarden.inventory.inventory import Inventory
-from netwarden.netbox import NetBox
+from netwarden.inventory.inventory import DEFAULT_CONNECTION_IDLE_TIMEOUT, Inventory
+from netwarden.inventory.sync import NetBoxSync
+from netwarden.models.layout import DEFAULT_NODE_SPACING
+from netwarden.models.topology import Topology
+from netwarden.netbox import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SESSION_KEY_TTL,
+    NetBox,
+)
+from netwarden.poller import Poller
 from netwarden.routers.devices import router as devices_router
+from netwarden.routers.system import router as system_router
 from netwarden.settings import settings
+from netwarden.state import StateStore
 
 logging.config.dictConfig(LOGGING_DICT)
 logger = logging.getLogger(__name__)
@@ -32,6 +46,7 @@ app.add_middleware(
 )
 
 app.include_router(devices_router, prefix="/api")
+app.include_router(system_router, prefix="/api")
 
 
 def make_netbox() -> NetBox:
@@ -47,6 +62,12 @@ def make_netbox() -> NetBox:
         url=settings["netbox.host"],
         token=settings["netbox.token"],
         private_key=netbox_private_key,
+        page_size=settings.get("netbox.page_size", DEFAULT_PAGE_SIZE),
+        max_concurrent_requests=settings.get(
+            "netbox.max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS
+        ),
+        session_key_file=settings.get("netbox.session_key_file"),
+        session_key_ttl=settings.get("netbox.session_key_ttl", DEFAULT_SESSION_KEY_TTL),
     )
     return netbox
 
@@ -55,14 +76,53 @@ def make_netbox() -> NetBox:
 async def startup_event():
     netbox = cast(NetBox, make_netbox())
     app.state.netbox = netbox
-    app.state.inventory = await Inventory.fetch_from_netbox(netbox)
-    # app.state.connections = {}  # device_name -> {"restconf": <RESTCONF obj for device>}  # noqa
+    inventory = Inventory(
+        connection_idle_timeout=settings.get(
+            "inventory.connection_idle_timeout", DEFAULT_CONNECTION_IDLE_TIMEOUT
+        )
+    )
+    netbox_sync = NetBoxSync.from_settings(netbox=netbox, inventory=inventory)
+    periodic_sync = settings.get("netbox_sync.enabled", False)
+    if netbox_sync.restore():
+        # serve the snapshot right away, NetBox is checked in the background
+        netbox_sync.start(sync_now=True, periodic=periodic_sync)
+    else:
+        await netbox_sync.sync()
+        logger.info("%d devices imported from netbox", len(inventory))
+        if periodic_sync:
+            netbox_sync.start()
+    app.state.inventory = inventory
+    app.state.netbox_sync = netbox_sync
+    inventory.start()
+    topology = Topology(
+        get_site=inventory.get_site,
+        node_spacing=settings.get("topology.node_spacing", DEFAULT_NODE_SPACING),
+    )
+    app.state.topology = topology
+    netbox_sync.add_listener(topology.on_sync)
+    app.state.session_pool = session_pool
+    session_pool.start()
+    if settings.get("session_pool.warm_up", False):
+        asyncio.create_task(session_pool.warm_up(inventory.session_connections))
+    if settings.get("poller.enabled", False):
+        state_store = StateStore()
+        state_store.add_listener(topology.on_state_change)
+        poller = Poller.from_settings(inventory=inventory, store=state_store)
+        poller.start()
+        app.state.state_store = state_store
+        app.state.poller = poller
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    tasks = []
-    for device, connections in app.state.connections.items():
-        for device_conn in connections.values():
-            tasks.append(asyncio.create_task(device_conn.close()))
-    await asyncio.gather(*tasks)
+    poller = getattr(app.state, "poller", None)
+    if poller is not None:
+        await poller.stop()
+    netbox_sync = getattr(app.state, "netbox_sync", None)
+    if netbox_sync is not None:
+        await netbox_sync.stop()
+    await session_pool.close()
+    inventory = cast(Inventory, app.state.inventory)
+    await inventory.close()
+    await restconf_transport.close()
+    parser_pool.close()
@@ -0,0 +1,271 @@
+import asyncio
+import enum
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+from urllib.parse import quote
+
+from netwarden.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    ZSTD_AVAILABLE = False
+else:
+    ZSTD_AVAILABLE = True
+
+DEFAULT_ARCHIVE_PATH = ".config_archive"
+DEFAULT_COMPRESSION_LEVEL = 9
+ZSTD_SUFFIX = ".zst"
+GZIP_SUFFIX = ".gz"
+# lines which change without a configuration change
+VOLATILE_LINES_RE = re.compile(
+    r"^(?:Building configuration.*"
+    r"|Current configuration :.*"
+    r"|! Last configuration change at .*"
+    r"|! NVRAM config last updated at .*"
+    r"|! No configuration change since last restart"
+    r"|ntp clock-period .*)\n",
+    flags=re.M,
+)
+
+
+class ConfigFormat(str, enum.Enum):
+    TEXT = "text"
+    JSON = "json"
+
+
+class ArchiveEntry(NamedTuple):
+    digest: str  # sha256 of the normalized configuration
+    transport: str
+    format: str
+    size: int  # bytes of the normalized configuration
+    archived_at: float  # UNIX timestamp
+
+
+class ConfigSnapshot(NamedTuple):
+    entry: ArchiveEntry
+    cfg: Union[str, Dict[str, Any]]
+
+    def dump(self) -> Dict[str, Any]:
+        return {**self.entry._asdict(), "cfg": self.cfg}
+
+
+def normalize_config(cfg: Union[str, Dict[str, Any]]) -> str:
+    """Returns configuration text without volatile lines and trailing spaces
+
+    Structured configurations (RESTCONF) are serialized with sorted keys, so
+    the same configuration always has the same digest.
+    """
+    if not isinstance(cfg, str):
+        return json.dumps(cfg, sort_keys=True, indent=1, ensure_ascii=False)
+    text = cfg.replace("\r\n", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n")).strip() + "\n"
+    return VOLATILE_LINES_RE.sub("", text)
+
+
+class ConfigArchive:
+    """Content-addressed store of device configurations
+
+    Every normalized configuration is compressed (zstd if the zstandard
+    package is installed, gzip otherwise) and stored once under its sha256
+    digest in objects/, so configurations which did not change between polls
+    or are identical on several devices take no extra space. history/ keeps a
+    JSON line per device and configuration change. Files are written
+    atomically and are only readable by the owner, as configurations contain
+    secrets.
+
+    Methods doing file I/O are blocking, the async save and get_latest run
+    them in the default executor.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        use_zstd: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self.compression_level = compression_level
+        self.use_zstd = use_zstd and ZSTD_AVAILABLE
+        self._histories: Dict[str, List[ArchiveEntry]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> Optional["ConfigArchive"]:
+        if not settings.get("config_archive.enabled", False):
+            return None
+        return cls(
+            path=settings.get("config_archive.path", DEFAULT_ARCHIVE_PATH),
+            compression_level=settings.get(
+                "config_archive.compression_level", DEFAULT_COMPRESSION_LEVEL
+            ),
+        )
+
+    def archive(
+        self, device_name: str, cfg: Union[str, Dict[str, Any]], transport: str
+    ) -> ArchiveEntry:
+        """Stores the configuration unless it is the latest one of the device
+
+        Returns:
+            history entry of the configuration
+        """
+        text = normalize_config(cfg)
+        data = text.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            history = self._get_history(device_name)
+            if history and history[-1].digest == digest:
+                return history[-1]
+            if self._find_object(digest) is None:
+                self._write_object(digest, data)
+            entry = ArchiveEntry(
+                digest=digest,
+                transport=transport,
+                format=(
+                    ConfigFormat.TEXT if isinstance(cfg, str) else ConfigFormat.JSON
+                ).value,
+                size=len(data),
+                archived_at=time.time(),
+            )
+            self._append_history(device_name, entry)
+            history.append(entry)
+        logger.info("Device %r, configuration %s archived", device_name, digest[:12])
+        return entry
+
+    def history(self, device_name: str) -> List[ArchiveEntry]:
+        """Returns configuration changes of the device, the oldest first"""
+        with self._lock:
+            return list(self._get_history(device_name))
+
+    def latest(self, device_name: str) -> Optional[ConfigSnapshot]:
+        with self._lock:
+            history = self._get_history(device_name)
+            entry = history[-1] if history else None
+        if entry is None:
+            return None
+        return ConfigSnapshot(entry=entry, cfg=self.read(entry))
+
+    def get(self, device_name: str, digest: str) -> Optional[ConfigSnapshot]:
+        """Returns archived configuration of the device by its digest or prefix"""
+        entries = [
+            entry
+            for entry in self.history(device_name)
+            if entry.digest.startswith(digest)
+        ]
+        if not entries:
+            return None
+        return ConfigSnapshot(entry=entries[-1], cfg=self.read(entries[-1]))
+
+    def read(self, entry: ArchiveEntry) -> Union[str, Dict[str, Any]]:
+        """Raises FileNotFoundError if the object is missing"""
+        path = self._find_object(entry.digest)
+        if path is None:
+            raise FileNotFoundError(f"Configuration {entry.digest} is not archived")
+        compressed = path.read_bytes()
+        if path.suffix == ZSTD_SUFFIX:
+            data = zstandard.ZstdDecompressor().decompress(compressed)
+        else:
+            data = gzip.decompress(compressed)
+        text = data.decode()
+        if entry.format == ConfigFormat.JSON:
+            return json.loads(text)
+        return text
+
+    async def save(
+        self, device_name: str, cfg: Union[str, Dict[str, Any]], transport: str
+    ) -> Optional[ArchiveEntry]:
+        """Archives in the executor, failures are logged and not raised"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                None, self.archive, device_name, cfg, transport
+            )
+        except OSError:
+            logger.error(
+                "Device %r, configuration was not archived", device_name, exc_info=True
+            )
+            return None
+
+    async def get_latest(self, device_name: str) -> Optional[ConfigSnapshot]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.latest, device_name)
+
+    def _object_path(self, digest: str, suffix: str) -> Path:
+        return self.path / "objects" / digest[:2] / (digest[2:] + suffix)
+
+    def _history_path(self, device_name: str) -> Path:
+        return self.path / "history" / (quote(device_name, safe="") + ".jsonl")
+
+    def _find_object(self, digest: str) -> Optional[Path]:
+        suffixes = (ZSTD_SUFFIX, GZIP_SUFFIX) if ZSTD_AVAILABLE else (GZIP_SUFFIX,)
+        for suffix in suffixes:
+            path = self._object_path(digest, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def _write_object(self, digest: str, data: bytes) -> None:
+        if self.use_zstd:
+            suffix = ZSTD_SUFFIX
+            compressed = zstandard.ZstdCompressor(
+                level=self.compression_level
+            ).compress(data)
+        else:
+            suffix = GZIP_SUFFIX
+            compressed = gzip.compress(
+                data, compresslevel=self.compression_level, mtime=0
+            )
+        path = self._object_path(digest, suffix)
+        _makedirs(path.parent)
+        tmp_path = path.with_name(path.name + ".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+    def _get_history(self, device_name: str) -> List[ArchiveEntry]:
+        history = self._histories.get(device_name)
+        if history is None:
+            history = self._load_history(device_name)
+            self._histories[device_name] = history
+        return history
+
+    def _load_history(self, device_name: str) -> List[ArchiveEntry]:
+        history = []
+        try:
+            with open(self._history_path(device_name)) as f:
+                for line in f:
+                    try:
+                        history.append(ArchiveEntry(**json.loads(line)))
+                    except (TypeError, ValueError):
+                        # the last line may be cut off by a crash
+                        logger.warning(
+                            "Device %r, skipping corrupted history line", device_name
+                        )
+        except FileNotFoundError:
+            pass
+        return history
+
+    def _append_history(self, device_name: str, entry: ArchiveEntry) -> None:
+        path = self._history_path(device_name)
+        _makedirs(path.parent)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        with os.fdopen(fd, "a") as f:
+            f.write(json.dumps(entry._asdict()) + "\n")
+
+
+def _makedirs(path: Path) -> None:
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+
+config_archive = ConfigArchive.from_settings()
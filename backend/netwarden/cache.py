@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from netwarden.config import settings
+from netwarden.utils import make_request_key
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_STALE = 600.0
+DEFAULT_TTLS = {
+    "version_sn": 3600.0,
+    "lldp": 60.0,
+    "cfg": 300.0,
+}
+
+
+class CacheEntry:
+    def __init__(self, value: Any, fetched_at: float) -> None:
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__qualname__}("
+            f"value={self.value!r}, "
+            f"fetched_at={self.fetched_at!r})"
+        )
+
+
+class ResultCache:
+    """TTL cache for the results of Device.get_data
+
+    Every key (e.g. "version_sn" or "lldp") has its own TTL. Fresh entries are
+    returned as is. Expired entries which are younger than TTL + max_stale are
+    returned immediately and a single background refresh is scheduled for them.
+    Older entries are fetched synchronously.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        default_ttl: float = DEFAULT_TTL,
+        max_stale: float = DEFAULT_MAX_STALE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttls: Dict[str, float] = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.clock = clock
+        self._entries: Dict[Hashable, CacheEntry] = {}
+        self._refresh_tasks: Dict[Hashable, "asyncio.Task[None]"] = {}
+
+    @classmethod
+    def from_settings(cls) -> "ResultCache":
+        ttls = {**DEFAULT_TTLS, **settings.get("cache.ttl", {})}
+        return cls(
+            ttls=ttls,
+            default_ttl=settings.get("cache.default_ttl", DEFAULT_TTL),
+            max_stale=settings.get("cache.max_stale", DEFAULT_MAX_STALE),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttls.get(key, self.default_ttl)
+
+    @staticmethod
+    def make_key(key: str, kwargs: Mapping[str, Any]) -> Tuple[Any, ...]:
+        return make_request_key(key, kwargs)
+
+    def get(self, key: str, **kwargs: Any) -> Optional[CacheEntry]:
+        return self._entries.get(self.make_key(key, kwargs))
+
+    def get_fresh(self, key: str, **kwargs: Any) -> Optional[CacheEntry]:
+        """Returns the entry for the key if it is younger than its TTL"""
+        entry = self.get(key, **kwargs)
+        if entry is None or self.clock() - entry.fetched_at >= self.ttl_for(key):
+            return None
+        return entry
+
+    def set(self, key: str, value: Any, **kwargs: Any) -> None:
+        self._entries[self.make_key(key, kwargs)] = CacheEntry(value, self.clock())
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Removes all cached entries for the key or the whole cache"""
+        if key is None:
+            self._entries.clear()
+            return
+        for cache_key in [k for k in self._entries if k[0] == key]:
+            del self._entries[cache_key]
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        force_refresh: bool = False,
+        **kwargs: Any,
+    ) -> T:
+        """Returns cached result for the key or fetches a new one
+
+        Args:
+            key: type of requested information, e.g. "version_sn"
+            fetch: coroutine function retrieving the data from the device
+            force_refresh: bypass the cache and always fetch the data. Default: False
+            **kwargs: arguments of the request, they are part of the cache key
+
+        Returns:
+            fresh or stale result
+        """
+        cache_key = self.make_key(key, kwargs)
+        entry = self._entries.get(cache_key)
+        if entry is not None and not force_refresh:
+            age = self.clock() - entry.fetched_at
+            ttl = self.ttl_for(key)
+            if age < ttl:
+                return entry.value
+            if age < ttl + self.max_stale:
+                self._schedule_refresh(cache_key, fetch)
+                return entry.value
+
+        value = await fetch()
+        self._entries[cache_key] = CacheEntry(value, self.clock())
+        return value
+
+    def _schedule_refresh(
+        self, cache_key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> None:
+        if cache_key in self._refresh_tasks:
+            return
+        task = asyncio.create_task(self._refresh(cache_key, fetch))
+        self._refresh_tasks[cache_key] = task
+
+    async def _refresh(
+        self, cache_key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> None:
+        try:
+            value = await fetch()
+        except Exception:
+            logger.warning(
+                "Background refresh of %r failed, keeping stale data",
+                cache_key,
+                exc_info=True,
+            )
+        else:
+            self._entries[cache_key] = CacheEntry(value, self.clock())
+        finally:
+            del self._refresh_tasks[cache_key]
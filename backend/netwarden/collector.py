@@ -0,0 +1,296 @@
+import asyncio
+import enum
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from netwarden.config import settings
+from netwarden.inventory.device import Device
+from netwarden.state import StateStore
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStatus(str, enum.Enum):
+    OK = "ok"
+    ERROR = "error"
+    TIMEOUT = "timeout"
+
+
+def get_status(error: Optional[BaseException]) -> ResultStatus:
+    if error is None:
+        return ResultStatus.OK
+    if isinstance(error, asyncio.TimeoutError):
+        return ResultStatus.TIMEOUT
+    return ResultStatus.ERROR
+
+
+def format_error(error: BaseException) -> str:
+    return str(error) or repr(error)
+
+
+class DeviceResult(NamedTuple):
+    device: Device
+    data: Any
+    error: Optional[BaseException]
+    elapsed: float
+    # UNIX timestamp when the data was retrieved from the device
+    updated_at: Optional[float] = None
+
+    @property
+    def status(self) -> ResultStatus:
+        return get_status(self.error)
+
+    @property
+    def is_ok(self) -> bool:
+        return self.error is None
+
+    def dump_error(self) -> Dict[str, Any]:
+        return {
+            "name": self.device.name,
+            "status": self.status.value,
+            "error": format_error(self.error),
+            "elapsed": self.elapsed,
+        }
+
+
+class DeviceBatchResult(NamedTuple):
+    """Results of several keys of one device"""
+
+    device: Device
+    data: Dict[str, Any]
+    errors: Dict[str, BaseException]
+    elapsed: float
+    # key -> UNIX timestamp when the data was retrieved from the device
+    updated_at: Dict[str, float] = {}
+
+    def dump_errors(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": self.device.name,
+                "key": key,
+                "status": get_status(error).value,
+                "error": format_error(error),
+                "elapsed": self.elapsed,
+            }
+            for key, error in self.errors.items()
+        ]
+
+
+def get_default_deadline() -> Optional[float]:
+    return settings.get("collector.deadline")
+
+
+async def fetch_device_data(
+    device: Device,
+    key: str,
+    force_refresh: bool = False,
+    store: Optional[StateStore] = None,
+    **kwargs: Dict[str, Any],
+) -> DeviceResult:
+    """Retrieves data from the device, capturing the error and the elapsed time
+
+    If the state store is provided and has fresh data of the device for the
+    key, it is returned without querying the device, unless force_refresh is set.
+    """
+    start = time.monotonic()
+    if store is not None and not force_refresh and not kwargs:
+        entry = store.get_fresh(device.name, key)
+        if entry is not None:
+            return DeviceResult(
+                device, entry.value, None, time.monotonic() - start, entry.updated_at
+            )
+    try:
+        data = await device.get_data(key, force_refresh=force_refresh, **kwargs)
+    except Exception as e:
+        logger.error(
+            "Device %r, failed to retrieve %r", device.name, key, exc_info=True
+        )
+        return DeviceResult(device, None, e, time.monotonic() - start)
+    return DeviceResult(device, data, None, time.monotonic() - start, time.time())
+
+
+async def iter_device_data(
+    devices: Iterable[Device],
+    key: str,
+    deadline: Optional[float] = None,
+    force_refresh: bool = False,
+    store: Optional[StateStore] = None,
+    **kwargs: Dict[str, Any],
+) -> AsyncIterator[DeviceResult]:
+    """Retrieves data from all devices concurrently
+
+    Results are yielded in the order of completion, so the fastest devices come
+    first. Remaining requests are cancelled if the consumer stops iterating.
+
+    Args:
+        devices: devices to query
+        key: type of requested information as described in handlers.py
+        deadline: seconds after which unfinished devices are reported as timed
+          out. Default: None, wait for all devices
+        force_refresh: bypass the cache and the state store. Default: False
+        store: state store kept warm by the poller. Default: None
+        **kwargs: keyword arguments passed to Device.get_data
+
+    Yields:
+        DeviceResult for every device
+    """
+    start = time.monotonic()
+    task_to_device = {
+        asyncio.create_task(
+            fetch_device_data(
+                device, key, force_refresh=force_refresh, store=store, **kwargs
+            )
+        ): device
+        for device in devices
+    }
+    pending = set(task_to_device)
+    try:
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, start + deadline - time.monotonic())
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                yield task.result()
+
+        for task in pending:
+            task.cancel()
+            device = task_to_device[task]
+            logger.warning(
+                "Device %r, %r was not retrieved within %ss", device.name, key, deadline
+            )
+            error = asyncio.TimeoutError(f"Deadline of {deadline}s exceeded")
+            yield DeviceResult(device, None, error, time.monotonic() - start)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def collect_device_data(
+    devices: Iterable[Device],
+    key: str,
+    deadline: Optional[float] = None,
+    force_refresh: bool = False,
+    store: Optional[StateStore] = None,
+    **kwargs: Dict[str, Any],
+) -> List[DeviceResult]:
+    """Retrieves data from all devices concurrently within the deadline
+
+    Returns:
+        DeviceResult for every device, in the order of the input devices
+    """
+    devices = list(devices)
+    name_to_result = {
+        result.device.name: result
+        async for result in iter_device_data(
+            devices,
+            key,
+            deadline=deadline,
+            force_refresh=force_refresh,
+            store=store,
+            **kwargs,
+        )
+    }
+    return [name_to_result[device.name] for device in devices]
+
+
+async def fetch_device_batch(
+    device: Device,
+    keys: Sequence[str],
+    force_refresh: bool = False,
+    store: Optional[StateStore] = None,
+) -> DeviceBatchResult:
+    """Retrieves several keys from the device, capturing errors per key
+
+    Fresh keys present in the state store are taken from it unless
+    force_refresh is set, the rest is requested with Device.get_data_batch.
+    """
+    start = time.monotonic()
+    data: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    updated_at: Dict[str, float] = {}
+    missing = []
+    for key in keys:
+        entry = None
+        if store is not None and not force_refresh:
+            entry = store.get_fresh(device.name, key)
+        if entry is None:
+            missing.append(key)
+        else:
+            data[key] = entry.value
+            updated_at[key] = entry.updated_at
+    if missing:
+        try:
+            results = await device.get_data_batch(missing, force_refresh=force_refresh)
+        except Exception as e:
+            results = {key: e for key in missing}
+        for key, result in results.items():
+            if isinstance(result, Exception):
+                logger.error(
+                    "Device %r, failed to retrieve %r: %r", device.name, key, result
+                )
+                errors[key] = result
+            else:
+                data[key] = result
+                updated_at[key] = time.time()
+    return DeviceBatchResult(device, data, errors, time.monotonic() - start, updated_at)
+
+
+async def collect_device_batches(
+    devices: Iterable[Device],
+    keys: Sequence[str],
+    deadline: Optional[float] = None,
+    force_refresh: bool = False,
+    store: Optional[StateStore] = None,
+) -> List[DeviceBatchResult]:
+    """Retrieves several keys from all devices concurrently within the deadline
+
+    Every device is queried once for all the keys, see Device.get_data_batch.
+    Keys of the devices which did not finish within the deadline are reported
+    as timed out.
+
+    Returns:
+        DeviceBatchResult for every device, in the order of the input devices
+    """
+    start = time.monotonic()
+    devices = list(devices)
+    tasks = [
+        asyncio.create_task(
+            fetch_device_batch(device, keys, force_refresh=force_refresh, store=store)
+        )
+        for device in devices
+    ]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    results = []
+    for device, task in zip(devices, tasks):
+        if task in done:
+            results.append(task.result())
+            continue
+        logger.warning(
+            "Device %r, %r were not retrieved within %ss", device.name, keys, deadline
+        )
+        error = asyncio.TimeoutError(f"Deadline of {deadline}s exceeded")
+        results.append(
+            DeviceBatchResult(
+                device, {}, {key: error for key in keys}, time.monotonic() - start
+            )
+        )
+    return results
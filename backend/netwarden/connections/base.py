@@ -1,27 +1,70 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, TypeVar, Callable, Any, Dict, Optional
-
-from netwarden.connections.handlers import HANDLERS
-from netwarden.utils import merge_dicts, no_op
+from typing import (
+    TYPE_CHECKING,
+    TypeVar,
+    Callable,
+    Any,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Type,
+)
+
+from netwarden.connections.registry import HandlerSet, registry
+from netwarden.singleflight import SingleFlight
+from netwarden.utils import make_request_key
 
 if TYPE_CHECKING:
     from fastapi import Request
 
 DEFAULT_PRIORITY = 500
 MIN_PRIORITY = 0
-DEFAULT_PRIORITY_DECREMENT = 250
-DEFAULT_COLLECT_FUNC = merge_dicts
+DEFAULT_MAX_CONCURRENT_HANDLERS = 4
 
 
 class ConnectionError(Exception):
     pass
 
 
+class ConnectionSpec(NamedTuple):
+    """Connection of a device which is created when it is used for the first time
+
+    It is enough for the transport selector, which only needs the name and
+    the priority.
+    """
+
+    cls: Type["Connection"]
+    name: str
+    priority: int
+    port: Optional[int] = None
+
+    def create(
+        self, host: str, username: str, password: str, platform: str
+    ) -> "Connection":
+        return self.cls(
+            name=self.name,
+            host=host,
+            username=username,
+            password=password,
+            platform=platform,
+            port=self.port,
+            priority=self.priority,
+        )
+
+
 T = TypeVar("T", bound="Connection")
 
 
 class Connection(ABC):
     NAME = ""
+    PRIORITY = DEFAULT_PRIORITY
+    # sessions are kept open by the session pool, see SessionPool
+    SESSION_BASED = False
+    max_concurrent_handlers = DEFAULT_MAX_CONCURRENT_HANDLERS
 
     def __init__(
         self,
@@ -43,6 +86,14 @@ class Connection(ABC):
         self.platform = platform
 
         self._enabled: Optional[bool] = None
+        self._inflight = SingleFlight()
+
+        # session state, maintained by SessionPool for session-based transports
+        self.is_open = False
+        self.last_used = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
 
     @abstractmethod
     async def open() -> None:
@@ -63,6 +114,27 @@ class Connection(ABC):
         except Exception:
             pass
 
+    @property
+    def in_use(self) -> bool:
+        """True if the connection has an open session or a request in progress"""
+        return (
+            self.is_open
+            or bool(self._inflight)
+            or (self._lock is not None and self._lock.locked())
+        )
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Lock serializing requests sent over the session"""
+        # connections are created from synchronous code, e.g. Device.get_connection
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def is_alive(self) -> bool:
+        """Checks if the open session is still usable"""
+        return self.is_open
+
     async def is_enabled(self, force_check: bool = False) -> bool:
         """Checks if the connection is established
 
@@ -76,8 +148,10 @@ class Connection(ABC):
         """
         # if connection was already tried to establish and we keep the result
         # and we don't need to force re-establishing connection
+        # failed connection is checked again once its backoff (if any) expires
         if self._enabled is not None and not force_check:
-            return self._enabled
+            if self._enabled or not self.retry_at or time.monotonic() < self.retry_at:
+                return self._enabled
         await self.update_availability()
 
         if self._enabled is None:
@@ -90,7 +164,7 @@ class Connection(ABC):
     async def update_availability(self) -> None:
         pass
 
-    def get_handlers(self, key: str) -> Dict[str, Any]:
+    def get_handlers(self, key: str) -> HandlerSet:
         """Retrieves handlers for specific request, platform and connection type.
 
         Args:
@@ -98,10 +172,9 @@ class Connection(ABC):
               "version_sn"
 
         Returns:
-            dictionary with the handlers for the request, platform and connection type
+            handlers for the request, platform and connection type
         """
-        result = HANDLERS[key][self.platform][self.NAME]
-        return result
+        return registry.get(key, self.platform, self.NAME)
 
     @abstractmethod
     async def handle(self) -> Any:
@@ -112,27 +185,72 @@ class Connection(ABC):
         """Raises ConnectionError if the connection can't be established"""
         is_enabled = await self.is_enabled()
         if not is_enabled:
-            self.decrease_priority()
             raise ConnectionError(
-                f"{self.NAME} connection to {self.host} couldn't be "
-                f"established, new connection priority: {self.priority}"
+                f"{self.NAME} connection to {self.host} couldn't be established"
             )
 
     async def parse(self, key: str, **kwargs: Dict[str, Any]) -> Any:
+        """Retrieves and parses data for the key over this connection
+
+        Concurrent calls with the same key and arguments share one request to
+        the device.
+        """
+        self.last_used = time.monotonic()
+        try:
+            return await self._inflight.do(
+                make_request_key(key, kwargs), lambda: self._parse(key, **kwargs)
+            )
+        finally:
+            self.last_used = time.monotonic()
+
+    async def _parse(self, key: str, **kwargs: Dict[str, Any]) -> Any:
         handlers = self.get_handlers(key)
 
-        results = []
-        for handler_info in handlers["handlers"]:
-            if "handler" not in handler_info:
-                # if handler function is not specified, use no_op function which
-                # simply returns the input value
-                handler_info["handler"] = no_op
-            partial_result = await self.handle(**handler_info, **kwargs)
-            results.append(partial_result)
-        collect_func = handlers.get("collect_fn", DEFAULT_COLLECT_FUNC)
-        result = collect_func(*results)
+        handler_infos = handlers.handler_infos
+        if handlers.concurrent and len(handler_infos) > 1:
+            results = await self.handle_concurrently(handler_infos, **kwargs)
+        else:
+            results = []
+            for handler_info in handler_infos:
+                partial_result = await self.handle(**handler_info, **kwargs)
+                results.append(partial_result)
+        result = handlers.collect_fn(*results)
         return result
 
+    async def parse_many(
+        self, keys: Sequence[str], **kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Retrieves and parses several keys over this connection
+
+        Keys are parsed concurrently, transports which can send several requests
+        as one batch override this method.
+
+        Returns:
+            results by key, a failed key has the exception as its result
+        """
+        results = await asyncio.gather(
+            *(self.parse(key, **kwargs) for key in keys), return_exceptions=True
+        )
+        return dict(zip(keys, results))
+
+    async def handle_concurrently(
+        self, handler_infos: Sequence[Dict[str, Any]], **kwargs: Dict[str, Any]
+    ) -> List[Any]:
+        """Runs independent handlers concurrently
+
+        At most max_concurrent_handlers requests are sent at the same time.
+
+        Returns:
+            results of the handlers in the same order as handler_infos
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_handlers)
+
+        async def handle(handler_info: Dict[str, Any]) -> Any:
+            async with semaphore:
+                return await self.handle(**handler_info, **kwargs)
+
+        return list(await asyncio.gather(*map(handle, handler_infos)))
+
     # @abstractmethod
     # async def parse(self, key: str, **kwargs: Dict[str, Any]) -> Any:
     #     handler_info = HANDLERS[key][self.platform]
@@ -152,9 +270,6 @@ class Connection(ABC):
     #     result = handler(data, **kwargs)
     #     return result
 
-    def decrease_priority(self, decrement: int = DEFAULT_PRIORITY_DECREMENT) -> None:
-        self.priority -= decrement
-
 
 def get_connection(request: "Request", device_name: str, connection_name: str) -> Any:
     connection = request.app.state.connections.get(device_name, {}).get(connection_name)
@@ -1,22 +1,25 @@
-from netwarden.connections.restconf.openconfig import (
-    parse_openconfig_lldp as restconf_parse_oc_lldp,
-)
+from typing import TYPE_CHECKING, Any, Dict
 
-from netwarden.connections.restconf.platforms.cisco_iosxe import (
-    parse_device_hw_data as restconf_iosxe_parse_device_hw_data,
-)
 from netwarden.connections.ssh.constants import SSHParseMethod
-from netwarden.connections.ssh.platforms.cisco_iosxe import (
-    parse_show_version_genie as ssh_iosxe_parse_show_version_genie,
-    parse_show_run as ssh_iosxe_parse_show_run,
-    parse_show_lldp_neighbors_detail_textfsm as ssh_iosxe_parse_show_lldp_neighbors,
-)
 
+if TYPE_CHECKING:
+    from netwarden.connections.registry import HandlerRegistry
+
+# handlers are referenced by their import paths, so parsers of a platform and
+# their dependencies are imported only when the platform is queried
+RESTCONF_IOSXE = "netwarden.connections.restconf.platforms.cisco_iosxe"
+RESTCONF_OPENCONFIG = "netwarden.connections.restconf.openconfig"
+SSH_IOSXE = "netwarden.connections.ssh.platforms.cisco_iosxe"
 
 # from netwarden import utils
 
+# built-in platforms, other platforms are added by plugins, see registry.py
+PLATFORMS: Dict[str, Dict[str, Any]] = {
+    "cisco_iosxe": {"ssh_driver": "scrapli.driver.core:AsyncIOSXEDriver"},
+}
 
-HANDLERS = {
+# key -> platform -> transport -> arguments of HandlerRegistry.register
+HANDLERS: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {
     "version_sn": {
         "cisco_iosxe": {
             "restconf": {
@@ -24,7 +27,7 @@ HANDLERS = {
                 "handlers": [
                     {
                         "endpoint": "/data/device-hardware-data",
-                        "handler": restconf_iosxe_parse_device_hw_data,
+                        "handler": f"{RESTCONF_IOSXE}:parse_device_hw_data",
                     }
                 ]
             },
@@ -32,7 +35,7 @@ HANDLERS = {
                 "handlers": [
                     {
                         "command": "show version",
-                        "handler": ssh_iosxe_parse_show_version_genie,
+                        "handler": f"{SSH_IOSXE}:parse_show_version_genie",
                         "parse_method": SSHParseMethod.GENIE,
                     }
                 ],
@@ -45,12 +48,14 @@ HANDLERS = {
                 "handlers": [
                     {
                         "command": "show run",
-                        "handler": ssh_iosxe_parse_show_run,
+                        "handler": f"{SSH_IOSXE}:parse_show_run",
                         "parse_method": SSHParseMethod.NULL,
                     }
                 ],
             },
             "restconf": {
+                # endpoints are independent, so they are requested concurrently
+                "concurrent": True,
                 "handlers": [
                     {
                         "endpoint": "/data/native",
@@ -78,7 +83,7 @@ HANDLERS = {
                 "handlers": [
                     {
                         "endpoint": "/data/lldp/interfaces/interface",
-                        "handler": restconf_parse_oc_lldp,
+                        "handler": f"{RESTCONF_OPENCONFIG}:parse_openconfig_lldp",
                     }
                 ]
             },
@@ -86,7 +91,7 @@ HANDLERS = {
                 "handlers": [
                     {
                         "command": "show lldp neighbors detail",
-                        "handler": ssh_iosxe_parse_show_lldp_neighbors,
+                        "handler": f"{SSH_IOSXE}:parse_show_lldp_neighbors_detail_textfsm",
                         "parse_method": SSHParseMethod.TEXTFSM,
                     }
                 ],
@@ -94,3 +99,13 @@ HANDLERS = {
         }
     },
 }
+
+
+def register(registry: "HandlerRegistry") -> None:
+    """Registers built-in platforms and handlers"""
+    for platform, platform_info in PLATFORMS.items():
+        registry.register_platform(platform, **platform_info)
+    for key, platforms in HANDLERS.items():
+        for platform, transports in platforms.items():
+            for transport, transport_handlers in transports.items():
+                registry.register(key, platform, transport, **transport_handlers)
@@ -1,8 +1,12 @@
 import logging
-from typing import Callable, Any, Dict
-from scrapli_netconf.driver import AsyncNetconfDriver
+from typing import Callable, Any, Dict, Optional, TYPE_CHECKING
 
 from netwarden.connections.base import Connection, ConnectionError
+from netwarden.connections.pool import session_pool
+from netwarden.utils import import_string
+
+if TYPE_CHECKING:
+    from scrapli_netconf.driver import AsyncNetconfDriver
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,8 @@ class NETCONFError(ConnectionError):
 
 class NETCONF(Connection):
     NAME = "netconf"
+    PRIORITY = PRIORITY
+    SESSION_BASED = True
 
     def __init__(
         self,
@@ -24,6 +30,7 @@ class NETCONF(Connection):
         username: str,
         password: str,
         platform: str,
+        port: Optional[int] = None,
         priority: int = PRIORITY,
     ) -> None:
         super().__init__(
@@ -32,21 +39,39 @@ class NETCONF(Connection):
             username=username,
             password=password,
             platform=platform,
+            port=port,
             priority=priority,
         )
-        self.connection = AsyncNetconfDriver(
-            host=host,
-            auth_username=username,
-            auth_password=password,
-            auth_strict_key=False,
-            transport=SSH_TRANSPORT,
-        )
+        self._connection: Optional["AsyncNetconfDriver"] = None
+
+    @property
+    def connection(self) -> "AsyncNetconfDriver":
+        # scrapli_netconf is imported when the first connection is used
+        if self._connection is None:
+            driver = import_string("scrapli_netconf.driver:AsyncNetconfDriver")
+            # the driver picks the default port of the transport if none is set
+            port_kwargs = {} if self.port is None else {"port": self.port}
+            self._connection = driver(
+                host=self.host,
+                auth_username=self.username,
+                auth_password=self.password,
+                auth_strict_key=False,
+                transport=SSH_TRANSPORT,
+                **port_kwargs,
+            )
+        return self._connection
 
     async def open(self) -> None:
         await self.connection.open()
+        self.is_open = True
 
     async def close(self) -> None:
-        return await self.connection.close()
+        self.is_open = False
+        if self._connection is not None:
+            await self._connection.close()
+
+    async def is_alive(self) -> bool:
+        return self.is_open and self.connection.isalive()
 
     async def handle(
         self,
@@ -55,21 +80,27 @@ class NETCONF(Connection):
         **kwargs: Dict[str, Any],
     ):
         await self.raise_for_error()
-        nc_response = await self.connection.get(filter_=filter)
+        async with session_pool.session(self):
+            nc_response = await self.connection.get(filter_=filter)
 
         result = handler(nc_response.xml_result, **kwargs)
         return result
 
+    async def get_config(self) -> str:
+        await self.raise_for_error()
+        async with session_pool.session(self):
+            nc_response = await self.connection.get_config()
+        return nc_response.result
+
     async def update_availability(self) -> None:
         try:
-            await self.open()
+            async with session_pool.session(self):
+                pass
         except Exception:
-            self.decrease_priority()
             logger.error(
-                "%s connection to %s failed, new connection priority: %d",
+                "%s connection to %s failed",
                 self.NAME.upper(),
                 self.host,
-                self.priority,
                 exc_info=True,
             )
             self._enabled = False
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, Optional
+
+from netwarden.config import settings
+from netwarden.connections.base import ConnectionError
+
+if TYPE_CHECKING:
+    from netwarden.connections.base import Connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 500
+DEFAULT_IDLE_TIMEOUT = 600.0
+DEFAULT_KEEPALIVE_INTERVAL = 60.0
+DEFAULT_PROBE_TIMEOUT = 10.0
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 300.0
+DEFAULT_WARM_UP_CONCURRENCY = 50
+
+
+class SessionPool:
+    """Keeps SSH and NETCONF sessions open between requests
+
+    Sessions are opened on first use and reused afterwards. Only one request at a
+    time is sent over a session. A background task periodically probes idle
+    sessions, closes the ones which were not used for idle_timeout seconds and
+    reconnects the dead ones. Failed connection attempts are retried with
+    exponential backoff. When max_sessions are open, the least recently used
+    idle session is closed to make room for a new one.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        keepalive_interval: float = DEFAULT_KEEPALIVE_INTERVAL,
+        probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.probe_timeout = probe_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # open sessions ordered from the least to the most recently used
+        self._open: Dict["Connection", None] = {}
+        self._changed: Optional[asyncio.Condition] = None
+        self._maintenance_task: Optional["asyncio.Task[None]"] = None
+
+        self._opened = 0
+        self._evicted = 0
+        self._reconnected = 0
+        self._failed = 0
+
+    @classmethod
+    def from_settings(cls) -> "SessionPool":
+        return cls(
+            max_sessions=settings.get(
+                "session_pool.max_sessions", DEFAULT_MAX_SESSIONS
+            ),
+            idle_timeout=settings.get(
+                "session_pool.idle_timeout", DEFAULT_IDLE_TIMEOUT
+            ),
+            keepalive_interval=settings.get(
+                "session_pool.keepalive_interval", DEFAULT_KEEPALIVE_INTERVAL
+            ),
+            probe_timeout=settings.get(
+                "session_pool.probe_timeout", DEFAULT_PROBE_TIMEOUT
+            ),
+            backoff_base=settings.get(
+                "session_pool.backoff_base", DEFAULT_BACKOFF_BASE
+            ),
+            backoff_max=settings.get("session_pool.backoff_max", DEFAULT_BACKOFF_MAX),
+        )
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    @property
+    def changed(self) -> asyncio.Condition:
+        # session_pool is built at import time, before any event loop runs
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def __contains__(self, conn: "Connection") -> bool:
+        return conn in self._open
+
+    @asynccontextmanager
+    async def session(self, conn: "Connection") -> AsyncIterator["Connection"]:
+        """Provides exclusive access to the open session of the connection
+
+        Raises:
+            ConnectionError: if the session can't be opened
+        """
+        async with conn.lock:
+            if not conn.is_open:
+                await self._connect(conn)
+            try:
+                yield conn
+            finally:
+                conn.last_used = time.monotonic()
+                if conn in self._open:
+                    # move to the end as the most recently used
+                    del self._open[conn]
+                    self._open[conn] = None
+                await self._notify()
+
+    async def warm_up(
+        self,
+        connections: Iterable["Connection"],
+        concurrency: int = DEFAULT_WARM_UP_CONCURRENCY,
+    ) -> None:
+        """Opens sessions in advance, failures are only logged"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def open_session(conn: "Connection") -> None:
+            async with semaphore:
+                try:
+                    async with self.session(conn):
+                        pass
+                except Exception:
+                    logger.warning(
+                        "%s session to %s was not opened during warm-up",
+                        conn.NAME.upper(),
+                        conn.host,
+                    )
+
+        await asyncio.gather(*(open_session(conn) for conn in connections))
+
+    def start(self) -> None:
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def close(self) -> None:
+        """Stops the maintenance and closes all open sessions"""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        await asyncio.gather(*(self._close(conn) for conn in list(self._open)))
+
+    async def release(self, conn: "Connection") -> None:
+        """Closes the session of the connection, e.g. when its device is removed
+
+        Waits for the request in progress on the session to finish.
+        """
+        async with conn.lock:
+            if conn in self._open or conn.is_open:
+                await self._close(conn)
+
+    async def check_sessions(self) -> None:
+        """Closes idle sessions, probes the rest and reconnects the dead ones"""
+        await asyncio.gather(*(self._check(conn) for conn in list(self._open)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": len(self._open),
+            "busy": sum(conn.lock.locked() for conn in self._open),
+            "max_sessions": self.max_sessions,
+            "opened": self._opened,
+            "evicted": self._evicted,
+            "reconnected": self._reconnected,
+            "failed": self._failed,
+        }
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self.check_sessions()
+            except Exception:
+                logger.error("Session pool maintenance failed", exc_info=True)
+
+    async def _check(self, conn: "Connection") -> None:
+        if conn.lock.locked():
+            # session is in use, so it is neither idle nor needs a probe
+            return
+        async with conn.lock:
+            if not conn.is_open:
+                return
+            if time.monotonic() - conn.last_used > self.idle_timeout:
+                logger.info(
+                    "%s session to %s is idle, closing", conn.NAME.upper(), conn.host
+                )
+                self._evicted += 1
+                await self._close(conn)
+                return
+            if await self._probe(conn):
+                return
+            logger.warning(
+                "%s session to %s is dead, reconnecting", conn.NAME.upper(), conn.host
+            )
+            await self._close(conn)
+            try:
+                await self._connect(conn)
+            except ConnectionError:
+                return
+            self._reconnected += 1
+
+    async def _probe(self, conn: "Connection") -> bool:
+        try:
+            return await asyncio.wait_for(conn.is_alive(), timeout=self.probe_timeout)
+        except Exception:
+            return False
+
+    async def _connect(self, conn: "Connection") -> None:
+        now = time.monotonic()
+        if now < conn.retry_at:
+            raise ConnectionError(
+                f"{conn.NAME} connection to {conn.host} is backing off "
+                f"for {conn.retry_at - now:.1f}s"
+            )
+        await self._make_room()
+        try:
+            await conn.open()
+        except Exception as e:
+            conn.failures += 1
+            self._failed += 1
+            backoff = min(
+                self.backoff_base * 2 ** (conn.failures - 1), self.backoff_max
+            )
+            conn.retry_at = time.monotonic() + backoff
+            raise ConnectionError(
+                f"{conn.NAME} connection to {conn.host} failed, "
+                f"next attempt in {backoff:.1f}s"
+            ) from e
+        conn.failures = 0
+        conn.retry_at = 0.0
+        conn.last_used = time.monotonic()
+        self._open[conn] = None
+        self._opened += 1
+
+    async def _close(self, conn: "Connection") -> None:
+        self._open.pop(conn, None)
+        try:
+            await conn.close()
+        except Exception:
+            logger.debug(
+                "%s session to %s was not closed cleanly",
+                conn.NAME.upper(),
+                conn.host,
+                exc_info=True,
+            )
+        await self._notify()
+
+    async def _make_room(self) -> None:
+        while len(self._open) >= self.max_sessions:
+            idle_conn = next(
+                (conn for conn in self._open if not conn.lock.locked()), None
+            )
+            if idle_conn is not None:
+                async with idle_conn.lock:
+                    self._evicted += 1
+                    await self._close(idle_conn)
+                continue
+            async with self.changed:
+                await self.changed.wait()
+
+    async def _notify(self) -> None:
+        async with self.changed:
+            self.changed.notify_all()
+
+
+session_pool = SessionPool.from_settings()
@@ -0,0 +1,280 @@
+import logging
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from netwarden.connections.ssh.constants import SSHParseMethod
+from netwarden.utils import import_string, merge_dicts, no_op
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "netwarden.platforms"
+DEFAULT_COLLECT_FUNC = merge_dicts
+# parameters every handler of the transport must define, they are passed to
+# the handle method of the connection
+TRANSPORT_PARAMS: Dict[str, FrozenSet[str]] = {
+    "restconf": frozenset({"endpoint"}),
+    "ssh": frozenset({"command", "parse_method"}),
+    "netconf": frozenset({"filter"}),
+}
+
+# function or its import path, e.g. "package.module:function"
+FuncRef = Union[str, Callable[..., Any]]
+DispatchKey = Tuple[str, str, str]  # key, platform, transport
+
+
+class PlatformSpec(NamedTuple):
+    name: str
+    # import path of the scrapli driver, the platform has no SSH without it
+    ssh_driver: Optional[str] = None
+
+
+class HandlerSpec(NamedTuple):
+    handler: FuncRef
+    params: Mapping[str, Any]
+
+
+def _resolve(func: FuncRef) -> Callable[..., Any]:
+    if isinstance(func, str):
+        return import_string(func)
+    return func
+
+
+class HandlerSet:
+    """Handlers of a key for a platform and a transport
+
+    Import paths are resolved on first use, so the parsers of a platform are
+    imported only when it is queried. The resolved handler infos are kept and
+    shared by all requests, they must not be modified.
+    """
+
+    def __init__(
+        self,
+        specs: Tuple[HandlerSpec, ...],
+        collect_fn: FuncRef = DEFAULT_COLLECT_FUNC,
+        concurrent: bool = False,
+    ) -> None:
+        self.specs = specs
+        self.concurrent = concurrent
+        self._collect_fn = collect_fn
+        self._handler_infos: Optional[Tuple[Dict[str, Any], ...]] = None
+
+    @property
+    def handler_infos(self) -> Tuple[Dict[str, Any], ...]:
+        """Keyword arguments for the handle method of the connection"""
+        if self._handler_infos is None:
+            self._handler_infos = tuple(
+                {**spec.params, "handler": _resolve(spec.handler)}
+                for spec in self.specs
+            )
+        return self._handler_infos
+
+    @property
+    def collect_fn(self) -> Callable[..., Any]:
+        return _resolve(self._collect_fn)
+
+    def add(self, spec: HandlerSpec) -> "HandlerSet":
+        return HandlerSet(self.specs + (spec,), self._collect_fn, self.concurrent)
+
+
+class HandlerRegistry:
+    """Platforms and the handlers retrieving each key from them
+
+    Platforms and handlers are registered at startup, either declaratively
+    with register, with the handler decorator or by plugins exposing a
+    function under the "netwarden.platforms" entry point group. The function
+    receives the registry and registers whatever its package supports.
+
+    Every registration is validated and the dispatch tables are updated right
+    away, so looking up handlers while serving requests is a dictionary lookup.
+    """
+
+    def __init__(self) -> None:
+        self._transport_params: Dict[str, FrozenSet[str]] = dict(TRANSPORT_PARAMS)
+        self._platforms: Dict[str, PlatformSpec] = {}
+        self._handlers: Dict[DispatchKey, HandlerSet] = {}
+        # (key, platform) -> transports in the order of registration
+        self._transports: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+    @classmethod
+    def create_default(cls) -> "HandlerRegistry":
+        """Returns registry with built-in platforms and installed plugins"""
+        from netwarden.connections import handlers
+
+        registry = cls()
+        handlers.register(registry)
+        registry.load_entry_points()
+        return registry
+
+    def register_transport(self, name: str, params: Iterable[str] = ()) -> None:
+        self._transport_params[name] = frozenset(params)
+
+    def register_platform(self, name: str, ssh_driver: Optional[str] = None) -> None:
+        if ssh_driver is not None and not _is_import_path(ssh_driver):
+            raise ValueError(f"Platform {name!r}: invalid driver {ssh_driver!r}")
+        self._platforms[name] = PlatformSpec(name=name, ssh_driver=ssh_driver)
+
+    def register(
+        self,
+        key: str,
+        platform: str,
+        transport: str,
+        handlers: Iterable[Mapping[str, Any]],
+        collect_fn: FuncRef = DEFAULT_COLLECT_FUNC,
+        concurrent: bool = False,
+    ) -> None:
+        """Registers handlers of the key, replacing previously registered ones
+
+        Args:
+            key: type of requested information, e.g. "version_sn"
+            platform: name of a registered platform
+            transport: name of the connection, e.g. "ssh"
+            handlers: dictionaries with the "handler" function or its import
+              path (no_op if omitted) and the parameters of the transport
+            collect_fn: combines results of the handlers. Default: merge_dicts
+            concurrent: handlers are independent and can run concurrently
+        """
+        self._validate_target(key, platform, transport)
+        _validate_func(key, "collect_fn", collect_fn)
+        specs = []
+        for handler_info in handlers:
+            params = dict(handler_info)
+            handler = params.pop("handler", no_op)
+            specs.append(self._make_spec(key, platform, transport, handler, params))
+        if not specs:
+            raise ValueError(f"{key!r} for {platform!r}/{transport}: no handlers")
+        self._set(
+            (key, platform, transport), HandlerSet(tuple(specs), collect_fn, concurrent)
+        )
+
+    def handler(
+        self, key: str, platform: str, transport: str, **params: Any
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator adding the function to the handlers of the key
+
+        Example:
+            @registry.handler("lldp", "juniper_junos", "ssh",
+                              command="show lldp neighbors",
+                              parse_method=SSHParseMethod.TEXTFSM)
+            def parse_lldp(data): ...
+        """
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            self._validate_target(key, platform, transport)
+            spec = self._make_spec(key, platform, transport, func, params)
+            dispatch_key = (key, platform, transport)
+            handler_set = self._handlers.get(dispatch_key)
+            if handler_set is None:
+                handler_set = HandlerSet((spec,))
+            else:
+                handler_set = handler_set.add(spec)
+            self._set(dispatch_key, handler_set)
+            return func
+
+        return decorator
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        from importlib.metadata import entry_points
+
+        eps = entry_points()
+        if hasattr(eps, "select"):
+            selected = list(eps.select(group=group))
+        else:  # python < 3.10
+            selected = list(eps.get(group, []))  # type: ignore
+        for ep in selected:
+            try:
+                register = ep.load()
+                register(self)
+            except Exception:
+                logger.error(
+                    "Platform plugin %r failed to load", ep.name, exc_info=True
+                )
+            else:
+                logger.info("Platform plugin %r loaded", ep.name)
+
+    def get(self, key: str, platform: str, transport: str) -> HandlerSet:
+        """Returns handlers of the key
+
+        Raises:
+            KeyError: if the key is not supported by the platform over the transport
+        """
+        return self._handlers[(key, platform, transport)]
+
+    def get_transports(self, key: str, platform: str) -> Tuple[str, ...]:
+        """Returns transports which can retrieve the key from the platform"""
+        return self._transports.get((key, platform), ())
+
+    def get_platform(self, name: str) -> PlatformSpec:
+        """Raises KeyError if the platform is not registered"""
+        return self._platforms[name]
+
+    @property
+    def platforms(self) -> List[str]:
+        return list(self._platforms)
+
+    @property
+    def keys(self) -> List[str]:
+        return sorted({key for key, _, _ in self._handlers})
+
+    def _set(self, dispatch_key: DispatchKey, handler_set: HandlerSet) -> None:
+        key, platform, transport = dispatch_key
+        self._handlers[dispatch_key] = handler_set
+        transports = self._transports.get((key, platform), ())
+        if transport not in transports:
+            self._transports[(key, platform)] = transports + (transport,)
+
+    def _validate_target(self, key: str, platform: str, transport: str) -> None:
+        if platform not in self._platforms:
+            raise ValueError(f"{key!r}: platform {platform!r} is not registered")
+        if transport not in self._transport_params:
+            raise ValueError(f"{key!r}: unknown transport {transport!r}")
+
+    def _make_spec(
+        self,
+        key: str,
+        platform: str,
+        transport: str,
+        handler: FuncRef,
+        params: Mapping[str, Any],
+    ) -> HandlerSpec:
+        _validate_func(key, "handler", handler)
+        missing = self._transport_params[transport] - params.keys()
+        if missing:
+            raise ValueError(
+                f"{key!r} for {platform!r}/{transport}: "
+                f"missing parameters {sorted(missing)}"
+            )
+        if "parse_method" in params and not isinstance(
+            params["parse_method"], SSHParseMethod
+        ):
+            raise ValueError(
+                f"{key!r} for {platform!r}/{transport}: "
+                f"invalid parse method {params['parse_method']!r}"
+            )
+        return HandlerSpec(handler=handler, params=dict(params))
+
+
+def _is_import_path(path: str) -> bool:
+    module_name, _, attr_name = path.rpartition(":" if ":" in path else ".")
+    return bool(module_name and attr_name)
+
+
+def _validate_func(key: str, name: str, func: Any) -> None:
+    if isinstance(func, str):
+        if not _is_import_path(func):
+            raise ValueError(f"{key!r}: invalid import path {func!r} of {name}")
+    elif not callable(func):
+        raise ValueError(f"{key!r}: {name} is not callable")
+
+
+registry = HandlerRegistry.create_default()
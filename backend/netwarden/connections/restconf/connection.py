@@ -1,14 +1,17 @@
 import logging
 import re
-from typing import Dict, Any, Optional, Callable
-
-from lxml import etree
-from httpx import AsyncClient
+import time
+from typing import Dict, Any, Optional, Callable, Tuple
 
 from netwarden.connections.base import Connection, ConnectionError
+from netwarden.connections.restconf.transport import restconf_transport
 
 IOS_XE_VERSION_RE = re.compile(r"\bVersion\s+(?P<sw_version>[\w.]+)\b")
 PRIORITY = 700
+# a failed device is checked again after the backoff, which is capped by the
+# open timeout of the transport selector so every half-open probe reaches it
+RETRY_BACKOFF_BASE = 5.0
+RETRY_BACKOFF_MAX = 60.0
 
 
 logger = logging.getLogger(__name__)
@@ -20,12 +23,11 @@ class RESTCONFError(ConnectionError):
 
 class RESTCONF(Connection):
     NAME = "restconf"
+    PRIORITY = PRIORITY
     HEADERS = {
         "Accept": "application/yang-data+json",
         "Content-Type": "application/yang-data+json",
     }
-    AVAILABILITY_URL = "https://{host}/.well-known/host-meta"
-    NAMESPACES = {"x": "http://docs.oasis-open.org/ns/xri/xrd-1.0"}
 
     def __init__(
         self,
@@ -34,6 +36,7 @@ class RESTCONF(Connection):
         username: str,
         password: str,
         platform: str,
+        port: Optional[int] = None,
         priority: int = PRIORITY,
     ) -> None:
         super().__init__(
@@ -42,49 +45,44 @@ class RESTCONF(Connection):
             username=username,
             password=password,
             platform=platform,
+            port=port,
             priority=priority,
         )
         # self.host = host
         # self.platform = platform
-        self.http_client = AsyncClient(
-            # headers=RESTCONF.HEADERS,
-            auth=(self.username, self.password),
-            # base_url=base_url,
-            verify=False,
-        )
         self._enabled: Optional[bool] = None
-        self.root: Optional[bool] = None
+        self.root: Optional[str] = None
+
+    @property
+    def address(self) -> str:
+        return self.host if self.port is None else f"{self.host}:{self.port}"
+
+    @property
+    def auth(self) -> Tuple[str, str]:
+        return (self.username, self.password)
 
     async def open(self) -> None:
         pass
 
     async def close(self) -> None:
-        return await self.http_client.aclose()
+        # HTTP connections are shared between devices and closed by the transport
+        pass
 
     async def update_availability(self) -> None:
-        headers = {"Accept": "application/xrd+xml"}
-        url = RESTCONF.AVAILABILITY_URL.format(host=self.host)
         try:
-            response = await self.http_client.get(url, headers=headers)
-            if response.is_error:
-                self._enabled = False
-                return
-            xml_response = etree.fromstring(response.text)
-            links = xml_response.xpath(
-                "./x:Link[@rel='restconf']", namespaces=RESTCONF.NAMESPACES
-            )
-            first_link = links[0]
-            restconf_root = first_link.get("href")
-            self._enabled = True
-            self.root = restconf_root
+            self.root = await restconf_transport.get_root(self.address, auth=self.auth)
         except Exception:
-            logger.error(
-                "RESTCONF connection to %s failed, new connection priority: %d",
-                self.host,
-                self.priority,
-                exc_info=True,
-            )
+            logger.error("RESTCONF connection to %s failed", self.host, exc_info=True)
             self._enabled = False
+            self.failures += 1
+            backoff = min(
+                RETRY_BACKOFF_BASE * 2 ** (self.failures - 1), RETRY_BACKOFF_MAX
+            )
+            self.retry_at = time.monotonic() + backoff
+        else:
+            self._enabled = True
+            self.failures = 0
+            self.retry_at = 0.0
 
     # async def is_enabled(self, force_check: bool = False) -> bool:
     #     if self._enabled is not None and not force_check:
@@ -95,7 +93,7 @@ class RESTCONF(Connection):
     def build_url(self, endpoint: str) -> str:
         if self.root is None:
             raise RESTCONFError("RESTCONF root is unknown")
-        result = f"https://{self.host}{self.root}{endpoint}"
+        result = f"https://{self.address}{self.root}{endpoint}"
         return result
 
     # async def parse(self, key: str, **kwargs: Dict[str, Any]) -> Any:
@@ -121,9 +119,10 @@ class RESTCONF(Connection):
     ) -> Any:
         await self.raise_for_error()
         url = self.build_url(endpoint)
-        response = await self.http_client.get(url, headers=RESTCONF.HEADERS)
+        response = await restconf_transport.get(
+            self.address, url, auth=self.auth, headers=RESTCONF.HEADERS
+        )
         if response.is_error:
-            self.decrease_priority()
             raise RESTCONFError(f"Received error: {response.status_code}")
 
         data = response.json()
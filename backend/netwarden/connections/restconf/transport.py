@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import ssl
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from netwarden.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+except ImportError:
+    HTTP2_AVAILABLE = False
+else:
+    HTTP2_AVAILABLE = True
+
+AVAILABILITY_URL = "https://{host}/.well-known/host-meta"
+XRD_NAMESPACES = {"x": "http://docs.oasis-open.org/ns/xri/xrd-1.0"}
+
+DEFAULT_MAX_CONNECTIONS = 1000
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 200
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 4
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 30.0
+
+
+class RESTCONFTransport:
+    """Process-wide HTTP transport shared by all RESTCONF connections
+
+    All devices share one connection pool and one SSL context. HTTP/2 is used
+    when the h2 package is installed and the device negotiates it, so that
+    concurrent requests to a device are multiplexed over a single connection.
+    The number of concurrent requests per host is limited separately from the
+    pool size. RESTCONF root discovered via host-meta is cached per host.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: bool = True,
+        verify: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 package is not installed, RESTCONF will use HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.verify = verify
+        self._transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._roots: Dict[str, str] = {}
+
+    @classmethod
+    def from_settings(cls) -> "RESTCONFTransport":
+        return cls(
+            max_connections=settings.get(
+                "restconf.max_connections", DEFAULT_MAX_CONNECTIONS
+            ),
+            max_keepalive_connections=settings.get(
+                "restconf.max_keepalive_connections", DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            max_connections_per_host=settings.get(
+                "restconf.max_connections_per_host", DEFAULT_MAX_CONNECTIONS_PER_HOST
+            ),
+            keepalive_expiry=settings.get(
+                "restconf.keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY
+            ),
+            timeout=settings.get("restconf.timeout", DEFAULT_TIMEOUT),
+            http2=settings.get("restconf.http2", True),
+            verify=settings.get("restconf.verify", False),
+        )
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            context = ssl.create_default_context()
+            if not self.verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._ssl_context = context
+        return self._ssl_context
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                verify=self.ssl_context,
+                transport=self._transport,
+            )
+        return self._client
+
+    @property
+    def roots(self) -> Dict[str, str]:
+        """Discovered RESTCONF roots: host -> root"""
+        return self._roots
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def request(
+        self,
+        method: str,
+        host: str,
+        url: str,
+        auth: Tuple[str, str],
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        async with self._host_semaphore(host):
+            return await self.client.request(
+                method, url, auth=auth, headers=headers, **kwargs
+            )
+
+    async def get(
+        self,
+        host: str,
+        url: str,
+        auth: Tuple[str, str],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        return await self.request("GET", host, url, auth=auth, headers=headers)
+
+    async def get_root(
+        self, host: str, auth: Tuple[str, str], force_check: bool = False
+    ) -> str:
+        """Returns RESTCONF root of the host, discovering it if it is not known
+
+        Raises:
+            httpx.HTTPError: if host-meta can't be retrieved
+            ValueError: if host-meta does not contain RESTCONF link
+        """
+        root = self._roots.get(host)
+        if root is not None and not force_check:
+            return root
+        url = AVAILABILITY_URL.format(host=host)
+        headers = {"Accept": "application/xrd+xml"}
+        response = await self.get(host, url, auth=auth, headers=headers)
+        response.raise_for_status()
+        from lxml import etree
+
+        xml_response = etree.fromstring(response.content)
+        links = xml_response.xpath(
+            "./x:Link[@rel='restconf']", namespaces=XRD_NAMESPACES
+        )
+        if not links:
+            raise ValueError(f"RESTCONF link was not found in host-meta of {host}")
+        root = links[0].get("href")
+        self._roots[host] = root
+        return root
+
+    def set_root(self, host: str, root: str) -> None:
+        self._roots[host] = root
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+restconf_transport = RESTCONFTransport.from_settings()
@@ -0,0 +1,205 @@
+import enum
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from netwarden.config import settings
+from netwarden.connections.base import DEFAULT_PRIORITY
+
+if TYPE_CHECKING:
+    from netwarden.connections.base import Connection, ConnectionSpec
+
+DEFAULT_ALPHA = 0.2
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_OPEN_TIMEOUT = 60.0
+# expected latency of a transport with the default priority before it is measured
+DEFAULT_PRIOR_LATENCY = 1.0
+MIN_SUCCESS_RATE = 0.05
+
+StatsKey = Tuple[str, str, str]  # device name, transport, key
+# only name and priority are used, so connections need not be created to be ordered
+C = TypeVar("C", "Connection", "ConnectionSpec")
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class TransportStats:
+    def __init__(self) -> None:
+        self.latency: Optional[float] = None  # EWMA of successful requests
+        self.success_rate = 1.0  # EWMA
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.state = CircuitState.CLOSED
+        # when the circuit was opened or the half-open probe was started
+        self.changed_at = 0.0
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "success_rate": self.success_rate,
+            "samples": self.samples,
+            "consecutive_failures": self.consecutive_failures,
+            "state": self.state.value,
+        }
+
+    @classmethod
+    def load(cls, data: Dict[str, Any]) -> "TransportStats":
+        stats = cls()
+        stats.latency = data["latency"]
+        stats.success_rate = data["success_rate"]
+        stats.samples = data["samples"]
+        # circuits are closed after a restart, failures are counted again
+        return stats
+
+
+class TransportSelector:
+    """Orders transports of a device by the expected cost of a request
+
+    Latency and success rate are tracked as EWMA per (device, transport, key).
+    The expected cost is latency / success rate. Transports which were not used
+    yet are expected to be as fast as their static priority suggests.
+
+    After failure_threshold consecutive failures the circuit of the transport
+    opens and it is only used when nothing else is available. After
+    open_timeout seconds a single request is let through (half-open), its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        alpha: float = DEFAULT_ALPHA,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_timeout: float = DEFAULT_OPEN_TIMEOUT,
+        prior_latency: float = DEFAULT_PRIOR_LATENCY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.open_timeout = open_timeout
+        self.prior_latency = prior_latency
+        self.clock = clock
+        self._stats: Dict[StatsKey, TransportStats] = {}
+
+    @classmethod
+    def from_settings(cls) -> "TransportSelector":
+        return cls(
+            alpha=settings.get("selector.alpha", DEFAULT_ALPHA),
+            failure_threshold=settings.get(
+                "selector.failure_threshold", DEFAULT_FAILURE_THRESHOLD
+            ),
+            open_timeout=settings.get("selector.open_timeout", DEFAULT_OPEN_TIMEOUT),
+            prior_latency=settings.get("selector.prior_latency", DEFAULT_PRIOR_LATENCY),
+        )
+
+    def get_stats(
+        self, device_name: str, transport: str, key: str
+    ) -> Optional[TransportStats]:
+        return self._stats.get((device_name, transport, key))
+
+    def expected_cost(
+        self,
+        conn: Union["Connection", "ConnectionSpec"],
+        stats: Optional[TransportStats],
+    ) -> float:
+        if stats is None or stats.latency is None:
+            latency = self.prior_latency * DEFAULT_PRIORITY / max(conn.priority, 1)
+        else:
+            latency = stats.latency
+        success_rate = 1.0 if stats is None else stats.success_rate
+        return latency / max(success_rate, MIN_SUCCESS_RATE)
+
+    def order(self, device_name: str, key: str, conns: Iterable[C]) -> List[C]:
+        """Returns connections from the best to the worst for the request
+
+        Connection due for a half-open probe goes first, connections with open
+        circuits go last. Selecting a connection for the probe starts it.
+        """
+        now = self.clock()
+        probe = None
+        ranked = []
+        for conn in conns:
+            stats = self._stats.get((device_name, conn.name, key))
+            if stats is None or stats.state is CircuitState.CLOSED:
+                ranked.append((0, self.expected_cost(conn, stats), conn))
+            elif probe is None and now - stats.changed_at >= self.open_timeout:
+                # a probe which was never reported is retried after the timeout
+                stats.state = CircuitState.HALF_OPEN
+                stats.changed_at = now
+                probe = conn
+            else:
+                ranked.append((1, stats.changed_at, conn))
+        ranked.sort(key=lambda item: item[:2])
+        result = [conn for _, _, conn in ranked]
+        if probe is not None:
+            result.insert(0, probe)
+        return result
+
+    def record_success(
+        self, device_name: str, transport: str, key: str, elapsed: float
+    ) -> None:
+        stats = self._get_or_create_stats(device_name, transport, key)
+        if stats.latency is None:
+            stats.latency = elapsed
+        else:
+            stats.latency += self.alpha * (elapsed - stats.latency)
+        stats.success_rate += self.alpha * (1.0 - stats.success_rate)
+        stats.samples += 1
+        stats.consecutive_failures = 0
+        stats.state = CircuitState.CLOSED
+
+    def record_failure(self, device_name: str, transport: str, key: str) -> None:
+        stats = self._get_or_create_stats(device_name, transport, key)
+        stats.success_rate -= self.alpha * stats.success_rate
+        stats.samples += 1
+        stats.consecutive_failures += 1
+        if (
+            stats.state is CircuitState.HALF_OPEN
+            or stats.consecutive_failures >= self.failure_threshold
+        ):
+            stats.state = CircuitState.OPEN
+            stats.changed_at = self.clock()
+
+    def _get_or_create_stats(
+        self, device_name: str, transport: str, key: str
+    ) -> TransportStats:
+        stats = self._stats.get((device_name, transport, key))
+        if stats is None:
+            stats = TransportStats()
+            self._stats[(device_name, transport, key)] = stats
+        return stats
+
+    def dump(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns stats as device name -> "transport:key" -> stats"""
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (device_name, transport, key), stats in self._stats.items():
+            result.setdefault(device_name, {})[f"{transport}:{key}"] = stats.dump()
+        return result
+
+    def load(self, data: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        """Restores stats saved with dump"""
+        for device_name, device_stats in data.items():
+            for transport_key, stats_data in device_stats.items():
+                transport, key = transport_key.split(":", 1)
+                stats = TransportStats.load(stats_data)
+                self._stats[(device_name, transport, key)] = stats
+
+    def remove_device(self, device_name: str) -> None:
+        for stats_key in [k for k in self._stats if k[0] == device_name]:
+            del self._stats[stats_key]
+
+
+transport_selector = TransportSelector.from_settings()
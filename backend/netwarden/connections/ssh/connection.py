@@ -1,8 +1,12 @@
+import asyncio
 import logging
-from typing import Callable, Any, Dict, TYPE_CHECKING
-from scrapli.driver.core import AsyncIOSXEDriver
+from typing import Callable, Any, Dict, List, Optional, Sequence, TYPE_CHECKING
 
 from netwarden.connections.base import Connection, ConnectionError
+from netwarden.connections.pool import session_pool
+from netwarden.connections.registry import registry
+from netwarden.connections.ssh.parsing import parser_pool
+from netwarden.utils import import_string
 
 # from netwarden.connections import handlers
 from netwarden.connections.ssh.constants import SSHParseMethod
@@ -10,8 +14,6 @@ from netwarden.connections.ssh.constants import SSHParseMethod
 if TYPE_CHECKING:
     from scrapli.driver import AsyncNetworkDriver
 
-PLATFORM_TO_DRIVER = {"cisco_iosxe": AsyncIOSXEDriver}
-
 logger = logging.getLogger(__name__)
 
 SSH_TRANSPORT = "asyncssh"
@@ -24,6 +26,8 @@ class SSHError(ConnectionError):
 
 class SSH(Connection):
     NAME = "ssh"
+    PRIORITY = PRIORITY
+    SESSION_BASED = True
 
     def __init__(
         self,
@@ -32,6 +36,7 @@ class SSH(Connection):
         username: str,
         password: str,
         platform: str,
+        port: Optional[int] = None,
         priority: int = PRIORITY,
     ) -> None:
         super().__init__(
@@ -40,22 +45,47 @@ class SSH(Connection):
             username=username,
             password=password,
             platform=platform,
+            port=port,
             priority=priority,
         )
-        driver = PLATFORM_TO_DRIVER[platform]
-        self.scrapli_conn: "AsyncNetworkDriver" = driver(
-            host=host,
-            auth_username=username,
-            auth_password=password,
-            auth_strict_key=False,
-            transport=SSH_TRANSPORT,
-        )
+        # the driver is imported when the connection is used for the first time
+        driver_path = registry.get_platform(platform).ssh_driver
+        if driver_path is None:
+            raise SSHError(f"Platform {platform!r} does not support SSH")
+        self.driver_path = driver_path
+        self._scrapli_conn: Optional["AsyncNetworkDriver"] = None
+
+    @property
+    def scrapli_conn(self) -> "AsyncNetworkDriver":
+        if self._scrapli_conn is None:
+            driver = import_string(self.driver_path)
+            # the driver picks the default port of the transport if none is set
+            port_kwargs = {} if self.port is None else {"port": self.port}
+            self._scrapli_conn = driver(
+                host=self.host,
+                auth_username=self.username,
+                auth_password=self.password,
+                auth_strict_key=False,
+                transport=SSH_TRANSPORT,
+                **port_kwargs,
+            )
+        return self._scrapli_conn
 
     async def open(self) -> None:
         await self.scrapli_conn.open()
+        self.is_open = True
 
     async def close(self) -> None:
-        return await self.scrapli_conn.close()
+        self.is_open = False
+        if self._scrapli_conn is not None:
+            await self._scrapli_conn.close()
+
+    async def is_alive(self) -> bool:
+        if not self.is_open or not self.scrapli_conn.isalive():
+            return False
+        # transport can be alive while the device does not respond anymore
+        await self.scrapli_conn.get_prompt()
+        return True
 
     async def handle(
         self,
@@ -65,32 +95,88 @@ class SSH(Connection):
         **kwargs: Dict[str, Any],
     ):
         await self.raise_for_error()
-        scrapli_result = await self.scrapli_conn.send_command(command)
-
-        if parse_method is SSHParseMethod.TEXTFSM:
-            data = scrapli_result.textfsm_parse_output()
-        elif parse_method is SSHParseMethod.GENIE:
-            data = scrapli_result.genie_parse_output()
-        elif parse_method is SSHParseMethod.NULL:
-            data = scrapli_result.result
-        else:
-            raise ValueError(f"Unknown parse method: {parse_method}")
+        async with session_pool.session(self):
+            scrapli_result = await self.scrapli_conn.send_command(command)
+
+        return await parser_pool.parse(scrapli_result, handler, parse_method, **kwargs)
 
-        result = handler(data, **kwargs)
-        return result
+    async def handle_concurrently(
+        self, handler_infos: Sequence[Dict[str, Any]], **kwargs: Dict[str, Any]
+    ) -> List[Any]:
+        """Sends all commands as one batch over the session"""
+        return await self._handle_batch(handler_infos, False, **kwargs)
+
+    async def _handle_batch(
+        self,
+        handler_infos: Sequence[Dict[str, Any]],
+        return_exceptions: bool,
+        **kwargs: Dict[str, Any],
+    ) -> List[Any]:
+        """Sends the commands as one batch and parses the outputs concurrently
+
+        Args:
+            return_exceptions: failed parses are returned as their exceptions
+              instead of failing the whole batch
+        """
+        await self.raise_for_error()
+        commands = [handler_info["command"] for handler_info in handler_infos]
+        async with session_pool.session(self):
+            multi_response = await self.scrapli_conn.send_commands(commands)
+
+        return list(
+            await asyncio.gather(
+                *(
+                    parser_pool.parse(
+                        scrapli_result,
+                        handler_info["handler"],
+                        handler_info["parse_method"],
+                        **kwargs,
+                    )
+                    for scrapli_result, handler_info in zip(
+                        multi_response, handler_infos
+                    )
+                ),
+                return_exceptions=return_exceptions,
+            )
+        )
+
+    async def parse_many(
+        self, keys: Sequence[str], **kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Sends the commands of all keys as one batch over the session
+
+        A key whose output failed to parse has the exception as its result,
+        other keys are not affected.
+        """
+        handler_sets = [self.get_handlers(key) for key in keys]
+        handler_infos = [
+            handler_info
+            for handler_set in handler_sets
+            for handler_info in handler_set.handler_infos
+        ]
+        results = await self._handle_batch(handler_infos, True, **kwargs)
+        key_to_result: Dict[str, Any] = {}
+        start = 0
+        for key, handler_set in zip(keys, handler_sets):
+            end = start + len(handler_set.handler_infos)
+            key_results = results[start:end]
+            errors = [r for r in key_results if isinstance(r, BaseException)]
+            if errors:
+                key_to_result[key] = errors[0]
+            else:
+                try:
+                    key_to_result[key] = handler_set.collect_fn(*key_results)
+                except Exception as e:
+                    key_to_result[key] = e
+            start = end
+        return key_to_result
 
     async def update_availability(self) -> None:
         try:
-            await self.open()
-
+            async with session_pool.session(self):
+                pass
         except Exception:
-            self.decrease_priority()
-            logger.error(
-                "SSH connection to %s failed, new connection priority: %d",
-                self.host,
-                self.priority,
-                exc_info=True,
-            )
+            logger.error("SSH connection to %s failed", self.host, exc_info=True)
             self._enabled = False
         else:
             self._enabled = True
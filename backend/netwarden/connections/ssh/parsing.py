@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+from netwarden.config import settings
+from netwarden.connections.ssh.constants import SSHParseMethod
+
+if TYPE_CHECKING:
+    from scrapli.response import Response
+    from textfsm import TextFSM
+    from textfsm.clitable import CliTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INLINE_MAX_SIZE = 1024
+
+
+@lru_cache(maxsize=None)
+def get_textfsm_index() -> Tuple["CliTable", str]:
+    """Returns ntc-templates index and the directory of the templates"""
+    import ntc_templates
+    from textfsm.clitable import CliTable
+
+    template_dir = os.path.join(os.path.dirname(ntc_templates.__file__), "templates")
+    return CliTable("index", template_dir), template_dir
+
+
+@lru_cache(maxsize=None)
+def get_textfsm_template_path(platform: str, command: str) -> Optional[str]:
+    cli_table, template_dir = get_textfsm_index()
+    row_index = cli_table.index.GetRowMatch({"Platform": platform, "Command": command})
+    if not row_index:
+        logger.warning(
+            "No TextFSM template for platform %r and command %r", platform, command
+        )
+        return None
+    template_name = cli_table.index.index[row_index]["Template"]
+    return os.path.join(template_dir, template_name)
+
+
+@lru_cache(maxsize=None)
+def get_textfsm_parser(template_path: str) -> "TextFSM":
+    """Returns compiled TextFSM template, shared by all parses in the process"""
+    import textfsm
+
+    with open(template_path, encoding="utf-8") as f:
+        return textfsm.TextFSM(f)
+
+
+def textfsm_parse(platform: str, command: str, output: str) -> List[Dict[str, Any]]:
+    import textfsm
+
+    template_path = get_textfsm_template_path(platform, command)
+    if template_path is None:
+        return []
+    fsm = get_textfsm_parser(template_path)
+    fsm.Reset()
+    try:
+        rows = fsm.ParseText(output)
+    except textfsm.TextFSMError:
+        logger.warning("Failed to parse %r output with TextFSM", command)
+        return []
+    header = [column.lower() for column in fsm.header]
+    return [dict(zip(header, row)) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_genie_device(platform: str) -> Any:
+    """Returns Genie device used to look up and run the parsers of the platform"""
+    from genie.conf.base import Device
+
+    return Device("netwarden", custom={"abstraction": {"order": ["os"]}}, os=platform)
+
+
+def genie_parse(
+    platform: str, command: str, output: str
+) -> Union[Dict[str, Any], List[Any]]:
+    try:
+        genie_device = get_genie_device(platform)
+    except ImportError:
+        logger.warning("genie package is not installed, %r is not parsed", command)
+        return []
+    try:
+        result = genie_device.parse(command, output=output)
+    except Exception as e:
+        logger.warning("Failed to parse %r output with Genie: %r", command, e)
+        return []
+    if isinstance(result, (list, dict)):
+        return result
+    return []
+
+
+def parse_output(
+    output: str,
+    command: str,
+    handler: Callable[..., Any],
+    parse_method: SSHParseMethod,
+    textfsm_platform: str,
+    genie_platform: str,
+    **kwargs: Dict[str, Any],
+) -> Any:
+    """Parses raw command output and passes the result to the handler
+
+    Only takes picklable arguments, so it can run in a worker process.
+    TextFSM templates and Genie parsers are compiled once per process.
+    """
+    data: Any
+    if parse_method is SSHParseMethod.TEXTFSM:
+        data = textfsm_parse(textfsm_platform, command, output)
+    elif parse_method is SSHParseMethod.GENIE:
+        data = genie_parse(genie_platform, command, output)
+    elif parse_method is SSHParseMethod.NULL:
+        data = output
+    else:
+        raise ValueError(f"Unknown parse method: {parse_method}")
+
+    result = handler(data, **kwargs)
+    return result
+
+
+class ParserPool:
+    """Runs CPU-heavy parsing of command output in worker processes
+
+    Only the raw output is sent to a worker and only the parsed result is sent
+    back, so the event loop stays responsive while TextFSM or Genie is busy.
+    Output shorter than inline_max_size is parsed in place unless Genie is
+    used, as sending it to a worker would cost more than parsing it. With
+    max_workers = 0 everything is parsed in place.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        inline_max_size: int = DEFAULT_INLINE_MAX_SIZE,
+    ) -> None:
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.inline_max_size = inline_max_size
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_settings(cls) -> "ParserPool":
+        return cls(
+            max_workers=settings.get("parser_pool.max_workers"),
+            inline_max_size=settings.get(
+                "parser_pool.inline_max_size", DEFAULT_INLINE_MAX_SIZE
+            ),
+        )
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            # workers are spawned, forking a process with a running event loop
+            # and its threads is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def is_inline(self, output: str, parse_method: SSHParseMethod) -> bool:
+        if not self.max_workers:
+            return True
+        return (
+            parse_method is not SSHParseMethod.GENIE
+            and len(output) < self.inline_max_size
+        )
+
+    async def parse(
+        self,
+        scrapli_result: "Response",
+        handler: Callable[..., Any],
+        parse_method: SSHParseMethod,
+        **kwargs: Dict[str, Any],
+    ) -> Any:
+        func = partial(
+            parse_output,
+            scrapli_result.result,
+            scrapli_result.channel_input,
+            handler,
+            parse_method,
+            scrapli_result.textfsm_platform,
+            scrapli_result.genie_platform,
+            **kwargs,
+        )
+        if self.is_inline(scrapli_result.result, parse_method):
+            return func()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+parser_pool = ParserPool.from_settings()
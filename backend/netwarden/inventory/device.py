@@ -1,12 +1,31 @@
+import asyncio
 import logging
+import sys
+import time
 from operator import attrgetter
-from typing import Iterable, Optional, Dict, List, Any, Type, TYPE_CHECKING, cast
+from typing import (
+    Iterable,
+    Optional,
+    Dict,
+    List,
+    Any,
+    Sequence,
+    Type,
+    TYPE_CHECKING,
+    cast,
+)
 
-from pydantic import BaseModel, PrivateAttr
-
-from netwarden.connections.base import ConnectionError
-from netwarden.connections.handlers import HANDLERS
+from pydantic import BaseModel, PrivateAttr, validator
 
+from netwarden.archive import config_archive
+from netwarden.cache import ResultCache
+from netwarden.connections.base import ConnectionSpec
+from netwarden.connections.pool import session_pool
+from netwarden.connections.registry import registry
+from netwarden.connections.selector import transport_selector
+from netwarden.scheduler import scheduler
+from netwarden.singleflight import SingleFlight
+from netwarden.utils import make_request_key
 
 if TYPE_CHECKING:
     from netwarden.connections.base import Connection
@@ -24,10 +43,41 @@ class Device(BaseModel):
     site: str = "N/A"
     vendor: str = "N/A"
     model: str = "N/A"
+    netbox_id: Optional[int] = None
+    tags: List[str] = []
+    # connections are created from their specs on first use
+    _connection_specs: Dict[str, "ConnectionSpec"] = PrivateAttr(default_factory=dict)
     _connections: Dict[str, "Connection"] = PrivateAttr(default_factory=dict)
+    # created on first request, most devices of a large inventory are idle
+    _cache: Optional[ResultCache] = PrivateAttr(default=None)
+    _inflight: Optional[SingleFlight] = PrivateAttr(default=None)
+
+    @validator("platform", "site", "vendor", "model", "tags", each_item=True)
+    def intern_value(cls, value: str) -> str:
+        # these values repeat across thousands of devices
+        return sys.intern(value)
+
+    @property
+    def cache(self) -> ResultCache:
+        if self._cache is None:
+            self._cache = ResultCache.from_settings()
+        return self._cache
+
+    @property
+    def inflight(self) -> SingleFlight:
+        if self._inflight is None:
+            self._inflight = SingleFlight()
+        return self._inflight
+
+    @property
+    def connection_specs(self) -> List["ConnectionSpec"]:
+        return sorted(
+            self._connection_specs.values(), key=attrgetter("priority"), reverse=True
+        )
 
     @property
     def connections(self) -> List["Connection"]:
+        """Connections which were created, see get_connection"""
         return sorted(
             self._connections.values(), key=attrgetter("priority"), reverse=True
         )
@@ -40,11 +90,11 @@ class Device(BaseModel):
     ) -> "Connection":
         if conn_name is not None:
             # if specific connection type is required
-            return self._connections[conn_name]
+            return self._get_or_create_connection(conn_name)
         else:
             #
             selected_conn = None
-            for conn in self.connections:
+            for conn in self.connection_specs:
                 if excluded_connections:
                     if conn.name in excluded_connections:
                         continue
@@ -58,58 +108,244 @@ class Device(BaseModel):
             logger.info(
                 "Device %r, selected connection: %r", self.name, selected_conn.name
             )
-            return selected_conn
+            return self._get_or_create_connection(selected_conn.name)
+
+    def _get_or_create_connection(self, conn_name: str) -> "Connection":
+        conn = self._connections.get(conn_name)
+        if conn is None:
+            conn = self._connection_specs[conn_name].create(
+                host=self.host,
+                username=self.username,
+                password=self.password,
+                platform=self.platform,
+            )
+            self._connections[conn_name] = conn
+        conn.last_used = time.monotonic()
+        return conn
+
+    def release_idle_connections(self, idle_timeout: float) -> int:
+        """Drops connections unused for idle_timeout seconds, keeping their specs
+
+        Connections with an open session or a request in progress are kept,
+        open sessions are closed by the session pool when they become idle.
+
+        Returns:
+            number of released connections
+        """
+        now = time.monotonic()
+        idle = [
+            conn_name
+            for conn_name, conn in self._connections.items()
+            if not conn.in_use and now - conn.last_used > idle_timeout
+        ]
+        for conn_name in idle:
+            del self._connections[conn_name]
+        return len(idle)
 
     def create_connection(
         self,
         conn_cls: Type["Connection"],
         conn_name: Optional[str] = None,
         port: Optional[int] = None,
-        **kwargs: Dict[str, Any],
     ) -> None:
         if conn_name is None:
             conn_name = conn_cls.NAME
-        conn = conn_cls(
-            name=conn_name,
-            host=self.host,
-            username=self.username,
-            password=self.password,
-            platform=self.platform,
+        self._connection_specs[conn_name] = ConnectionSpec(
+            cls=conn_cls, name=conn_name, priority=conn_cls.PRIORITY, port=port
         )
-        self._connections[conn_name] = conn
-
-    async def get_data(self, key: str, **kwargs: Dict[str, Any]) -> Any:
-        """ TODO: implement proper retry mechanism with max number of attempts """
-        defined_connections = set(self.get_conn_and_handlers(key).keys())
-        conn = self.get_connection(allowed_connections=defined_connections)
-        try:
-            result = await conn.parse(key, **kwargs)
-            return result
-        except ConnectionError:
-            conn = self.get_connection(
-                allowed_connections=defined_connections,
-                excluded_connections={conn.name},
+        self._connections.pop(conn_name, None)
+
+    async def get_data(
+        self, key: str, force_refresh: bool = False, **kwargs: Dict[str, Any]
+    ) -> Any:
+        """Retrieves data from the device, serving it from the cache if possible
+
+        Args:
+            key: type of requested information as described in handlers.py
+            force_refresh: bypass the cache and query the device. Default: False
+            **kwargs: keyword arguments passed to the handlers
+
+        Returns:
+            parsed data
+        """
+        return await self.cache.get_or_fetch(
+            key,
+            lambda: self.inflight.do(
+                make_request_key(key, kwargs), lambda: self.fetch_data(key, **kwargs)
+            ),
+            force_refresh=force_refresh,
+            **kwargs,
+        )
+
+    async def fetch_data(self, key: str, **kwargs: Dict[str, Any]) -> Any:
+        """Retrieves data over the transport expected to be the fastest
+
+        If it fails, the remaining transports defined for the key are tried in
+        the order chosen by the transport selector.
+        """
+        defined_connections = registry.get_transports(key, self.platform)
+        specs = transport_selector.order(
+            self.name,
+            key,
+            [self._connection_specs[conn_name] for conn_name in defined_connections],
+        )
+        if not specs:
+            raise ValueError(f"Device {self.name!r}, a connection was not selected")
+        for spec in specs[:-1]:
+            conn = self._get_or_create_connection(spec.name)
+            try:
+                return await self._parse(conn, key, **kwargs)
+            except Exception as e:
+                logger.warning(
+                    "Device %r, %r over %s failed, trying another connection: %r",
+                    self.name,
+                    key,
+                    conn.name,
+                    e,
+                )
+        conn = self._get_or_create_connection(specs[-1].name)
+        return await self._parse(conn, key, **kwargs)
+
+    async def _parse(
+        self, conn: "Connection", key: str, **kwargs: Dict[str, Any]
+    ) -> Any:
+        """Parses the key over the connection once the scheduler grants a slot
+
+        Latency and the outcome are reported to the transport selector.
+        """
+        async with scheduler.slot(site=self.site, transport=conn.name):
+            start = time.monotonic()
+            try:
+                result = await conn.parse(key, **kwargs)
+            except Exception:
+                transport_selector.record_failure(self.name, conn.name, key)
+                raise
+            transport_selector.record_success(
+                self.name, conn.name, key, time.monotonic() - start
             )
-            result = await conn.parse(key, **kwargs)
             return result
 
-    def get_conn_and_handlers(self, key: str) -> Dict[str, Any]:
-        return HANDLERS[key][self.platform]
+    async def get_data_batch(
+        self, keys: Sequence[str], force_refresh: bool = False
+    ) -> Dict[str, Any]:
+        """Retrieves several keys from the device at once
+
+        Keys which are not cached are requested over one connection supporting
+        all of them, e.g. as one SSH command batch. Keys which failed there are
+        retried one by one with get_data, so every transport is still tried.
+
+        Returns:
+            results by key, a failed key has the exception as its result
+        """
+        results: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            entry = None if force_refresh else self.cache.get_fresh(key)
+            if entry is None:
+                missing.append(key)
+            else:
+                results[key] = entry.value
+
+        conn = self._select_batch_connection(missing) if len(missing) > 1 else None
+        if conn is not None:
+            try:
+                batch_results = await self._parse_many(conn, missing)
+            except Exception as e:
+                logger.warning(
+                    "Device %r, batch of %r over %s failed: %r",
+                    self.name,
+                    missing,
+                    conn.name,
+                    e,
+                )
+            else:
+                for key, result in batch_results.items():
+                    if not isinstance(result, Exception):
+                        self.cache.set(key, result)
+                        results[key] = result
+
+        remaining = [key for key in missing if key not in results]
+        remaining_results = await asyncio.gather(
+            *(self.get_data(key, force_refresh=force_refresh) for key in remaining),
+            return_exceptions=True,
+        )
+        results.update(zip(remaining, remaining_results))
+        return {key: results[key] for key in keys}
+
+    def _select_batch_connection(self, keys: Sequence[str]) -> Optional["Connection"]:
+        """Returns the best connection supporting all the keys, if any"""
+        transports = registry.get_transports(keys[0], self.platform)
+        common = [
+            transport
+            for transport in transports
+            if all(
+                transport in registry.get_transports(key, self.platform) for key in keys
+            )
+        ]
+        specs = transport_selector.order(
+            self.name, keys[0], [self._connection_specs[name] for name in common]
+        )
+        return self._get_or_create_connection(specs[0].name) if specs else None
+
+    async def _parse_many(
+        self, conn: "Connection", keys: Sequence[str]
+    ) -> Dict[str, Any]:
+        async with scheduler.slot(site=self.site, transport=conn.name):
+            start = time.monotonic()
+            try:
+                results = await conn.parse_many(keys)
+            except Exception:
+                for key in keys:
+                    transport_selector.record_failure(self.name, conn.name, key)
+                raise
+            elapsed = time.monotonic() - start
+            for key, result in results.items():
+                if isinstance(result, Exception):
+                    transport_selector.record_failure(self.name, conn.name, key)
+                else:
+                    transport_selector.record_success(
+                        self.name, conn.name, key, elapsed
+                    )
+            return results
 
     async def get_config(self, conn_name: str) -> Dict[str, str]:
         conn = self.get_connection(conn_name)
         if conn_name == "ssh":
-            result = await conn.parse("cfg")
+            result = await self._parse(conn, "cfg")
         elif conn_name == "restconf":
-            restconf_cfg = await conn.parse("cfg")
+            restconf_cfg = await self._parse(conn, "cfg")
             result = {"cfg": restconf_cfg}
         else:
             conn_ = cast("NETCONF", conn)
-            await conn_.raise_for_error()
-            nc_response = await conn_.connection.get_config()
-            result = {"cfg": nc_response.result}
+            async with scheduler.slot(site=self.site, transport=conn_.name):
+                nc_cfg = await conn_.get_config()
+            result = {"cfg": nc_cfg}
+        if config_archive is not None:
+            await config_archive.save(self.name, result["cfg"], conn_name)
         return result
 
+    async def close(self) -> None:
+        """Closes all connections of the device
+
+        Sessions are released through the session pool, so a request in
+        progress is not interrupted and the pool forgets them.
+        """
+        results = await asyncio.gather(
+            *(
+                session_pool.release(conn) if conn.SESSION_BASED else conn.close()
+                for conn in self._connections.values()
+            ),
+            return_exceptions=True,
+        )
+        for conn, result in zip(self._connections.values(), results):
+            if isinstance(result, Exception):
+                logger.debug(
+                    "Device %r, %s connection was not closed cleanly: %r",
+                    self.name,
+                    conn.name,
+                    result,
+                )
+
     @classmethod
     def from_netbox(
         cls, data: Dict[str, Any], connections: Iterable[Type["Connection"]]
@@ -123,6 +359,8 @@ class Device(BaseModel):
             vendor=data["vendor"],
             model=data["model"],
             site=data["site"],
+            netbox_id=data.get("id"),
+            tags=data.get("tags", []),
         )
         # for conn_cls in connections:
         #     device.create_connection(conn_cls)
@@ -0,0 +1,183 @@
+import sys
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from netwarden.inventory.device import Device
+
+INDEXED_FIELDS = ("site", "platform", "vendor", "model")
+# row of a removed device until it is reused
+EMPTY_ROW = 0xFFFFFFFF
+
+
+class Column:
+    """Interned values of a device attribute stored as codes, one per row"""
+
+    def __init__(self) -> None:
+        self.codes = array("I")
+        self.values: List[str] = []
+        self.value_to_code: Dict[str, int] = {}
+        # code -> rows having the value
+        self.rows: List[Set[int]] = []
+
+    def encode(self, value: str) -> int:
+        code = self.value_to_code.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self.value_to_code[value] = code
+            self.rows.append(set())
+        return code
+
+    def set(self, row: int, value: str) -> None:
+        code = self.encode(value)
+        if row == len(self.codes):
+            self.codes.append(code)
+        else:
+            self.codes[row] = code
+        self.rows[code].add(row)
+
+    def clear(self, row: int) -> None:
+        self.rows[self.codes[row]].discard(row)
+        self.codes[row] = EMPTY_ROW
+
+    def get(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def lookup(self, value: str) -> Set[int]:
+        code = self.value_to_code.get(value)
+        return self.rows[code] if code is not None else set()
+
+    def counts(self) -> Dict[str, int]:
+        return {value: len(rows) for value, rows in zip(self.values, self.rows) if rows}
+
+
+class InventoryIndex:
+    """Secondary indexes of the inventory on site, platform, vendor, model and tags
+
+    Every device gets a row, its attributes are stored in compact columns of
+    interned values with a set of rows per value. Selecting devices intersects
+    the row sets, starting with the smallest one, so it does not touch devices
+    which do not match. Rows of removed devices are reused.
+    """
+
+    def __init__(self, devices: Iterable["Device"] = ()) -> None:
+        self._names: List[Optional[str]] = []
+        self._name_to_row: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._columns = {field: Column() for field in INDEXED_FIELDS}
+        self._tag_rows: Dict[str, Set[int]] = {}
+        self._row_tags: Dict[int, Tuple[str, ...]] = {}
+        self._netbox_id_to_name: Dict[int, str] = {}
+        self._row_netbox_id: Dict[int, int] = {}
+        # rows in the order of device names, rebuilt after changes
+        self._sorted_rows: Optional[List[int]] = None
+        for device in devices:
+            self.add(device)
+
+    def __len__(self) -> int:
+        return len(self._name_to_row)
+
+    def add(self, device: "Device") -> None:
+        """Adds the device or updates the row of the device with the same name"""
+        self.remove(device.name)
+        row = self._free_rows.pop() if self._free_rows else len(self._names)
+        name = sys.intern(device.name)
+        if row == len(self._names):
+            self._names.append(name)
+        else:
+            self._names[row] = name
+        self._name_to_row[name] = row
+        for field, column in self._columns.items():
+            column.set(row, getattr(device, field))
+        tags = tuple(sys.intern(tag) for tag in device.tags)
+        if tags:
+            self._row_tags[row] = tags
+            for tag in tags:
+                self._tag_rows.setdefault(tag, set()).add(row)
+        if device.netbox_id is not None:
+            self._netbox_id_to_name[device.netbox_id] = name
+            self._row_netbox_id[row] = device.netbox_id
+        self._sorted_rows = None
+
+    def remove(self, device_name: str) -> None:
+        row = self._name_to_row.pop(device_name, None)
+        if row is None:
+            return
+        for column in self._columns.values():
+            column.clear(row)
+        for tag in self._row_tags.pop(row, ()):
+            tag_rows = self._tag_rows[tag]
+            tag_rows.discard(row)
+            if not tag_rows:
+                del self._tag_rows[tag]
+        netbox_id = self._row_netbox_id.pop(row, None)
+        if netbox_id is not None:
+            self._netbox_id_to_name.pop(netbox_id, None)
+        self._names[row] = None
+        self._free_rows.append(row)
+        self._sorted_rows = None
+
+    def get_name_by_netbox_id(self, netbox_id: int) -> Optional[str]:
+        return self._netbox_id_to_name.get(netbox_id)
+
+    def select(
+        self,
+        names: Optional[Iterable[str]] = None,
+        site: Optional[str] = None,
+        platform: Optional[str] = None,
+        vendor: Optional[str] = None,
+        model: Optional[str] = None,
+        tags: Sequence[str] = (),
+    ) -> List[str]:
+        """Returns names of the devices matching all criteria, sorted by name
+
+        Args:
+            names: only these devices, unknown names are ignored
+            site, platform, vendor, model: exact value of the attribute
+            tags: devices having all the tags
+        """
+        candidates: List[Set[int]] = []
+        if names is not None:
+            candidates.append(
+                {self._name_to_row[name] for name in names if name in self._name_to_row}
+            )
+        for field, value in zip(INDEXED_FIELDS, (site, platform, vendor, model)):
+            if value is not None:
+                candidates.append(self._columns[field].lookup(value))
+        for tag in tags:
+            candidates.append(self._tag_rows.get(tag, set()))
+        if not candidates:
+            return [self._names[row] for row in self.sorted_rows]  # type: ignore
+
+        candidates.sort(key=len)
+        rows = set(candidates[0])
+        for other in candidates[1:]:
+            if not rows:
+                break
+            rows &= other
+        return sorted(self._names[row] for row in rows)  # type: ignore
+
+    @property
+    def sorted_rows(self) -> List[int]:
+        if self._sorted_rows is None:
+            self._sorted_rows = sorted(
+                self._name_to_row.values(), key=self._names.__getitem__
+            )
+        return self._sorted_rows
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """Returns number of devices per value of the field, e.g. per site"""
+        if field == "tags":
+            return {tag: len(rows) for tag, rows in self._tag_rows.items()}
+        return self._columns[field].counts()
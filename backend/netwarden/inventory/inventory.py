@@ -1,35 +1,129 @@
+import asyncio
 import logging
-from typing import Dict, List, Any, TYPE_CHECKING, ValuesView
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Any,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TYPE_CHECKING,
+    ValuesView,
+)
 
 from netwarden.inventory.device import Device
+from netwarden.inventory.index import InventoryIndex
 from netwarden.connections.restconf.connection import RESTCONF
 from netwarden.connections.ssh.connection import SSH
 from netwarden.connections.netconf.connection import NETCONF
 
 if TYPE_CHECKING:
+    from netwarden.connections.base import Connection
     from netwarden.netbox import NetBox
 
 logger = logging.getLogger(__name__)
 
 CONNECTIONS = [RESTCONF, SSH, NETCONF]
+DEFAULT_CONNECTION_IDLE_TIMEOUT = 900.0
+
+
+class InventoryChanges(NamedTuple):
+    added: List[Device]
+    updated: List[Device]
+    removed: List[Device]
+    # previous versions of the updated devices
+    replaced: List[Device]
+
+    @property
+    def stale(self) -> List[Device]:
+        """Devices which are no longer in the inventory and should be closed"""
+        return [*self.removed, *self.replaced]
 
 
 class Inventory:
-    def __init__(self, devices: Dict[str, Device] = None) -> None:
+    def __init__(
+        self,
+        devices: Dict[str, Device] = None,
+        connection_idle_timeout: float = DEFAULT_CONNECTION_IDLE_TIMEOUT,
+    ) -> None:
         if devices is None:
             devices = {}
         self.name_to_device = devices
+        self.index = InventoryIndex(self.devices)
         for device in self.devices:
-            for conn_cls in CONNECTIONS:
-                device.create_connection(conn_cls)
+            self._create_connections(device)
+        # seconds after which unused connection objects are released, 0 - never
+        self.connection_idle_timeout = connection_idle_timeout
+        self._release_task: Optional["asyncio.Task[None]"] = None
+
+    @staticmethod
+    def _create_connections(device: Device) -> None:
+        for conn_cls in CONNECTIONS:
+            device.create_connection(conn_cls)
 
     def get_device(self, device_name: str) -> Device:
         return self.name_to_device[device_name]
 
+    def get_site(self, device_name: str) -> Optional[str]:
+        """Returns site of the device, None if it is not in the inventory"""
+        device = self.name_to_device.get(device_name)
+        return device.site if device is not None else None
+
     def add_device(self, device: Device, force: bool = False) -> None:
         if not force and device.name in self.name_to_device:
             raise ValueError(f"Device {device.name} already exists in the inventory")
         self.name_to_device[device.name] = device
+        self.index.add(device)
+
+    def remove_device(self, device_name: str) -> Device:
+        device = self.name_to_device.pop(device_name)
+        self.index.remove(device_name)
+        return device
+
+    def get_device_by_netbox_id(self, netbox_id: int) -> Optional[Device]:
+        device_name = self.index.get_name_by_netbox_id(netbox_id)
+        if device_name is None:
+            return None
+        return self.name_to_device.get(device_name)
+
+    def apply_devices(
+        self, devices: Iterable[Device], prune: bool = False
+    ) -> InventoryChanges:
+        """Adds new devices and replaces the changed ones in place
+
+        Devices with unchanged data are kept as they are, together with their
+        open sessions and cached results. Devices renamed in NetBox are matched
+        by netbox_id.
+
+        Args:
+            devices: devices without connections, e.g. from Device.from_netbox
+            prune: remove devices which are not in devices. Default: False
+        """
+        changes = InventoryChanges(added=[], updated=[], removed=[], replaced=[])
+        seen = set()
+        for device in devices:
+            seen.add(device.name)
+            old_device = self.name_to_device.get(device.name)
+            if old_device is None and device.netbox_id is not None:
+                old_device = self.get_device_by_netbox_id(device.netbox_id)
+                if old_device is not None:
+                    self.remove_device(old_device.name)
+            if old_device is not None and old_device.dict() == device.dict():
+                continue
+            self._create_connections(device)
+            self.add_device(device, force=True)
+            if old_device is None:
+                changes.added.append(device)
+            else:
+                changes.updated.append(device)
+                changes.replaced.append(old_device)
+        if prune:
+            missing = [name for name in self.name_to_device if name not in seen]
+            for device_name in missing:
+                changes.removed.append(self.remove_device(device_name))
+        return changes
 
     def __contains__(self, obj):
         if isinstance(obj, Device):
@@ -47,6 +141,78 @@ class Inventory:
     def devices(self) -> ValuesView[Device]:
         return self.name_to_device.values()
 
+    def select(
+        self,
+        names: Optional[Iterable[str]] = None,
+        site: Optional[str] = None,
+        platform: Optional[str] = None,
+        vendor: Optional[str] = None,
+        model: Optional[str] = None,
+        tags: Sequence[str] = (),
+    ) -> List[Device]:
+        """Returns devices matching all given criteria sorted by name
+
+        Unknown names are ignored, see InventoryIndex.select.
+        """
+        device_names = self.index.select(
+            names=names,
+            site=site,
+            platform=platform,
+            vendor=vendor,
+            model=model,
+            tags=tags,
+        )
+        return [self.name_to_device[name] for name in device_names]
+
+    @property
+    def session_connections(self) -> Iterator["Connection"]:
+        """Connections which keep a session open: SSH and NETCONF
+
+        The connections are created if they were not used yet.
+        """
+        for device in self.devices:
+            for spec in device.connection_specs:
+                if spec.cls.SESSION_BASED:
+                    yield device.get_connection(spec.name)
+
+    def release_idle_connections(self) -> int:
+        """Releases connection objects which were not used recently
+
+        Returns:
+            number of released connections
+        """
+        released = sum(
+            device.release_idle_connections(self.connection_idle_timeout)
+            for device in self.devices
+        )
+        if released:
+            logger.debug("%d idle connections released", released)
+        return released
+
+    def start(self) -> None:
+        """Starts releasing idle connections periodically"""
+        if self._release_task is None and self.connection_idle_timeout > 0:
+            self._release_task = asyncio.create_task(self._release_periodically())
+
+    async def _release_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.connection_idle_timeout / 2)
+            try:
+                self.release_idle_connections()
+            except Exception:
+                logger.error("Idle connections were not released", exc_info=True)
+
+    async def close(self) -> None:
+        """Closes connections of all devices"""
+        if self._release_task is not None:
+            self._release_task.cancel()
+            try:
+                await self._release_task
+            except asyncio.CancelledError:
+                pass
+            self._release_task = None
+        await asyncio.gather(*(device.close() for device in self.devices))
+
     @classmethod
     def from_netbox_devices_list(cls, devices: List[Dict[str, Any]]) -> "Inventory":
         name_to_device: Dict[str, Device] = {}
@@ -58,12 +224,8 @@ class Inventory:
 
     @classmethod
     async def fetch_from_netbox(cls, netbox: "NetBox") -> "Inventory":
-        # devices_coro = netbox.devices.list()
-        # secrets_coro = netbox.secrets.list()
-        # results = await asyncio.gather(devices_coro, secrets_coro)
-        # devices_data, secrets_data = results
-        devices_data = await netbox.devices.list()
-        devices = netbox.parse_devices(devices=devices_data, secrets=[])
+        devices_data, secrets_data = await netbox.fetch_devices_and_secrets()
+        devices = netbox.parse_devices(devices=devices_data, secrets=secrets_data)
         inventory = cls.from_netbox_devices_list(devices)
         logger.info("%d devices imported from netbox", len(inventory))
         return inventory
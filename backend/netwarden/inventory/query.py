@@ -0,0 +1,168 @@
+import base64
+import json
+from operator import attrgetter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from netwarden.inventory.index import INDEXED_FIELDS
+
+if TYPE_CHECKING:
+    from netwarden.inventory.device import Device
+    from netwarden.inventory.inventory import Inventory
+
+SORTABLE_FIELDS = ("name", *INDEXED_FIELDS)
+DEFAULT_SORT = "name"
+
+
+class SortField(NamedTuple):
+    name: str
+    descending: bool = False
+
+
+def parse_sort(spec: str) -> List[SortField]:
+    """Parses comma-separated field names, "-" before the name reverses the order
+
+    Name is added as the last field, so the order is always unambiguous.
+
+    Raises:
+        ValueError: if a field can't be sorted by
+    """
+    sort_fields = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        descending = item.startswith("-")
+        name = item.lstrip("-")
+        if name not in SORTABLE_FIELDS:
+            raise ValueError(f"Can't sort by {name!r}, allowed: {SORTABLE_FIELDS}")
+        sort_fields.append(SortField(name, descending))
+    if all(sort_field.name != "name" for sort_field in sort_fields):
+        sort_fields.append(SortField("name"))
+    return sort_fields
+
+
+def sort_devices(devices: List["Device"], sort_fields: Sequence[SortField]) -> None:
+    """Sorts devices in place, the sort is stable so it is done field by field"""
+    for sort_field in reversed(sort_fields):
+        devices.sort(key=attrgetter(sort_field.name), reverse=sort_field.descending)
+
+
+def _compare(
+    values: Tuple[str, ...], other: Tuple[str, ...], sort_fields: Sequence[SortField]
+) -> int:
+    for value, other_value, sort_field in zip(values, other, sort_fields):
+        if value != other_value:
+            is_less = value < other_value
+            return -1 if is_less != sort_field.descending else 1
+    return 0
+
+
+class Cursor(NamedTuple):
+    """Position after the last device of a page
+
+    Unlike an offset, it stays correct when devices are added or removed
+    before it between the requests.
+    """
+
+    sort: str
+    values: Tuple[str, ...]
+
+    @classmethod
+    def after(cls, device: "Device", sort_fields: Sequence[SortField]) -> "Cursor":
+        return cls(
+            sort=format_sort(sort_fields),
+            values=tuple(getattr(device, field.name) for field in sort_fields),
+        )
+
+    def encode(self) -> str:
+        data = json.dumps([self.sort, self.values]).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "Cursor":
+        """Raises ValueError if the cursor is malformed"""
+        try:
+            sort, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from e
+        if (
+            not isinstance(sort, str)
+            or not isinstance(values, list)
+            or not all(isinstance(value, str) for value in values)
+            or len(values) != len(parse_sort(sort))
+        ):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        return cls(sort=sort, values=tuple(values))
+
+    def position(
+        self, devices: Sequence["Device"], sort_fields: Sequence[SortField]
+    ) -> int:
+        """Returns the index of the first device after the cursor"""
+        if self.sort != format_sort(sort_fields):
+            raise ValueError("Cursor was created for another sort order")
+        low, high = 0, len(devices)
+        while low < high:
+            middle = (low + high) // 2
+            values = tuple(getattr(devices[middle], f.name) for f in sort_fields)
+            if _compare(values, self.values, sort_fields) <= 0:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+def format_sort(sort_fields: Sequence[SortField]) -> str:
+    return ",".join(
+        f"-{field.name}" if field.descending else field.name for field in sort_fields
+    )
+
+
+class DevicePage(NamedTuple):
+    devices: List["Device"]
+    total: int
+    next_cursor: Optional[str]
+
+
+def get_device_page(
+    inventory: "Inventory",
+    filters: Optional[Dict[str, Any]] = None,
+    sort: str = DEFAULT_SORT,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> DevicePage:
+    """Returns one page of devices matching the filters
+
+    Args:
+        inventory: inventory to query
+        filters: keyword arguments of Inventory.select
+        sort: see parse_sort. Default: "name"
+        offset: number of devices to skip, after the cursor if given
+        limit: size of the page. Default: None, all remaining devices
+        cursor: next_cursor of the previous page
+
+    Raises:
+        ValueError: if the sort or the cursor is invalid
+    """
+    sort_fields = parse_sort(sort)
+    devices = inventory.select(**(filters or {}))
+    if [field.name for field in sort_fields] != ["name"] or sort_fields[0].descending:
+        sort_devices(devices, sort_fields)
+    start = offset
+    if cursor is not None:
+        start += Cursor.decode(cursor).position(devices, sort_fields)
+    end = len(devices) if limit is None else min(start + limit, len(devices))
+    page = devices[start:end]
+    next_cursor = None
+    if page and end < len(devices):
+        next_cursor = Cursor.after(page[-1], sort_fields).encode()
+    return DevicePage(devices=page, total=len(devices), next_cursor=next_cursor)
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Union
+
+from netwarden.config import settings
+from netwarden.netbox import CRYPTOGRAPHY_AVAILABLE, make_fernet
+
+try:
+    from cryptography.fernet import InvalidToken
+except ImportError:
+    pass
+
+if TYPE_CHECKING:
+    from netwarden.connections.restconf.transport import RESTCONFTransport
+    from netwarden.connections.selector import TransportSelector
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 3
+DEFAULT_SNAPSHOT_FILE = ".inventory_snapshot.json"
+CREDENTIAL_FIELDS = ("username", "password")
+
+
+class InventorySnapshot(NamedTuple):
+    """State needed to serve requests right after a restart
+
+    devices are normalized device dicts as returned by NetBox.parse_devices,
+    transport_stats are learned by the transport selector, see its dump method
+    """
+
+    devices: List[Dict[str, Any]]
+    restconf_roots: Dict[str, str]
+    transport_stats: Dict[str, Dict[str, Dict[str, Any]]]
+    created_at: float  # UNIX timestamp
+
+    @classmethod
+    def create(
+        cls,
+        devices: List[Dict[str, Any]],
+        restconf_transport: "RESTCONFTransport",
+        transport_selector: "TransportSelector",
+    ) -> "InventorySnapshot":
+        return cls(
+            devices=devices,
+            restconf_roots=dict(restconf_transport.roots),
+            transport_stats=transport_selector.dump(),
+            created_at=time.time(),
+        )
+
+    def apply(
+        self,
+        restconf_transport: "RESTCONFTransport",
+        transport_selector: "TransportSelector",
+    ) -> None:
+        """Restores RESTCONF roots and transport statistics"""
+        for host, root in self.restconf_roots.items():
+            restconf_transport.set_root(host, root)
+        transport_selector.load(self.transport_stats)
+
+
+class SnapshotFile:
+    """Stores the inventory snapshot as JSON in a local file
+
+    With the NetBox private key, device credentials come from NetBox secrets
+    and the file is encrypted with the key, the same way as the cached session
+    key (see SessionKeyCache). Without it every device uses the default
+    credentials from the settings, so they are left out of the file and filled
+    in on load. The file is only readable by the owner and is replaced
+    atomically, so a crash while saving keeps the previous one.
+    """
+
+    def __init__(
+        self, path: Union[str, Path], private_key: Optional[str] = None
+    ) -> None:
+        self.path = Path(path)
+        self._fernet = make_fernet(private_key) if private_key else None
+
+    @classmethod
+    def from_settings(
+        cls, private_key: Optional[str] = None
+    ) -> Optional["SnapshotFile"]:
+        if not settings.get("snapshot.enabled", False):
+            return None
+        if private_key and not CRYPTOGRAPHY_AVAILABLE:
+            logger.warning(
+                "cryptography package is not installed, "
+                "inventory snapshot will not be saved"
+            )
+            return None
+        return cls(
+            settings.get("snapshot.path", DEFAULT_SNAPSHOT_FILE),
+            private_key=private_key,
+        )
+
+    def save(self, snapshot: InventorySnapshot) -> None:
+        data = {"version": SNAPSHOT_FORMAT_VERSION, **snapshot._asdict()}
+        if self._fernet is None:
+            data["devices"] = [
+                {
+                    key: value
+                    for key, value in device.items()
+                    if key not in CREDENTIAL_FIELDS
+                }
+                for device in snapshot.devices
+            ]
+        content = json.dumps(data).encode()
+        if self._fernet is not None:
+            content = self._fernet.encrypt(content)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> Optional[InventorySnapshot]:
+        try:
+            content = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.warning("Inventory snapshot %s is unreadable", self.path)
+            return None
+        if self._fernet is not None:
+            try:
+                content = self._fernet.decrypt(content)
+            except InvalidToken:
+                logger.warning(
+                    "Inventory snapshot %s is not encrypted with the private key",
+                    self.path,
+                )
+                return None
+        try:
+            data = json.loads(content)
+        except ValueError:
+            logger.warning("Inventory snapshot %s is unreadable", self.path)
+            return None
+        if data.pop("version", None) != SNAPSHOT_FORMAT_VERSION:
+            logger.warning("Inventory snapshot %s has unknown format", self.path)
+            return None
+        if self._fernet is None:
+            for device in data.get("devices", []):
+                device.setdefault("username", settings["device.username"])
+                device.setdefault("password", settings["device.password"])
+        try:
+            return InventorySnapshot(**data)
+        except TypeError:
+            logger.warning("Inventory snapshot %s is incomplete", self.path)
+            return None
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from netwarden.config import settings
+from netwarden.connections.restconf.transport import restconf_transport
+from netwarden.connections.selector import transport_selector
+from netwarden.inventory.device import Device
+from netwarden.inventory.inventory import CONNECTIONS, Inventory
+from netwarden.inventory.snapshot import InventorySnapshot, SnapshotFile
+
+if TYPE_CHECKING:
+    from netwarden.netbox import NetBox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 300.0
+DEFAULT_FULL_SYNC_INTERVAL = 86400.0
+# changes are requested a bit earlier than the previous sync to tolerate clock
+# skew between NetBox and netwarden, applying a change twice is harmless
+SYNC_OVERLAP = timedelta(seconds=60)
+# devices requested by id at once, every id makes the URL longer
+MAX_IDS_PER_REQUEST = 100
+
+
+class SyncResult(NamedTuple):
+    full: bool
+    added: List[str]
+    updated: List[str]
+    removed: List[str]
+    elapsed: float
+
+    def dump(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+class NetBoxSync:
+    """Keeps the inventory in sync with NetBox
+
+    The first sync downloads all devices. The following ones only request
+    devices updated since the previous sync (last_updated__gte) and devices
+    deleted since then according to the NetBox changelog, and apply them to the
+    existing inventory. A full sync still happens every full_sync_interval
+    seconds to catch anything the changelog missed.
+
+    After every sync the inventory is saved to the snapshot file, if any. At
+    startup the inventory can be restored from it without waiting for NetBox
+    and revalidated with a full sync in the background.
+    """
+
+    def __init__(
+        self,
+        netbox: "NetBox",
+        inventory: Inventory,
+        interval: float = DEFAULT_INTERVAL,
+        full_sync_interval: float = DEFAULT_FULL_SYNC_INTERVAL,
+        snapshot_file: Optional[SnapshotFile] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.netbox = netbox
+        self.inventory = inventory
+        self.interval = interval
+        self.full_sync_interval = full_sync_interval
+        self.snapshot_file = snapshot_file
+        self.clock = clock
+
+        self.last_sync: Optional[datetime] = None
+        self.last_result: Optional[SyncResult] = None
+        self._last_full_sync: Optional[float] = None
+        self._device_id_to_login_creds: Dict[int, Dict[str, str]] = {}
+        # normalized device dicts by NetBox id, kept for the snapshot
+        self._device_data: Dict[Any, Dict[str, Any]] = {}
+        self.restored_at: Optional[float] = None
+        self._listeners: List[Callable[[SyncResult], None]] = []
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @classmethod
+    def from_settings(cls, netbox: "NetBox", inventory: Inventory) -> "NetBoxSync":
+        return cls(
+            netbox=netbox,
+            inventory=inventory,
+            interval=settings.get("netbox_sync.interval", DEFAULT_INTERVAL),
+            full_sync_interval=settings.get(
+                "netbox_sync.full_sync_interval", DEFAULT_FULL_SYNC_INTERVAL
+            ),
+            snapshot_file=SnapshotFile.from_settings(private_key=netbox.private_key),
+        )
+
+    def add_listener(self, listener: Callable[[SyncResult], None]) -> None:
+        """Calls the listener with the result of every sync"""
+        self._listeners.append(listener)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # first used by sync(), inside the loop that runs the sync task
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def start(self, sync_now: bool = False, periodic: bool = True) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(sync_now, periodic))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, sync_now: bool, periodic: bool) -> None:
+        if sync_now:
+            await self._sync_logged()
+        while periodic or self.last_sync is None:
+            await asyncio.sleep(self.interval)
+            await self._sync_logged()
+
+    async def _sync_logged(self) -> None:
+        try:
+            await self.sync()
+        except Exception:
+            logger.error("NetBox sync failed", exc_info=True)
+
+    def restore(self) -> bool:
+        """Fills the inventory from the snapshot file
+
+        Returns:
+            True if the snapshot was loaded
+        """
+        if self.snapshot_file is None:
+            return False
+        snapshot = self.snapshot_file.load()
+        if snapshot is None:
+            return False
+        devices = self._parse_normalized_devices(snapshot.devices)
+        changes = self.inventory.apply_devices(devices, prune=True)
+        snapshot.apply(restconf_transport, transport_selector)
+        self.restored_at = snapshot.created_at
+        logger.info(
+            "%d devices restored from the snapshot of %s",
+            len(changes.added),
+            datetime.fromtimestamp(snapshot.created_at, timezone.utc).isoformat(),
+        )
+        return True
+
+    async def save_snapshot(self) -> None:
+        if self.snapshot_file is None:
+            return
+        snapshot = InventorySnapshot.create(
+            list(self._device_data.values()), restconf_transport, transport_selector
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.snapshot_file.save, snapshot)
+        except OSError:
+            logger.warning(
+                "Inventory snapshot was not saved to %s",
+                self.snapshot_file.path,
+                exc_info=True,
+            )
+
+    def _is_full_sync_due(self) -> bool:
+        return (
+            self.last_sync is None
+            or self._last_full_sync is None
+            or self.clock() - self._last_full_sync >= self.full_sync_interval
+        )
+
+    async def sync(self, full: bool = False) -> SyncResult:
+        """Applies changes from NetBox to the inventory
+
+        Args:
+            full: download all devices even if deltas could be used. Default: False
+        """
+        async with self.lock:
+            start = time.monotonic()
+            started_at = datetime.now(timezone.utc)
+            full = full or self._is_full_sync_due()
+            if full:
+                devices_data, secrets = await self.netbox.fetch_devices_and_secrets()
+                self._device_id_to_login_creds = (
+                    self.netbox.build_device_id_to_login_creds(secrets)
+                )
+                self._device_data = {}
+                devices = self._parse_devices(devices_data)
+                changes = self.inventory.apply_devices(devices, prune=True)
+            else:
+                assert self.last_sync is not None
+                since = (self.last_sync - SYNC_OVERLAP).isoformat()
+                devices_data, deleted_data = await self._fetch_deltas(since)
+                devices = self._parse_devices(devices_data)
+                changes = self.inventory.apply_devices(devices)
+                for change in deleted_data:
+                    device = self.inventory.get_device_by_netbox_id(
+                        change["changed_object_id"]
+                    )
+                    self._device_data.pop(change["changed_object_id"], None)
+                    if device is not None:
+                        self.inventory.remove_device(device.name)
+                        changes.removed.append(device)
+
+            await asyncio.gather(*(device.close() for device in changes.stale))
+            for device in changes.removed:
+                transport_selector.remove_device(device.name)
+            self.last_sync = started_at
+            if full:
+                self._last_full_sync = self.clock()
+            result = SyncResult(
+                full=full,
+                added=[device.name for device in changes.added],
+                updated=[device.name for device in changes.updated],
+                removed=[device.name for device in changes.removed],
+                elapsed=time.monotonic() - start,
+            )
+            self.last_result = result
+            for listener in self._listeners:
+                listener(result)
+            await self.save_snapshot()
+            if full or changes.added or changes.updated or changes.removed:
+                logger.info(
+                    "NetBox %s sync: %d added, %d updated, %d removed in %.2fs",
+                    "full" if full else "delta",
+                    len(result.added),
+                    len(result.updated),
+                    len(result.removed),
+                    result.elapsed,
+                )
+            return result
+
+    async def _fetch_deltas(
+        self, since: str
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Returns devices updated and deleted since the timestamp
+
+        Devices whose login credentials changed are fetched as well, even if the
+        devices themselves did not change.
+        """
+        coros: List[Awaitable[List[Dict[str, Any]]]] = [
+            self.netbox.devices.list(last_updated__gte=since),
+            self.netbox.object_changes.list_deleted_devices(since),
+        ]
+        if self.netbox.private_key:
+            coros.append(self.netbox.secrets.list(last_updated__gte=since))
+        devices_data, deleted_data, *secrets = await asyncio.gather(*coros)
+        if secrets:
+            login_creds = self.netbox.build_device_id_to_login_creds(secrets[0])
+            self._device_id_to_login_creds.update(login_creds)
+            missing_ids = login_creds.keys() - {device["id"] for device in devices_data}
+            if missing_ids:
+                devices_data += await self._fetch_devices_by_ids(sorted(missing_ids))
+        return devices_data, deleted_data
+
+    async def _fetch_devices_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Requests the devices in chunks of ids concurrently"""
+        chunks = await asyncio.gather(
+            *(
+                self.netbox.devices.list(id=ids[i : i + MAX_IDS_PER_REQUEST])
+                for i in range(0, len(ids), MAX_IDS_PER_REQUEST)
+            )
+        )
+        return [device for chunk in chunks for device in chunk]
+
+    def _parse_devices(self, devices_data: List[Dict[str, Any]]) -> List[Device]:
+        devices = self.netbox.parse_devices(
+            devices=devices_data,
+            device_id_to_login_creds=self._device_id_to_login_creds,
+        )
+        return self._parse_normalized_devices(devices)
+
+    def _parse_normalized_devices(self, devices: List[Dict[str, Any]]) -> List[Device]:
+        for device_data in devices:
+            self._device_data[device_data.get("id") or device_data["name"]] = (
+                device_data
+            )
+        return [
+            Device.from_netbox(device_data, connections=CONNECTIONS)
+            for device_data in devices
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "last_sync": self.last_sync,
+            "restored_at": self.restored_at,
+            "last_result": self.last_result.dump() if self.last_result else None,
+            "devices": len(self.inventory),
+        }
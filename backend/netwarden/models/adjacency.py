@@ -0,0 +1,60 @@
+from array import array
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+
+# (id of one node, id of the other node, id of the edge)
+Edge = Tuple[int, int, int]
+
+
+class Adjacency:
+    """Immutable undirected graph in compressed sparse row (CSR) form
+
+    Nodes are numbered by their position in node_ids. Neighbors of the node
+    with index i are targets[offsets[i]:offsets[i + 1]] and edge_ids holds the
+    id of the edge leading to each of them. Everything is stored in flat
+    arrays, so graphs with 100k links take a few megabytes and are traversed
+    without hashing node objects.
+    """
+
+    __slots__ = ("node_ids", "index", "offsets", "targets", "edge_ids")
+
+    def __init__(self, node_ids: Sequence[int], edges: Iterable[Edge]) -> None:
+        self.node_ids = array("q", node_ids)
+        self.index: Dict[int, int] = {
+            node_id: i for i, node_id in enumerate(self.node_ids)
+        }
+        pairs = [(self.index[a], self.index[b], edge_id) for a, b, edge_id in edges]
+
+        offsets = array("I", bytes(4 * (len(self.node_ids) + 1)))
+        for a, b, _ in pairs:
+            offsets[a + 1] += 1
+            offsets[b + 1] += 1
+        for i in range(len(self.node_ids)):
+            offsets[i + 1] += offsets[i]
+
+        size = offsets[-1]
+        targets = array("I", bytes(4 * size))
+        edge_ids = array("q", bytes(8 * size))
+        position = offsets[:-1]
+        for a, b, edge_id in pairs:
+            for source, target in ((a, b), (b, a)):
+                targets[position[source]] = target
+                edge_ids[position[source]] = edge_id
+                position[source] += 1
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_ids = edge_ids
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets) // 2
+
+    def degree(self, i: int) -> int:
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def neighbors(self, i: int) -> Iterator[Tuple[int, int]]:
+        """Yields (index of the neighbor, id of the edge) of the node with index i"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(self.targets[start:end], self.edge_ids[start:end])
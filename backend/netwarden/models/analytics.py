@@ -0,0 +1,316 @@
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from netwarden.models.adjacency import Adjacency
+
+DEFAULT_PATH_CACHE_SIZE = 32
+NO_NODE = -1
+
+
+class Path(NamedTuple):
+    node_ids: List[int]
+    edge_ids: List[int]
+
+
+class Removal(NamedTuple):
+    """Components of the network after removing a node or an edge"""
+
+    # node ids of each component which contained a neighbor, largest first
+    components: List[List[int]]
+    # nodes cut off from the largest remaining component
+    isolated: List[int]
+
+
+class TopologyAnalytics:
+    """Graph algorithms over an immutable adjacency snapshot
+
+    Results are computed on first use and kept for the lifetime of the
+    snapshot, so the topology creates new analytics only when its version
+    changes. Connected components, articulation points and bridges take one
+    linear pass each. Shortest paths are answered from BFS trees of the
+    recently used sources.
+    """
+
+    def __init__(
+        self, adjacency: Adjacency, path_cache_size: int = DEFAULT_PATH_CACHE_SIZE
+    ) -> None:
+        self.adjacency = adjacency
+        self.path_cache_size = path_cache_size
+        self._component_of: Optional[array] = None
+        # node ids of every component, by the label in _component_of
+        self._members: List[List[int]] = []
+        self._components: List[List[int]] = []
+        self._articulation_points: Optional[List[int]] = None
+        self._bridges: Optional[List[int]] = None
+        self._cut_node_ids: Set[int] = set()
+        self._bridge_ids: Set[int] = set()
+        self._edge_positions: Optional[Dict[int, int]] = None
+        # source index -> (parent index, parent edge id) of every node
+        self._trees: "OrderedDict[int, Tuple[array, array]]" = OrderedDict()
+
+    def has_node(self, node_id: int) -> bool:
+        return node_id in self.adjacency.index
+
+    @property
+    def components(self) -> List[List[int]]:
+        """Node ids of the connected components, largest first"""
+        self._compute_components()
+        return self._components
+
+    def is_reachable(self, source_id: int, target_id: int) -> bool:
+        """Raises KeyError if a node is not in the topology"""
+        self._compute_components()
+        assert self._component_of is not None
+        source, target = self._index(source_id), self._index(target_id)
+        return self._component_of[source] == self._component_of[target]
+
+    def shortest_path(self, source_id: int, target_id: int) -> Optional[Path]:
+        """Returns path with the least hops, None if the target is unreachable
+
+        Raises:
+            KeyError: if a node is not in the topology
+        """
+        source, target = self._index(source_id), self._index(target_id)
+        if not self.is_reachable(source_id, target_id):
+            return None
+        parents, parent_edges = self._get_tree(source)
+        node_ids = [target_id]
+        edge_ids = []
+        current = target
+        while current != source:
+            edge_ids.append(parent_edges[current])
+            current = parents[current]
+            node_ids.append(self.adjacency.node_ids[current])
+        node_ids.reverse()
+        edge_ids.reverse()
+        return Path(node_ids=node_ids, edge_ids=edge_ids)
+
+    @property
+    def articulation_points(self) -> List[int]:
+        """Ids of the nodes whose failure splits their component"""
+        self._compute_cuts()
+        assert self._articulation_points is not None
+        return self._articulation_points
+
+    @property
+    def bridges(self) -> List[int]:
+        """Ids of the edges whose failure splits their component"""
+        self._compute_cuts()
+        assert self._bridges is not None
+        return self._bridges
+
+    def remove_node(self, node_id: int) -> Removal:
+        """Returns what the component of the node falls apart into without it
+
+        Raises:
+            KeyError: if the node is not in the topology
+        """
+        node = self._index(node_id)
+        self._compute_cuts()
+        if node_id not in self._cut_node_ids:
+            return self._removal_without_split(node, removed_node_id=node_id)
+        starts = [neighbor for neighbor, _ in self.adjacency.neighbors(node)]
+        return self._removal(starts, removed_node=node)
+
+    def remove_edge(self, edge_id: int) -> Removal:
+        """Returns what the component of the edge falls apart into without it
+
+        Raises:
+            KeyError: if the edge is not in the topology
+        """
+        if self._edge_positions is None:
+            self._edge_positions = {
+                other_id: position
+                for position, other_id in enumerate(self.adjacency.edge_ids)
+            }
+        position = self._edge_positions[edge_id]
+        node = self._node_at(position)
+        self._compute_cuts()
+        if edge_id not in self._bridge_ids:
+            return self._removal_without_split(node)
+        return self._removal(
+            [node, self.adjacency.targets[position]], removed_edge=edge_id
+        )
+
+    def _index(self, node_id: int) -> int:
+        return self.adjacency.index[node_id]
+
+    def _node_ids(self, indexes: List[int]) -> List[int]:
+        node_ids = self.adjacency.node_ids
+        return [node_ids[i] for i in indexes]
+
+    def _node_at(self, position: int) -> int:
+        """Returns index of the node owning the position in targets"""
+        offsets = self.adjacency.offsets
+        low, high = 0, len(offsets) - 1
+        while low < high - 1:
+            middle = (low + high) // 2
+            if offsets[middle] <= position:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def _compute_components(self) -> None:
+        if self._component_of is not None:
+            return
+        adjacency = self.adjacency
+        offsets, targets = adjacency.offsets, adjacency.targets
+        component_of = array("i", [NO_NODE]) * len(adjacency)
+        components: List[List[int]] = []
+        for start in range(len(adjacency)):
+            if component_of[start] != NO_NODE:
+                continue
+            label = len(components)
+            component_of[start] = label
+            members = [start]
+            for node in members:  # the list grows while it is iterated, as BFS
+                for position in range(offsets[node], offsets[node + 1]):
+                    neighbor = targets[position]
+                    if component_of[neighbor] == NO_NODE:
+                        component_of[neighbor] = label
+                        members.append(neighbor)
+            components.append(members)
+        self._component_of = component_of
+        self._members = [sorted(self._node_ids(members)) for members in components]
+        self._components = sorted(
+            self._members, key=lambda members: (-len(members), members[0])
+        )
+
+    def _get_tree(self, source: int) -> Tuple[array, array]:
+        tree = self._trees.get(source)
+        if tree is not None:
+            self._trees.move_to_end(source)
+            return tree
+        adjacency = self.adjacency
+        offsets, targets, edge_ids = (
+            adjacency.offsets,
+            adjacency.targets,
+            adjacency.edge_ids,
+        )
+        parents = array("i", [NO_NODE]) * len(adjacency)
+        parent_edges = array("q", [0]) * len(adjacency)
+        parents[source] = source
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[position]
+                if parents[neighbor] == NO_NODE:
+                    parents[neighbor] = node
+                    parent_edges[neighbor] = edge_ids[position]
+                    queue.append(neighbor)
+        tree = (parents, parent_edges)
+        self._trees[source] = tree
+        while len(self._trees) > self.path_cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _compute_cuts(self) -> None:
+        """Finds articulation points and bridges with iterative Tarjan's DFS
+
+        The edge to the parent is skipped by its id, not by the parent node,
+        so parallel links between two nodes are not bridges.
+        """
+        if self._bridges is not None:
+            return
+        adjacency = self.adjacency
+        offsets, targets, edge_ids = (
+            adjacency.offsets,
+            adjacency.targets,
+            adjacency.edge_ids,
+        )
+        discovered = array("i", [NO_NODE]) * len(adjacency)
+        low = array("i", [0]) * len(adjacency)
+        is_cut = bytearray(len(adjacency))
+        bridges = []
+        timer = 0
+        for root in range(len(adjacency)):
+            if discovered[root] != NO_NODE:
+                continue
+            discovered[root] = low[root] = timer
+            timer += 1
+            root_children = 0
+            # node, id of the edge from the parent, next position in targets
+            stack: List[List[int]] = [[root, NO_NODE, offsets[root]]]
+            while stack:
+                frame = stack[-1]
+                node, parent_edge, position = frame
+                if position < offsets[node + 1]:
+                    frame[2] += 1
+                    edge_id = edge_ids[position]
+                    if edge_id == parent_edge:
+                        continue
+                    neighbor = targets[position]
+                    if discovered[neighbor] == NO_NODE:
+                        discovered[neighbor] = low[neighbor] = timer
+                        timer += 1
+                        stack.append([neighbor, edge_id, offsets[neighbor]])
+                    elif discovered[neighbor] < low[node]:
+                        low[node] = discovered[neighbor]
+                    continue
+                stack.pop()
+                if not stack:
+                    break
+                parent = stack[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+                if low[node] > discovered[parent]:
+                    bridges.append(parent_edge)
+                if parent == root:
+                    root_children += 1
+                elif low[node] >= discovered[parent]:
+                    is_cut[parent] = 1
+            if root_children > 1:
+                is_cut[root] = 1
+        self._articulation_points = sorted(
+            adjacency.node_ids[i] for i, cut in enumerate(is_cut) if cut
+        )
+        self._cut_node_ids = set(self._articulation_points)
+        self._bridges = sorted(bridges)
+        self._bridge_ids = set(bridges)
+
+    def _removal_without_split(
+        self, node: int, removed_node_id: Optional[int] = None
+    ) -> Removal:
+        """The component stays connected, it only loses the removed node"""
+        self._compute_components()
+        assert self._component_of is not None
+        members = [
+            node_id
+            for node_id in self._members[self._component_of[node]]
+            if node_id != removed_node_id
+        ]
+        return Removal(components=[members] if members else [], isolated=[])
+
+    def _removal(
+        self,
+        starts: List[int],
+        removed_node: int = NO_NODE,
+        removed_edge: Optional[int] = None,
+    ) -> Removal:
+        adjacency = self.adjacency
+        offsets, targets, edge_ids = (
+            adjacency.offsets,
+            adjacency.targets,
+            adjacency.edge_ids,
+        )
+        seen = {removed_node}
+        components = []
+        for start in starts:
+            if start in seen:
+                continue
+            seen.add(start)
+            members = [start]
+            for node in members:
+                for position in range(offsets[node], offsets[node + 1]):
+                    neighbor = targets[position]
+                    if neighbor not in seen and edge_ids[position] != removed_edge:
+                        seen.add(neighbor)
+                        members.append(neighbor)
+            components.append(sorted(self._node_ids(members)))
+        # largest first, ties are broken by the lowest node id
+        components.sort(key=lambda members: (-len(members), members[0]))
+        isolated = sorted(node_id for members in components[1:] for node_id in members)
+        return Removal(components=components, isolated=isolated)
@@ -1,14 +1,15 @@
 import logging
 from typing import (
     Dict,
+    KeysView,
     List,
     ValuesView,
     Any,
-    Set,
     Iterable,
     NamedTuple,
     Tuple,
 )
+from netwarden.models.adjacency import Adjacency, Edge
 from netwarden.models.node import Node
 from netwarden.models.link import Link
 
@@ -23,7 +24,10 @@ class LLDPNeighborInterface(NamedTuple):
 class Graph:
     def __init__(self):
         self.name_to_node: Dict[str, Node] = {}
-        self.links: Set["Link"] = set()
+        # link -> its id, ids are unique within the graph and never reused
+        self.link_ids: Dict[Link, int] = {}
+        self._next_node_id = 1
+        self._next_link_id = 1
 
     @classmethod
     def from_lldp_data(
@@ -52,14 +56,29 @@ class Graph:
                 remote_interface = remote_node.get_or_create_interface(
                     lldp_neighbor.interface
                 )
-                link = Link([interface, remote_interface])
-                graph.links.add(link)
+                graph.add_link(Link([interface, remote_interface]))
         return graph
 
     @property
     def nodes(self) -> ValuesView[Node]:
         return self.name_to_node.values()
 
+    @property
+    def links(self) -> KeysView[Link]:
+        return self.link_ids.keys()
+
+    def add_link(self, link: Link) -> int:
+        """Returns id of the link, a new id is assigned if it is not in the graph"""
+        link_id = self.link_ids.get(link)
+        if link_id is None:
+            link_id = self.link_ids[link] = self._next_link_id
+            self._next_link_id += 1
+        return link_id
+
+    def remove_link(self, link: Link) -> int:
+        """Returns id of the removed link, raises KeyError if it is not in the graph"""
+        return self.link_ids.pop(link)
+
     def add_node(self, node) -> None:
         self.name_to_node[node.name] = node
 
@@ -69,16 +88,32 @@ class Graph:
                 if not interface.neighbors:
                     continue
                 link = interface.create_link_from_neighbors()
-                self.links.add(link)
+                self.add_link(link)
 
     def get_or_create_node(self, node_name: str) -> Node:
         node_name = Node.normalize_name(node_name)
         node = self.name_to_node.get(node_name)
         if node is None:
-            node = Node(name=node_name)
+            # ids are unique within the graph and never reused
+            node = Node(name=node_name, id=self._next_node_id)
+            self._next_node_id += 1
             self.add_node(node)
         return node
 
+    def iter_edges(self) -> Iterable[Edge]:
+        """Yields point-to-point links as (node id, node id, link id)"""
+        for link, link_id in self.link_ids.items():
+            if link.is_point_to_point:
+                yield (
+                    link.first_interface.node.id,
+                    link.second_interface.node.id,
+                    link_id,
+                )
+
+    def adjacency(self) -> Adjacency:
+        """Returns compact snapshot of the graph for traversals"""
+        return Adjacency([node.id for node in self.nodes], self.iter_edges())
+
     def dump(self) -> Dict[str, Any]:
         nodes = [{"id": node.id, "label": node.name} for node in self.nodes]
 
@@ -1,5 +1,7 @@
 import re
-from typing import Set, Tuple, TYPE_CHECKING
+import sys
+from functools import lru_cache
+from typing import AbstractSet, Optional, Set, Tuple, TYPE_CHECKING
 
 from netwarden.models.link import Link
 
@@ -24,14 +26,47 @@ NORMALIZED_INTERFACES = (
     "Portchannel",
     "Management",
 )
+# distinct interface names seen in a fabric, e.g. Gi0/1 and GigabitEthernet0/1
+NORMALIZE_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_interface_name(interface_name: str) -> Tuple[str, str]:
+    match = INTERFACE_NAME_RE.search(interface_name)
+    if match:
+        int_type = normalize_interface_type(match.group("interface_type"))
+        int_num = match.group("interface_num")
+        return sys.intern(int_type), sys.intern(int_num)
+    raise ValueError(f"Does not recognize {interface_name} as an interface name")
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def canonical_interface_name(interface_name: str) -> str:
+    """Returns interned normalized name, e.g. GigabitEthernet0/1 for Gi0/1"""
+    return sys.intern("".join(normalize_interface_name(interface_name)))
+
+
+@lru_cache(maxsize=None)
+def normalize_interface_type(interface_type: str) -> str:
+    int_type = interface_type.strip().lower()
+    for norm_int_type in NORMALIZED_INTERFACES:
+        if norm_int_type.lower().startswith(int_type):
+            return norm_int_type
+
+    return int_type
 
 
 class Interface:
+    __slots__ = ("type", "num", "name", "node", "_neighbors", "_hash")
+
     def __init__(self, name: str, node: "Node") -> None:
         self.type, self.num = self.normalize_interface_name(name)
+        self.name = canonical_interface_name(name)
         self.node = node
         # self.device_name = device_name
-        self.neighbors: Set["Interface"] = set()
+        # most interfaces never get neighbors, the set is created on demand
+        self._neighbors: Optional[Set["Interface"]] = None
+        self._hash = hash((self.name, node.name))
 
     def __repr__(self) -> str:
         return (
@@ -44,17 +79,21 @@ class Interface:
         return f"{self.node}:{self.slug}"
 
     def __lt__(self, other) -> bool:
+        if self.node is other.node:
+            return self.name < other.name
         return (self.node.name, self.name) < (other.node.name, other.name)
 
     def __eq__(self, other) -> bool:
-        return (self.name, self.node) == (other.name, other.node)
+        if not isinstance(other, Interface):
+            return NotImplemented
+        return self is other or (self.node is other.node and self.name == other.name)
 
     def __hash__(self) -> int:
-        return hash((self.name, self.node.name))
+        return self._hash
 
     @property
-    def name(self) -> str:
-        return self.type + self.num
+    def neighbors(self) -> AbstractSet["Interface"]:
+        return self._neighbors if self._neighbors is not None else frozenset()
 
     @property
     def slug(self) -> str:
@@ -71,13 +110,7 @@ class Interface:
             Gi0/1 is converted to GigabitEthernet1
             Te1/1 is converted to TenGigabitEthernet1/1
         """
-        match = INTERFACE_NAME_RE.search(interface_name)
-        if match:
-            int_type = match.group("interface_type")
-            normalized_int_type = Interface.normalize_interface_type(int_type)
-            int_num = match.group("interface_num")
-            return normalized_int_type, int_num
-        raise ValueError(f"Does not recognize {interface_name} as an interface name")
+        return normalize_interface_name(interface_name)
 
     @staticmethod
     def normalize_interface_type(interface_type: str) -> str:
@@ -86,12 +119,9 @@ class Interface:
             G is converted to GigabitEthernet
             Te is converted to TenGigabitEthernet
         """
-        int_type = interface_type.strip().lower()
-        for norm_int_type in NORMALIZED_INTERFACES:
-            if norm_int_type.lower().startswith(int_type):
-                return norm_int_type
-
-        return int_type
+        return normalize_interface_type(interface_type)
 
     def add_neighbor(self, interface: "Interface") -> None:
-        self.neighbors.add(interface)
+        if self._neighbors is None:
+            self._neighbors = set()
+        self._neighbors.add(interface)
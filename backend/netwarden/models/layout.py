@@ -0,0 +1,89 @@
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_NODE_SPACING = 150.0
+UNKNOWN_SITE = ""
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+Position = Tuple[float, float]
+
+
+def spiral_point(index: int, spacing: float) -> Position:
+    """Returns index-th point of a sunflower (Vogel) spiral
+
+    Points fill a disk evenly, each takes an area of about pi * spacing ** 2,
+    and a point never moves when more points are added.
+    """
+    radius = spacing * math.sqrt(index)
+    angle = index * GOLDEN_ANGLE
+    return radius * math.cos(angle), radius * math.sin(angle)
+
+
+class SiteLayout:
+    """Coordinates of the nodes grouped by their sites
+
+    Site centers lie on a sunflower spiral and nodes of a site lie on a
+    smaller one around the center, in the order they were placed. Adding a
+    node does not move the others and slots of removed nodes are reused, so
+    the positions can be updated incrementally with every topology version.
+    A node whose site changed moves to the new site. Only when a site outgrows the space between site centers the spacing is
+    doubled and every node moves.
+    """
+
+    def __init__(self, node_spacing: float = DEFAULT_NODE_SPACING) -> None:
+        self.node_spacing = node_spacing
+        self.site_spacing = node_spacing * 4
+        self.positions: Dict[int, Position] = {}
+        # site -> index of its center on the spiral of sites
+        self._sites: Dict[str, int] = {}
+        # node id -> site and the index of the node on the spiral of the site
+        self._slots: Dict[int, Tuple[str, int]] = {}
+        self._next_slots: Dict[str, int] = {}
+        self._free_slots: Dict[str, List[int]] = {}
+
+    def place(self, node_id: int, site: Optional[str]) -> bool:
+        """Assigns position to the node, unless it already has one in the site
+
+        Returns:
+            True if all nodes were moved to make space for the node
+        """
+        site = site or UNKNOWN_SITE
+        site_slot = self._slots.get(node_id)
+        if site_slot is not None:
+            if site_slot[0] == site:
+                return False
+            self.remove(node_id)
+        if site not in self._sites:
+            self._sites[site] = len(self._sites)
+        free_slots = self._free_slots.get(site)
+        if free_slots:
+            slot = heapq.heappop(free_slots)
+        else:
+            slot = self._next_slots.get(site, 0)
+            self._next_slots[site] = slot + 1
+        self._slots[node_id] = (site, slot)
+
+        moved = False
+        while 2 * self.node_spacing * math.sqrt(slot + 1) > self.site_spacing:
+            self.site_spacing *= 2
+            moved = True
+        if moved:
+            for other_id, (other_site, other_slot) in self._slots.items():
+                self.positions[other_id] = self._position(other_site, other_slot)
+        else:
+            self.positions[node_id] = self._position(site, slot)
+        return moved
+
+    def remove(self, node_id: int) -> None:
+        site_slot = self._slots.pop(node_id, None)
+        if site_slot is None:
+            return
+        site, slot = site_slot
+        heapq.heappush(self._free_slots.setdefault(site, []), slot)
+        del self.positions[node_id]
+
+    def _position(self, site: str, slot: int) -> Position:
+        center_x, center_y = spiral_point(self._sites[site], self.site_spacing)
+        x, y = spiral_point(slot, self.node_spacing)
+        return round(center_x + x, 1), round(center_y + y, 1)
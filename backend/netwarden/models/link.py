@@ -1,20 +1,23 @@
-from typing import List, TYPE_CHECKING
+from typing import Iterable, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from netwarden.models.interface import Interface
 
 
 class Link:
-    def __init__(self, interfaces: List["Interface"]) -> None:
-        self.interfaces = sorted(interfaces)
+    __slots__ = ("interfaces", "_hash")
+
+    def __init__(self, interfaces: Iterable["Interface"]) -> None:
+        self.interfaces: Tuple["Interface", ...] = tuple(sorted(interfaces))
+        self._hash = hash(self.interfaces)
 
     def __eq__(self, other) -> bool:
-        return all(
-            int1 == int2 for int1, int2 in zip(self.interfaces, other.interfaces)
-        )
+        if not isinstance(other, Link):
+            return NotImplemented
+        return self._hash == other._hash and self.interfaces == other.interfaces
 
     def __hash__(self) -> int:
-        return hash(tuple(self.interfaces))
+        return self._hash
 
     def __str__(self) -> str:
         return " <-> ".join(str(interface) for interface in self.interfaces)
@@ -1,15 +1,16 @@
-from typing import List, Dict
+import sys
+from functools import lru_cache
+from typing import Dict, ValuesView
 
-from netwarden.models.interface import Interface
+from netwarden.models.interface import Interface, canonical_interface_name
 
 
 class Node:
-    cur_id = 1
+    __slots__ = ("name", "id", "name_to_interface")
 
-    def __init__(self, name: str) -> None:
-        self.name = name
-        self.id = Node.cur_id
-        Node.cur_id += 1
+    def __init__(self, name: str, id: int) -> None:
+        self.name = sys.intern(name)
+        self.id = id
 
         self.name_to_interface: Dict[str, "Interface"] = {}
 
@@ -29,11 +30,11 @@ class Node:
     #     return name_to_node
 
     @property
-    def interfaces(self) -> List["Interface"]:
-        return list(self.name_to_interface.values())
+    def interfaces(self) -> ValuesView["Interface"]:
+        return self.name_to_interface.values()
 
     def get_or_create_interface(self, interface_name: str) -> "Interface":
-        interface = self.name_to_interface.get(interface_name)
+        interface = self.name_to_interface.get(canonical_interface_name(interface_name))
         if interface is None:
             interface = Interface(name=interface_name, node=self)
             self.add_interface(interface)
@@ -50,9 +51,10 @@ class Node:
         return fqdn.split(".")[0]
 
     @staticmethod
+    @lru_cache(maxsize=65536)
     def normalize_name(node_name: str) -> str:
         if "." in node_name:
             result = Node.extract_hostname_from_fqdn(node_name)
         else:
             result = node_name
-        return result
+        return sys.intern(result)
@@ -0,0 +1,391 @@
+import asyncio
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from netwarden.models.adjacency import Adjacency
+from netwarden.models.analytics import TopologyAnalytics
+from netwarden.models.graph import Graph, LLDPNeighborInterface
+from netwarden.models.layout import DEFAULT_NODE_SPACING, SiteLayout
+from netwarden.models.link import Link
+from netwarden.models.node import Node
+
+if TYPE_CHECKING:
+    from netwarden.inventory.sync import SyncResult
+    from netwarden.state import StateEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 100
+LLDP_KEY = "lldp"
+
+
+class TopologyDiff:
+    """Changes of the topology caused by a single update
+
+    Nodes and edges are in the format of Topology.dump, removed ones are
+    represented only by their ids.
+    """
+
+    def __init__(self, version: int) -> None:
+        self.version = version
+        self.nodes_added: List[Dict[str, Any]] = []
+        self.nodes_removed: List[int] = []
+        self.nodes_changed: List[Dict[str, Any]] = []
+        self.edges_added: List[Dict[str, Any]] = []
+        self.edges_removed: List[int] = []
+        self.edges_changed: List[Dict[str, Any]] = []
+
+    def __bool__(self) -> bool:
+        return any(
+            (
+                self.nodes_added,
+                self.nodes_removed,
+                self.nodes_changed,
+                self.edges_added,
+                self.edges_removed,
+                self.edges_changed,
+            )
+        )
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "nodes": {
+                "added": self.nodes_added,
+                "removed": self.nodes_removed,
+                "changed": self.nodes_changed,
+            },
+            "edges": {
+                "added": self.edges_added,
+                "removed": self.edges_removed,
+                "changed": self.edges_changed,
+            },
+        }
+
+
+class Topology(Graph):
+    """Long-lived LLDP topology which is updated device by device
+
+    Every device reports only its own LLDP neighbors, so the topology remembers
+    which devices reported each link. A link disappears when no device reports
+    it anymore, a node disappears when it has no links and is not a reporting
+    device itself. Node and edge ids are never reused, so clients can patch
+    their view with the diffs instead of redrawing it. An update with the same
+    LLDP data as before is a no-op.
+
+    Nodes get x/y coordinates grouped by the site returned by get_site, they
+    are assigned when a node is added and kept until it is removed or its site
+    changes (see update_sites), so clients can draw the topology without
+    running physics.
+    """
+
+    def __init__(
+        self,
+        subscriber_queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE,
+        get_site: Optional[Callable[[str], Optional[str]]] = None,
+        node_spacing: float = DEFAULT_NODE_SPACING,
+    ):
+        super().__init__()
+        self.version = 0
+        self.subscriber_queue_size = subscriber_queue_size
+        # node name -> site, None if unknown
+        self.get_site = get_site
+        self.layout = SiteLayout(node_spacing=node_spacing)
+        self._layout_moved = False
+
+        # device name -> links reported by the device
+        self._device_links: Dict[str, Set[Link]] = {}
+        self._device_lldp_data: Dict[str, Mapping[str, List[Any]]] = {}
+        # link -> names of devices which reported it, usually its both ends, a
+        # tuple takes a fraction of the memory of a set
+        self._link_sources: Dict[Link, Tuple[str, ...]] = {}
+        self._node_link_count: Dict[str, int] = {}
+        self._subscribers: Set["asyncio.Queue[Optional[TopologyDiff]]"] = set()
+        self._adjacency: Optional[Adjacency] = None
+        self._adjacency_version = -1
+        self._analytics: Optional[TopologyAnalytics] = None
+
+    def dump_node(self, node: Node) -> Dict[str, Any]:
+        x, y = self.layout.positions[node.id]
+        return {"id": node.id, "label": node.name, "x": x, "y": y}
+
+    def dump_link(self, link: Link) -> Dict[str, Any]:
+        return {
+            "id": self.link_ids[link],
+            "from": link.first_interface.node.id,
+            "to": link.second_interface.node.id,
+            "title": str(link),
+        }
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "nodes": [self.dump_node(node) for node in self.nodes],
+            "edges": [
+                self.dump_link(link) for link in self.links if link.is_point_to_point
+            ],
+        }
+
+    def adjacency(self) -> Adjacency:
+        """Returns compact snapshot of the current version, edge ids are link ids"""
+        if self._adjacency is None or self._adjacency_version != self.version:
+            self._adjacency = super().adjacency()
+            self._adjacency_version = self.version
+        return self._adjacency
+
+    def analytics(self) -> TopologyAnalytics:
+        """Returns analytics of the current version, shared until it changes"""
+        adjacency = self.adjacency()
+        if self._analytics is None or self._analytics.adjacency is not adjacency:
+            self._analytics = TopologyAnalytics(adjacency)
+        return self._analytics
+
+    def update_device(
+        self,
+        device_name: str,
+        lldp_neighbors: Mapping[str, List[LLDPNeighborInterface]],
+    ) -> TopologyDiff:
+        """Replaces LLDP neighbors reported by the device
+
+        Returns:
+            changes of the topology, empty if nothing has changed
+        """
+        device_name = Node.normalize_name(device_name)
+        if (
+            device_name in self._device_lldp_data
+            and self._device_lldp_data[device_name] == lldp_neighbors
+        ):
+            return TopologyDiff(self.version)
+
+        diff = TopologyDiff(self.version + 1)
+        touched_nodes: Dict[str, Dict[str, Any]] = {}
+        new_links = self._links_from_lldp(device_name, lldp_neighbors, diff)
+        old_links = self._device_links.get(device_name, set())
+
+        for link in new_links - old_links:
+            sources = self._link_sources.get(link, ())
+            self._link_sources[link] = (*sources, device_name)
+            if not sources:
+                self._add_link(link, diff, touched_nodes)
+        for link in old_links - new_links:
+            self._discard_source(link, device_name, diff, touched_nodes)
+
+        self._device_links[device_name] = new_links
+        self._device_lldp_data[device_name] = lldp_neighbors
+        self._remove_orphans(touched_nodes, diff)
+        self._finish(diff, touched_nodes)
+        return diff
+
+    def remove_device(self, device_name: str) -> TopologyDiff:
+        """Forgets links reported by the device, e.g. when it leaves the inventory"""
+        device_name = Node.normalize_name(device_name)
+        if device_name not in self._device_links:
+            return TopologyDiff(self.version)
+        diff = TopologyDiff(self.version + 1)
+        touched_nodes: Dict[str, Dict[str, Any]] = {}
+        self._touch(device_name, touched_nodes)
+        for link in self._device_links.pop(device_name):
+            self._discard_source(link, device_name, diff, touched_nodes)
+        del self._device_lldp_data[device_name]
+        self._remove_orphans(touched_nodes, diff)
+        self._finish(diff, touched_nodes)
+        return diff
+
+    def update_sites(self, node_names: Iterable[str]) -> TopologyDiff:
+        """Moves the nodes whose site changed to their new site
+
+        Nodes are placed with the site known when they are first seen, e.g. an
+        LLDP neighbor may appear before the inventory knows its site.
+
+        Returns:
+            moved nodes in nodes_changed, empty if no site has changed
+        """
+        diff = TopologyDiff(self.version + 1)
+        touched_nodes: Dict[str, Dict[str, Any]] = {}
+        for node_name in node_names:
+            node = self.name_to_node.get(Node.normalize_name(node_name))
+            if node is None:
+                continue
+            self._touch(node.name, touched_nodes)
+            self._place(node)
+        self._finish(diff, touched_nodes)
+        return diff
+
+    def on_sync(self, result: "SyncResult") -> None:
+        """NetBox sync listener moving added and updated devices to their sites"""
+        self.update_sites([*result.added, *result.updated])
+
+    def on_state_change(
+        self, device_name: str, key: str, entry: Optional["StateEntry"]
+    ) -> None:
+        """State store listener keeping the topology in sync with polled data"""
+        if key != LLDP_KEY:
+            return
+        if entry is None:
+            self.remove_device(device_name)
+        else:
+            self.update_device(device_name, entry.value)
+
+    @property
+    def device_names(self) -> Set[str]:
+        """Names of the devices which reported their LLDP neighbors"""
+        return set(self._device_links)
+
+    def subscribe(self) -> "asyncio.Queue[Optional[TopologyDiff]]":
+        """Returns a queue receiving every non-empty diff
+
+        None is put to the queue instead of a diff when the subscriber fell
+        behind and lost some diffs, it should re-read the full topology.
+        """
+        queue: "asyncio.Queue[Optional[TopologyDiff]]" = asyncio.Queue(
+            maxsize=self.subscriber_queue_size
+        )
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[Optional[TopologyDiff]]") -> None:
+        self._subscribers.discard(queue)
+
+    def _links_from_lldp(
+        self,
+        device_name: str,
+        lldp_neighbors: Mapping[str, List[LLDPNeighborInterface]],
+        diff: TopologyDiff,
+    ) -> Set[Link]:
+        node = self._get_or_add_node(device_name, diff)
+        links = set()
+        for interface_name, neighbors in lldp_neighbors.items():
+            interface = node.get_or_create_interface(interface_name)
+            if len(neighbors) != 1:  # more than 2 devices on the link, skipping
+                if neighbors:
+                    logger.warning(
+                        "%s.%s: more than 2 lldp neighbors found",
+                        device_name,
+                        interface.slug,
+                    )
+                continue
+            neighbor = neighbors[0]
+            remote_node = self._get_or_add_node(neighbor.node, diff)
+            remote_interface = remote_node.get_or_create_interface(neighbor.interface)
+            links.add(Link([interface, remote_interface]))
+        return links
+
+    def _get_or_add_node(self, node_name: str, diff: TopologyDiff) -> Node:
+        node_name = Node.normalize_name(node_name)
+        node = self.name_to_node.get(node_name)
+        if node is None:
+            node = self.get_or_create_node(node_name)
+            self._node_link_count[node.name] = 0
+            diff.nodes_added.append(self.dump_node(node))
+        return node
+
+    def get_or_create_node(self, node_name: str) -> Node:
+        node = super().get_or_create_node(node_name)
+        self._place(node)
+        return node
+
+    def _place(self, node: Node) -> None:
+        site = self.get_site(node.name) if self.get_site is not None else None
+        if self.layout.place(node.id, site):
+            self._layout_moved = True
+
+    def _link_node_names(self, link: Link) -> List[str]:
+        return [interface.node.name for interface in link.interfaces]
+
+    def _add_link(
+        self, link: Link, diff: TopologyDiff, touched_nodes: Dict[str, Dict[str, Any]]
+    ) -> None:
+        self.add_link(link)
+        for node_name in self._link_node_names(link):
+            self._touch(node_name, touched_nodes)
+            self._node_link_count[node_name] += 1
+        diff.edges_added.append(self.dump_link(link))
+
+    def _remove_link(
+        self, link: Link, diff: TopologyDiff, touched_nodes: Dict[str, Dict[str, Any]]
+    ) -> None:
+        diff.edges_removed.append(self.remove_link(link))
+        del self._link_sources[link]
+        for node_name in self._link_node_names(link):
+            self._touch(node_name, touched_nodes)
+            self._node_link_count[node_name] -= 1
+
+    def _discard_source(
+        self,
+        link: Link,
+        device_name: str,
+        diff: TopologyDiff,
+        touched_nodes: Dict[str, Dict[str, Any]],
+    ) -> None:
+        """Removes the link when the last device reporting it stops doing so"""
+        sources = tuple(
+            source for source in self._link_sources[link] if source != device_name
+        )
+        if sources:
+            self._link_sources[link] = sources
+        else:
+            self._remove_link(link, diff, touched_nodes)
+
+    def _touch(self, node_name: str, touched_nodes: Dict[str, Dict[str, Any]]) -> None:
+        if node_name not in touched_nodes:
+            touched_nodes[node_name] = self.dump_node(self.name_to_node[node_name])
+
+    def _remove_orphans(
+        self, touched_nodes: Dict[str, Dict[str, Any]], diff: TopologyDiff
+    ) -> None:
+        for node_name in touched_nodes:
+            if self._node_link_count.get(node_name) or node_name in self._device_links:
+                continue
+            node = self.name_to_node.pop(node_name, None)
+            if node is None:
+                continue
+            del self._node_link_count[node_name]
+            self.layout.remove(node.id)
+            diff.nodes_removed.append(node.id)
+
+    def _finish(
+        self, diff: TopologyDiff, touched_nodes: Dict[str, Dict[str, Any]]
+    ) -> None:
+        added_ids = {node["id"] for node in diff.nodes_added}
+        for node_name, old_dump in touched_nodes.items():
+            node = self.name_to_node.get(node_name)
+            if node is None or node.id in added_ids:
+                continue
+            new_dump = self.dump_node(node)
+            if new_dump != old_dump:
+                diff.nodes_changed.append(new_dump)
+        if self._layout_moved:
+            # the layout was spread out, all nodes got new coordinates
+            self._layout_moved = False
+            for node_dump in diff.nodes_added:
+                position = self.layout.positions.get(node_dump["id"])
+                if position is not None:
+                    node_dump["x"], node_dump["y"] = position
+            diff.nodes_changed = [
+                self.dump_node(node) for node in self.nodes if node.id not in added_ids
+            ]
+        if not diff:
+            return
+        self.version = diff.version
+        self._publish(diff)
+
+    def _publish(self, diff: TopologyDiff) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(diff)
+            except asyncio.QueueFull:
+                # the subscriber is too slow, make it resynchronize
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
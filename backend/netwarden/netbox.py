@@ -1,7 +1,12 @@
+import asyncio
+import base64
+import hashlib
 import logging
+import os
 import re
 import urllib.parse
-from typing import Any, List, Dict, Union, Optional
+from pathlib import Path
+from typing import Any, List, Dict, Mapping, Tuple, Union, Optional
 
 import httpx
 
@@ -9,11 +14,84 @@ from netwarden.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+else:
+    CRYPTOGRAPHY_AVAILABLE = True
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+DEFAULT_SESSION_KEY_TTL = 86400.0
+
+
+def make_fernet(private_key: str) -> "Fernet":
+    """Returns cipher with a key derived from the user private key"""
+    digest = hashlib.sha256(private_key.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+
+class SessionKeyCache:
+    """Keeps NetBox session key in a local file between restarts
+
+    The file is encrypted with a key derived from the user private key, so it is
+    only readable by whoever could request the session key anyway. A cached key
+    older than ttl seconds is ignored.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        private_key: str,
+        ttl: float = DEFAULT_SESSION_KEY_TTL,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self._fernet = make_fernet(private_key)
+
+    def load(self) -> Optional[str]:
+        try:
+            token = self.path.read_bytes()
+            return self._fernet.decrypt(token, ttl=int(self.ttl)).decode()
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, OSError):
+            logger.info("Cached NetBox session key is expired or invalid")
+            return None
+
+    def save(self, session_key: str) -> None:
+        token = self._fernet.encrypt(session_key.encode())
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+        except OSError:
+            logger.warning("NetBox session key was not cached in %s", self.path)
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
 
 class NetBox:
-    def __init__(self, url: str, token: str, private_key: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        private_key: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        session_key_file: Optional[str] = None,
+        session_key_ttl: float = DEFAULT_SESSION_KEY_TTL,
+    ) -> None:
         # self.token = token
         self.url = url
+        self.page_size = page_size
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore: Optional[asyncio.Semaphore] = None
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
@@ -23,7 +101,44 @@ class NetBox:
         self._session_key: Optional[str] = None
         self.private_key = private_key
         self.devices = DevicesCRUD(self)
-        self.secrets = SecretsCRUD(self, private_key=private_key)
+        session_key_cache = None
+        if private_key and session_key_file:
+            if CRYPTOGRAPHY_AVAILABLE:
+                session_key_cache = SessionKeyCache(
+                    session_key_file, private_key=private_key, ttl=session_key_ttl
+                )
+            else:
+                logger.warning(
+                    "cryptography package is not installed, "
+                    "NetBox session key will not be cached"
+                )
+        self.secrets = SecretsCRUD(
+            self, private_key=private_key, session_key_cache=session_key_cache
+        )
+        self.object_changes = ObjectChangesCRUD(self)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Limits the number of concurrent page requests"""
+        # a client built before asyncio.run() must not hold a semaphore of another loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._semaphore
+
+    async def fetch_devices_and_secrets(
+        self, **filters: Any
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fetches devices matching the filters and all secrets concurrently
+
+        Secrets are only fetched when the private key is set, otherwise they
+        can't be decrypted.
+        """
+        if not self.private_key:
+            return await self.devices.list(**filters), []
+        devices, secrets = await asyncio.gather(
+            self.devices.list(**filters), self.secrets.list()
+        )
+        return devices, secrets
 
     async def _request(
         self,
@@ -126,11 +241,14 @@ class NetBox:
 
     @staticmethod
     def parse_devices(
-        devices: List[Dict[str, Any]], secrets: List[Dict[str, Any]] = None
+        devices: List[Dict[str, Any]],
+        secrets: List[Dict[str, Any]] = None,
+        device_id_to_login_creds: Optional[Mapping[int, Dict[str, str]]] = None,
     ):
-        device_id_to_login_creds = NetBox.build_device_id_to_login_creds(
-            secrets=secrets
-        )
+        if device_id_to_login_creds is None:
+            device_id_to_login_creds = NetBox.build_device_id_to_login_creds(
+                secrets=secrets
+            )
         default_creds = {
             "username": settings["device.username"],
             "password": settings["device.password"],
@@ -149,8 +267,14 @@ class NetBox:
             model = device["device_type"]["model"]
             platform_slug = device["platform"]["slug"]
             platform = device["platform"]["name"]
+            # tags are objects since NetBox 2.10 and plain strings before
+            tags = [
+                tag["slug"] if isinstance(tag, dict) else tag
+                for tag in device.get("tags", [])
+            ]
 
             normalized_device_dict = {
+                "id": device_id,
                 "name": device_name,
                 "fqdn": NetBox.create_fqdn(
                     device_name=device_name, site_slug=site_slug, domain=domain_name
@@ -162,6 +286,7 @@ class NetBox:
                 "software_version": "N/A",
                 "mgmt_ip": primary_ip,
                 "site": site,
+                "tags": tags,
                 "console": {"server": "192.168.153.100", "port": 9000},
                 "username": login_creds.get("username", "N/A"),
                 "password": login_creds.get("password", "N/A"),
@@ -176,9 +301,46 @@ class BaseCRUD:
     def __init__(self, netbox: "NetBox"):
         self.netbox = netbox
 
-    async def list(self) -> List[Dict[str, Any]]:
-        response_data = await self.netbox._get(self.endpoint)
-        return response_data["results"]
+    async def list(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Returns objects matching the filters from all pages"""
+        return await self._list_pages(filters)
+
+    async def _list_pages(
+        self, filters: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetches the first page to learn the count, then the rest concurrently
+
+        Objects created or deleted while the pages are fetched may shift the
+        pages, so objects are deduplicated by id.
+        """
+        params = {**filters, "limit": self.netbox.page_size, "offset": 0}
+        first_page = await self._get_page(params, headers)
+        results = first_page["results"]
+        # NetBox may cap the page size with MAX_PAGE_SIZE
+        page_size = len(results)
+        if not page_size or first_page.get("next") is None:
+            return results
+
+        offsets = range(page_size, first_page["count"], page_size)
+        pages = await asyncio.gather(
+            *(
+                self._get_page(
+                    {**params, "limit": page_size, "offset": offset}, headers
+                )
+                for offset in offsets
+            )
+        )
+        id_to_object = {obj["id"]: obj for obj in results}
+        for page in pages:
+            for obj in page["results"]:
+                id_to_object[obj["id"]] = obj
+        return list(id_to_object.values())
+
+    async def _get_page(
+        self, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        async with self.netbox.semaphore:
+            return await self.netbox._get(self.endpoint, params=params, headers=headers)
 
     async def get(self, id: str) -> Dict[str, Any]:
         response_data = await self.netbox._get(f"{self.endpoint}/{id}")
@@ -205,22 +367,59 @@ class DevicesCRUD(BaseCRUD):
 class SecretsCRUD(BaseCRUD):
     endpoint = "/secrets/secrets"
 
-    def __init__(self, netbox: "NetBox", private_key: Optional[str] = None):
+    def __init__(
+        self,
+        netbox: "NetBox",
+        private_key: Optional[str] = None,
+        session_key_cache: Optional[SessionKeyCache] = None,
+    ):
         super().__init__(netbox=netbox)
         self._private_key = private_key
         self._session_key: Optional[str] = None
+        self._session_key_cache = session_key_cache
+        self._session_key_lock: Optional[asyncio.Lock] = None
 
-    async def list(self) -> List[Dict[str, Any]]:
-        if self._session_key is None and self._private_key:
-            self._session_key = await self.get_session_key(self._private_key)
-        logger.debug("Session key was retrieved from NetBox")
+    async def list(self, **filters: Any) -> List[Dict[str, Any]]:
+        try:
+            return await self._list_with_session_key(filters)
+        except httpx.HTTPStatusError as e:
+            if self._session_key is None or e.response.status_code not in (400, 403):
+                raise
+            # the cached session key could have been revoked
+            logger.info("NetBox rejected the session key, requesting a new one")
+            self._session_key = None
+            if self._session_key_cache is not None:
+                self._session_key_cache.clear()
+            return await self._list_with_session_key(filters)
+
+    async def _list_with_session_key(
+        self, filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         headers: Optional[Dict[str, str]] = None
-        if self._session_key:
+        session_key = await self.load_session_key()
+        if session_key:
             headers = {
-                "X-Session-Key": self._session_key,
+                "X-Session-Key": session_key,
             }
-        response_data = await self.netbox._get(self.endpoint, headers=headers)
-        return response_data["results"]
+        return await self._list_pages(filters, headers=headers)
+
+    async def load_session_key(self) -> Optional[str]:
+        """Returns the session key from memory, the local cache or NetBox"""
+        if self._session_key is not None or not self._private_key:
+            return self._session_key
+        if self._session_key_lock is None:
+            self._session_key_lock = asyncio.Lock()
+        async with self._session_key_lock:
+            if self._session_key is not None:
+                return self._session_key
+            if self._session_key_cache is not None:
+                self._session_key = self._session_key_cache.load()
+            if self._session_key is None:
+                self._session_key = await self.get_session_key(self._private_key)
+                logger.debug("Session key was retrieved from NetBox")
+                if self._session_key_cache is not None:
+                    self._session_key_cache.save(self._session_key)
+            return self._session_key
 
     async def get_session_key(self, private_key: Any) -> str:
         data = await self.netbox._post(
@@ -230,3 +429,13 @@ class SecretsCRUD(BaseCRUD):
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
         return data["session_key"]
+
+
+class ObjectChangesCRUD(BaseCRUD):
+    endpoint = "/extras/object-changes"
+
+    async def list_deleted_devices(self, since: str) -> List[Dict[str, Any]]:
+        """Returns changelog records of devices deleted since the timestamp"""
+        return await self.list(
+            changed_object_type="dcim.device", action="delete", time_after=since
+        )
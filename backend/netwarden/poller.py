@@ -0,0 +1,266 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from netwarden.config import settings
+from netwarden.state import StateStore
+
+if TYPE_CHECKING:
+    from netwarden.inventory.inventory import Inventory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVALS = {
+    "version_sn": 3600.0,
+    "lldp": 60.0,
+}
+DEFAULT_JITTER = 0.1
+DEFAULT_MAX_CONCURRENT = 50
+DEFAULT_BACKOFF_MAX = 3600.0
+# entries of a key are stale after this many intervals without a successful poll
+DEFAULT_MAX_MISSED_POLLS = 3
+INVENTORY_SYNC_INTERVAL = 30.0
+
+
+class PollTarget:
+    def __init__(self, device_name: str, key: str, interval: float) -> None:
+        self.device_name = device_name
+        self.key = key
+        self.interval = interval
+        self.next_run = 0.0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success: Optional[float] = None
+        self.removed = False
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__qualname__}("
+            f"device_name={self.device_name!r}, "
+            f"key={self.key!r})"
+        )
+
+
+class Poller:
+    """Periodically collects data from all devices into the state store
+
+    Every (device, key) pair is polled on its own jittered schedule with the
+    interval configured for the key. At most max_concurrent polls run at the
+    same time (on top of the limits of the scheduler). Failing devices are
+    polled with exponential backoff, up to backoff_max seconds.
+
+    Entries of a key become stale in the store after max_missed_polls
+    intervals without a successful poll. A failing poll removes its stale
+    entry, so data of a dead device is not served and its LLDP links leave
+    the topology.
+    """
+
+    def __init__(
+        self,
+        inventory: "Inventory",
+        store: StateStore,
+        intervals: Optional[Mapping[str, float]] = None,
+        jitter: float = DEFAULT_JITTER,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        max_missed_polls: int = DEFAULT_MAX_MISSED_POLLS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.inventory = inventory
+        self.store = store
+        self.intervals: Dict[str, float] = dict(
+            DEFAULT_INTERVALS if intervals is None else intervals
+        )
+        self.jitter = jitter
+        self.max_concurrent = max_concurrent
+        self.backoff_max = backoff_max
+        self.clock = clock
+        for key, interval in self.intervals.items():
+            self.store.max_ages[key] = interval * max_missed_polls
+
+        self._targets: Dict[Tuple[str, str], PollTarget] = {}
+        self._queue: List[Tuple[float, int, PollTarget]] = []
+        self._counter = itertools.count()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._poll_tasks: Set["asyncio.Task[None]"] = set()
+        self._wake_up: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_settings(cls, inventory: "Inventory", store: StateStore) -> "Poller":
+        return cls(
+            inventory=inventory,
+            store=store,
+            intervals=settings.get("poller.intervals", DEFAULT_INTERVALS),
+            jitter=settings.get("poller.jitter", DEFAULT_JITTER),
+            max_concurrent=settings.get(
+                "poller.max_concurrent", DEFAULT_MAX_CONCURRENT
+            ),
+            backoff_max=settings.get("poller.backoff_max", DEFAULT_BACKOFF_MAX),
+            max_missed_polls=settings.get(
+                "poller.max_missed_polls", DEFAULT_MAX_MISSED_POLLS
+            ),
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._wake_up = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [*self._poll_tasks]
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def sync_targets(self) -> None:
+        """Adds targets for new devices and drops the ones of removed devices"""
+        device_names = {device.name for device in self.inventory.devices}
+        for device_key, target in list(self._targets.items()):
+            if target.device_name not in device_names:
+                target.removed = True
+                del self._targets[device_key]
+                self.store.remove_device(target.device_name)
+
+        now = self.clock()
+        for device_name in device_names:
+            for key, interval in self.intervals.items():
+                if (device_name, key) in self._targets:
+                    continue
+                target = PollTarget(device_name, key, interval)
+                self._targets[(device_name, key)] = target
+                # spread the first polls to avoid the thundering herd
+                self._schedule(target, now + random.uniform(0, interval * self.jitter))
+
+    def _schedule(self, target: PollTarget, next_run: float) -> None:
+        target.next_run = next_run
+        heapq.heappush(self._queue, (next_run, next(self._counter), target))
+        if self._wake_up is not None:
+            self._wake_up.set()
+
+    def _next_interval(self, target: PollTarget) -> float:
+        if target.failures:
+            interval = min(target.interval * 2**target.failures, self.backoff_max)
+        else:
+            interval = target.interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _run(self) -> None:
+        assert self._semaphore is not None and self._wake_up is not None
+        next_sync = self.clock()
+        while True:
+            now = self.clock()
+            if now >= next_sync:
+                self.sync_targets()
+                next_sync = now + INVENTORY_SYNC_INTERVAL
+
+            if not self._queue or self._queue[0][0] > now:
+                delay = next_sync - now
+                if self._queue:
+                    delay = min(delay, self._queue[0][0] - now)
+                self._wake_up.clear()
+                try:
+                    await asyncio.wait_for(self._wake_up.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, target = heapq.heappop(self._queue)
+            if target.removed:
+                continue
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._poll(target))
+            self._poll_tasks.add(task)
+            task.add_done_callback(self._poll_tasks.discard)
+
+    async def poll(self, target: PollTarget) -> None:
+        """Collects data for the target once and stores it"""
+        device = self.inventory.get_device(target.device_name)
+        try:
+            value = await device.get_data(target.key, force_refresh=True)
+        except Exception as e:
+            target.failures += 1
+            target.last_error = str(e) or repr(e)
+            if target.failures == 1:
+                logger.warning(
+                    "Device %r, polling of %r failed: %s",
+                    target.device_name,
+                    target.key,
+                    target.last_error,
+                )
+            entry = self.store.get(target.device_name, target.key)
+            if entry is not None and not self.store.is_fresh(target.key, entry):
+                logger.warning(
+                    "Device %r, dropping stale %r after %d failed polls",
+                    target.device_name,
+                    target.key,
+                    target.failures,
+                )
+                self.store.remove(target.device_name, target.key)
+            return
+        if target.failures:
+            logger.info(
+                "Device %r, polling of %r recovered after %d failures",
+                target.device_name,
+                target.key,
+                target.failures,
+            )
+        target.failures = 0
+        target.last_error = None
+        target.last_success = time.time()
+        self.store.set(target.device_name, target.key, value)
+
+    async def _poll(self, target: PollTarget) -> None:
+        assert self._semaphore is not None
+        try:
+            await self.poll(target)
+        except KeyError:
+            # device was removed from the inventory in the meantime
+            target.removed = True
+        finally:
+            self._semaphore.release()
+            if not target.removed:
+                self._schedule(target, self.clock() + self._next_interval(target))
+
+    def stats(self) -> Dict[str, Any]:
+        failing = [
+            {
+                "name": target.device_name,
+                "key": target.key,
+                "failures": target.failures,
+                "error": target.last_error,
+            }
+            for target in self._targets.values()
+            if target.failures
+        ]
+        return {
+            "running": self.is_running,
+            "intervals": self.intervals,
+            "targets": len(self._targets),
+            "in_progress": len(self._poll_tasks),
+            "store_version": self.store.version,
+            "store_entries": len(self.store),
+            "failing": failing,
+        }
@@ -1,55 +1,318 @@
 import asyncio
+import enum
+import json
 import logging
-from typing import cast
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, cast
 
-from fastapi import APIRouter, Request
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.requests import HTTPConnection
 
+from netwarden.archive import ConfigArchive, config_archive
+from netwarden.collector import (
+    collect_device_batches,
+    collect_device_data,
+    get_default_deadline,
+    iter_device_data,
+)
+from netwarden.connections.registry import registry
+from netwarden.inventory.device import Device
 from netwarden.inventory.inventory import Inventory
-from netwarden.models.graph import Graph
+from netwarden.inventory.query import DEFAULT_SORT, get_device_page
+from netwarden.models.node import Node
+from netwarden.models.topology import Topology, TopologyDiff
 from netwarden.netbox import NetBox
+from netwarden.state import StateStore
 
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+class StreamFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    SSE = "sse"
+
+
+STREAM_MEDIA_TYPES = {
+    StreamFormat.NDJSON: "application/x-ndjson",
+    StreamFormat.SSE: "text/event-stream",
+}
+
+
 async def _get_normalized_devices(request: Request):
     """ TODO: returns data and has a side effect """
     netbox = cast("NetBox", request.app.state.netbox)
-    # devices_coro = netbox.devices.list()
-    # secrets_coro = netbox.secrets.list()
-    # results = await asyncio.gather(devices_coro, secrets_coro)
-    # devices_data, secrets_data = results
-    devices_data = await netbox.devices.list()
-    devices = NetBox.parse_devices(devices=devices_data, secrets=None)
+    devices_data, secrets_data = await netbox.fetch_devices_and_secrets()
+    devices = NetBox.parse_devices(devices=devices_data, secrets=secrets_data)
     inventory = cast(Inventory, request.app.state.inventory)
     if not inventory:
         request.app.state.inventory = Inventory.from_netbox_devices_list(devices)
     return devices
 
 
+def _get_state_store(request: Request) -> Optional[StateStore]:
+    """Returns the state store if the background poller is running"""
+    return getattr(request.app.state, "state_store", None)
+
+
+def _get_topology(conn: HTTPConnection) -> Topology:
+    topology = getattr(conn.app.state, "topology", None)
+    if topology is None:
+        inventory = getattr(conn.app.state, "inventory", None)
+        topology = Topology(get_site=inventory.get_site if inventory else None)
+        conn.app.state.topology = topology
+    return topology
+
+
+# fields of /devices which require querying the devices
+LIVE_FIELDS = {
+    "software_version",
+    "serial_number",
+    "status",
+    "elapsed",
+    "error",
+    "updated_at",
+}
+DEVICE_FIELDS = set(Device.__fields__) - {"username", "password"}
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    if fields is None:
+        return None
+    field_set = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = field_set - LIVE_FIELDS - DEVICE_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {sorted(unknown)}"
+        )
+    return field_set | {"name"}
+
+
 @router.get("/devices")
-async def get_devices(request: Request):
+async def get_devices(
+    request: Request,
+    response: Response,
+    refresh: bool = False,
+    deadline: Optional[float] = None,
+    site: Optional[str] = None,
+    platform: Optional[str] = None,
+    vendor: Optional[str] = None,
+    model: Optional[str] = None,
+    tag: List[str] = Query([]),
+    sort: str = DEFAULT_SORT,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """Returns devices with their software version and serial number
+
+    Devices are filtered with the inventory index and sorted by the
+    comma-separated sort fields ("-site,name"), only the devices of the
+    requested page are queried. The page is selected with offset and limit or
+    with the cursor from the X-Next-Cursor header of the previous page. The
+    number of all matching devices is in the X-Total-Count header.
+
+    fields is a comma-separated list of the returned fields. Devices are not
+    queried at all when only inventory fields are requested.
+
+    Devices which failed or did not answer within the deadline are returned with
+    "timeout" or "error" status instead of failing the whole response.
+    """
     # devices = await _get_normalized_devices(request)
     inventory = cast(Inventory, request.app.state.inventory)
-    fetch_data_tasks = []
-    for device in inventory.devices:
-        fetch_sw_sn_task = asyncio.create_task(device.get_data("version_sn"))
-        fetch_data_tasks.append(fetch_sw_sn_task)
+    field_set = _parse_fields(fields)
+    filters = dict(site=site, platform=platform, vendor=vendor, model=model, tags=tag)
+    try:
+        page = get_device_page(
+            inventory, filters, sort=sort, offset=offset, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Total-Count"] = str(page.total)
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
 
-    await asyncio.gather(*fetch_data_tasks)
+    if field_set is not None and not field_set & LIVE_FIELDS:
+        return [_project(device.dump(), field_set) for device in page.devices]
+
+    if deadline is None:
+        deadline = get_default_deadline()
+    results = await collect_device_data(
+        page.devices,
+        "version_sn",
+        deadline=deadline,
+        force_refresh=refresh,
+        store=_get_state_store(request),
+    )
     devices = []
-    for task, device in zip(fetch_data_tasks, inventory.devices):
-        software_serial_data = task.result()
-        device_dict = {
-            **device.dump(),
-            **software_serial_data,
-        }
-        devices.append(device_dict)
+    for result in results:
+        if result.is_ok:
+            device_dict = {
+                **result.device.dump(),
+                **result.data,
+                "status": result.status.value,
+                "elapsed": result.elapsed,
+                "updated_at": result.updated_at,
+            }
+        else:
+            device_dict = {**result.device.dump(), **result.dump_error()}
+        devices.append(_project(device_dict, field_set))
 
     return devices
 
 
+def _project(device_dict: Dict[str, Any], fields: Optional[Set[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return device_dict
+    return {name: value for name, value in device_dict.items() if name in fields}
+
+
+def _encode_stream_record(record: Dict[str, Any], fmt: StreamFormat) -> str:
+    data = json.dumps(jsonable_encoder(record))
+    if fmt is StreamFormat.SSE:
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return f"{data}\n"
+
+
+async def _stream_devices(
+    inventory: Inventory,
+    fmt: StreamFormat,
+    refresh: bool,
+    deadline: Optional[float],
+    store: Optional[StateStore],
+) -> AsyncIterator[str]:
+    start = time.monotonic()
+    first_row_time = None
+    timings: Dict[str, float] = {}
+    failures = []
+    async for result in iter_device_data(
+        inventory.devices,
+        "version_sn",
+        deadline=deadline,
+        force_refresh=refresh,
+        store=store,
+    ):
+        device = result.device
+        timings[device.name] = result.elapsed
+        if not result.is_ok:
+            failures.append(result.dump_error())
+            continue
+        if first_row_time is None:
+            first_row_time = time.monotonic() - start
+        record = {
+            "type": "device",
+            "data": {
+                **device.dump(),
+                **result.data,
+                "updated_at": result.updated_at,
+            },
+        }
+        yield _encode_stream_record(record, fmt)
+
+    summary = {
+        "type": "summary",
+        "total": len(timings),
+        "succeeded": len(timings) - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+        "elapsed": time.monotonic() - start,
+        "time_to_first_row": first_row_time,
+        "timings": timings,
+    }
+    yield _encode_stream_record(summary, fmt)
+
+
+@router.get("/devices/stream")
+async def stream_devices(
+    request: Request,
+    format: StreamFormat = StreamFormat.NDJSON,
+    refresh: bool = False,
+    deadline: Optional[float] = None,
+):
+    """Streams devices as soon as their data is retrieved
+
+    Every device is a {"type": "device", "data": {...}} record, the last record is
+    {"type": "summary", ...} with failures and timings.
+    """
+    inventory = cast(Inventory, request.app.state.inventory)
+    if deadline is None:
+        deadline = get_default_deadline()
+    return StreamingResponse(
+        _stream_devices(
+            inventory,
+            fmt=format,
+            refresh=refresh,
+            deadline=deadline,
+            store=_get_state_store(request),
+        ),
+        media_type=STREAM_MEDIA_TYPES[format],
+    )
+
+
+class DeviceSelector(BaseModel):
+    """Devices matching all given fields, all devices if none is given"""
+
+    names: Optional[List[str]] = None
+    site: Optional[str] = None
+    platform: Optional[str] = None
+    vendor: Optional[str] = None
+    model: Optional[str] = None
+    tags: List[str] = []
+
+
+class DeviceQuery(BaseModel):
+    devices: DeviceSelector = Field(default_factory=DeviceSelector)
+    keys: List[str] = Field(..., min_items=1)
+    refresh: bool = False
+    deadline: Optional[float] = None
+
+
+@router.post("/devices/query")
+async def query_devices(request: Request, query: DeviceQuery):
+    """Retrieves several keys from several devices in one call
+
+    All keys of a device are requested together over one connection, e.g. as
+    one SSH command batch or concurrent RESTCONF requests. Failed and timed out
+    keys are listed in "failures", the rest are in "results" by device and key.
+    """
+    unknown_keys = sorted(set(query.keys) - set(registry.keys))
+    if unknown_keys:
+        raise HTTPException(status_code=400, detail=f"Unknown keys: {unknown_keys}")
+    inventory = cast(Inventory, request.app.state.inventory)
+    devices = inventory.select(**query.devices.dict())
+    deadline = query.deadline
+    if deadline is None:
+        deadline = get_default_deadline()
+    start = time.monotonic()
+    batches = await collect_device_batches(
+        devices,
+        list(dict.fromkeys(query.keys)),
+        deadline=deadline,
+        force_refresh=query.refresh,
+        store=_get_state_store(request),
+    )
+    return {
+        "results": {batch.device.name: batch.data for batch in batches},
+        # device name -> key -> UNIX timestamp when the data was retrieved
+        "updated_at": {batch.device.name: batch.updated_at for batch in batches},
+        "failures": [error for batch in batches for error in batch.dump_errors()],
+        "elapsed": time.monotonic() - start,
+    }
+
+
 @router.post("/devices/{device_name}/reboot")
 async def reboot_device(device_name: str):
     await asyncio.sleep(10)
@@ -59,8 +322,28 @@ async def reboot_device(device_name: str):
     }
 
 
+def _get_config_archive() -> ConfigArchive:
+    if config_archive is None:
+        raise HTTPException(status_code=404, detail="Configuration archive is disabled")
+    return config_archive
+
+
 @router.get("/devices/{device_name}/cfg")
-async def get_config(request: Request, device_name: str, connection: str = "ssh"):
+async def get_config(
+    request: Request, device_name: str, connection: str = "ssh", archived: bool = False
+):
+    """Returns running configuration of the device
+
+    With archived=true the latest archived configuration is returned without
+    connecting to the device.
+    """
+    if archived:
+        snapshot = await _get_config_archive().get_latest(device_name)
+        if snapshot is None:
+            raise HTTPException(
+                status_code=404, detail=f"No archived configuration of {device_name!r}"
+            )
+        return snapshot.dump()
     inventory = cast(Inventory, request.app.state.inventory)
     device = inventory.get_device(device_name)
     # result = await device.get_data("cfg_plain")
@@ -68,20 +351,166 @@ async def get_config(request: Request, device_name: str, connection: str = "ssh"
     return result
 
 
+@router.get("/devices/{device_name}/cfg/history")
+async def get_config_history(device_name: str):
+    """Returns archived configuration changes of the device, the oldest first"""
+    archive = _get_config_archive()
+    loop = asyncio.get_running_loop()
+    history = await loop.run_in_executor(None, archive.history, device_name)
+    return {"history": [entry._asdict() for entry in history]}
+
+
+@router.get("/devices/{device_name}/cfg/{digest}")
+async def get_archived_config(device_name: str, digest: str):
+    """Returns archived configuration by its digest or a prefix of it"""
+    archive = _get_config_archive()
+    loop = asyncio.get_running_loop()
+    snapshot = await loop.run_in_executor(None, archive.get, device_name, digest)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown configuration {digest}")
+    return snapshot.dump()
+
+
 @router.get("/network/lldp")
-async def lldp_graph(request: Request):
+async def lldp_graph(
+    request: Request, refresh: bool = False, deadline: Optional[float] = None
+):
+    """Updates LLDP topology with the devices which answered within the deadline
+
+    Devices which failed keep their last known links. Node and edge ids are
+    stable, changes are also pushed to /network/lldp/ws subscribers.
+    """
     inventory = cast(Inventory, request.app.state.inventory)
-    fetch_lldp_neighbors_tasks = [
-        asyncio.create_task(device.get_data("lldp")) for device in inventory.devices
-    ]
-
-    await asyncio.gather(*fetch_lldp_neighbors_tasks)
-    lldp_data = [
-        (device.name, task.result())
-        for task, device in zip(fetch_lldp_neighbors_tasks, inventory.devices)
-    ]
-    graph = Graph.from_lldp_data(lldp_data)
-    return graph.dump()
+    topology = _get_topology(request)
+    if deadline is None:
+        deadline = get_default_deadline()
+    results = await collect_device_data(
+        inventory.devices,
+        "lldp",
+        deadline=deadline,
+        force_refresh=refresh,
+        store=_get_state_store(request),
+    )
+    for result in results:
+        if result.is_ok:
+            topology.update_device(result.device.name, result.data)
+    device_names = {Node.normalize_name(device.name) for device in inventory.devices}
+    for device_name in topology.device_names - device_names:
+        topology.remove_device(device_name)
+    return {
+        **topology.dump(),
+        "failures": [result.dump_error() for result in results if not result.is_ok],
+    }
+
+
+def _get_node_id(topology: Topology, node_name: str) -> int:
+    node = topology.name_to_node.get(Node.normalize_name(node_name))
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Unknown node {node_name!r}")
+    return node.id
+
+
+@router.get("/network/lldp/path")
+async def lldp_path(request: Request, source: str, target: str):
+    """Returns the path with the least hops between two nodes
+
+    Analytics use the last known topology, see /network/lldp to refresh it.
+    """
+    topology = _get_topology(request)
+    source_id = _get_node_id(topology, source)
+    target_id = _get_node_id(topology, target)
+    path = topology.analytics().shortest_path(source_id, target_id)
+    return {
+        "version": topology.version,
+        "reachable": path is not None,
+        "nodes": path.node_ids if path is not None else [],
+        "edges": path.edge_ids if path is not None else [],
+    }
+
+
+@router.get("/network/lldp/components")
+async def lldp_components(request: Request):
+    """Returns node ids of the connected components, largest first"""
+    topology = _get_topology(request)
+    return {
+        "version": topology.version,
+        "components": topology.analytics().components,
+    }
+
+
+@router.get("/network/lldp/critical")
+async def lldp_critical(request: Request):
+    """Returns nodes and edges whose failure splits the network"""
+    topology = _get_topology(request)
+    analytics = topology.analytics()
+    return {
+        "version": topology.version,
+        "nodes": analytics.articulation_points,
+        "edges": analytics.bridges,
+    }
+
+
+@router.get("/network/lldp/impact")
+async def lldp_impact(
+    request: Request, node: Optional[str] = None, edge: Optional[int] = None
+):
+    """Returns what the network falls apart into without the node or the edge"""
+    if (node is None) == (edge is None):
+        raise HTTPException(
+            status_code=400, detail="Exactly one of node and edge is required"
+        )
+    topology = _get_topology(request)
+    analytics = topology.analytics()
+    if node is not None:
+        removal = analytics.remove_node(_get_node_id(topology, node))
+    else:
+        try:
+            removal = analytics.remove_edge(cast(int, edge))
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown edge {edge}")
+    return {
+        "version": topology.version,
+        "components": removal.components,
+        "isolated": removal.isolated,
+    }
+
+
+@router.websocket("/network/lldp/ws")
+async def lldp_graph_updates(websocket: WebSocket):
+    """Pushes LLDP topology changes
+
+    The first message is {"type": "snapshot", ...} with the full topology, then
+    every change is sent as {"type": "diff", ...}. Another snapshot is sent if
+    the client was too slow and missed some diffs.
+    """
+    topology = _get_topology(websocket)
+    await websocket.accept()
+    queue = topology.subscribe()
+    sender = asyncio.create_task(_send_topology_updates(websocket, topology, queue))
+    try:
+        while True:
+            # clients are not expected to send anything, wait for disconnect
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        topology.unsubscribe(queue)
+
+
+async def _send_topology_updates(
+    websocket: WebSocket,
+    topology: Topology,
+    queue: "asyncio.Queue[Optional[TopologyDiff]]",
+) -> None:
+    await websocket.send_json({"type": "snapshot", **topology.dump()})
+    while True:
+        diff = await queue.get()
+        if diff is None:
+            message = {"type": "snapshot", **topology.dump()}
+        else:
+            message = {"type": "diff", **diff.dump()}
+        await websocket.send_json(message)
 
 
 @router.get("/ping")
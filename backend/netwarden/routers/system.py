@@ -0,0 +1,53 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, Request
+
+from netwarden.connections.pool import session_pool
+from netwarden.connections.selector import transport_selector
+from netwarden.inventory.sync import NetBoxSync
+from netwarden.scheduler import scheduler
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/system/scheduler")
+async def scheduler_stats():
+    return scheduler.stats()
+
+
+@router.get("/system/sessions")
+async def session_pool_stats():
+    return session_pool.stats()
+
+
+@router.get("/system/transports")
+async def transport_stats():
+    return transport_selector.dump()
+
+
+@router.get("/system/poller")
+async def poller_stats(request: Request):
+    poller = getattr(request.app.state, "poller", None)
+    if poller is None:
+        raise HTTPException(status_code=404, detail="Poller is not enabled")
+    return poller.stats()
+
+
+def _get_netbox_sync(request: Request) -> NetBoxSync:
+    netbox_sync = getattr(request.app.state, "netbox_sync", None)
+    if netbox_sync is None:
+        raise HTTPException(status_code=404, detail="NetBox sync is not configured")
+    return netbox_sync
+
+
+@router.get("/system/netbox")
+async def netbox_sync_stats(request: Request):
+    return _get_netbox_sync(request).stats()
+
+
+@router.post("/system/netbox/sync")
+async def sync_netbox(request: Request, full: bool = False):
+    """Applies changes from NetBox to the inventory right away"""
+    result = await _get_netbox_sync(request).sync(full=full)
+    return result.dump()
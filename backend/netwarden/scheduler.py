@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Counter,
+    Deque,
+    Dict,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+
+from netwarden.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_GLOBAL_LIMIT = 100
+DEFAULT_SITE_LIMIT = 20
+DEFAULT_TRANSPORT_LIMITS = {
+    "ssh": 50,
+    "netconf": 50,
+    "restconf": 100,
+}
+
+
+class Waiter:
+    def __init__(self, site: str, transport: str) -> None:
+        self.site = site
+        self.transport = transport
+        self.future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class Scheduler:
+    """Limits the number of concurrent requests to the devices
+
+    There is a global limit, a limit per site and a limit per transport. Slots
+    are granted in FIFO order: a waiter is skipped only if its own site or
+    transport limit is exhausted, so one busy site does not block the others.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = DEFAULT_GLOBAL_LIMIT,
+        site_limit: int = DEFAULT_SITE_LIMIT,
+        transport_limits: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        self.global_limit = global_limit
+        self.site_limit = site_limit
+        self.transport_limits: Dict[str, int] = dict(
+            DEFAULT_TRANSPORT_LIMITS if transport_limits is None else transport_limits
+        )
+
+        self._waiters: Deque[Waiter] = collections.deque()
+        self._active = 0
+        self._active_by_site: Counter[str] = collections.Counter()
+        self._active_by_transport: Counter[str] = collections.Counter()
+
+        self._granted = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "Scheduler":
+        transport_limits = {
+            **DEFAULT_TRANSPORT_LIMITS,
+            **settings.get("scheduler.transport_limits", {}),
+        }
+        return cls(
+            global_limit=settings.get("scheduler.global_limit", DEFAULT_GLOBAL_LIMIT),
+            site_limit=settings.get("scheduler.site_limit", DEFAULT_SITE_LIMIT),
+            transport_limits=transport_limits,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _can_run(self, site: str, transport: str) -> bool:
+        if self._active >= self.global_limit:
+            return False
+        if self._active_by_site[site] >= self.site_limit:
+            return False
+        transport_limit = self.transport_limits.get(transport)
+        if transport_limit is not None:
+            if self._active_by_transport[transport] >= transport_limit:
+                return False
+        return True
+
+    def _grant(self, waiter: Waiter) -> None:
+        self._active += 1
+        self._active_by_site[waiter.site] += 1
+        self._active_by_transport[waiter.transport] += 1
+
+        wait_time = time.monotonic() - waiter.enqueued_at
+        self._granted += 1
+        self._wait_time_total += wait_time
+        self._wait_time_max = max(self._wait_time_max, wait_time)
+        waiter.future.set_result(None)
+
+    def _wake_up(self) -> None:
+        for waiter in list(self._waiters):
+            if self._active >= self.global_limit:
+                break
+            if waiter.future.done():
+                continue
+            if self._can_run(waiter.site, waiter.transport):
+                self._waiters.remove(waiter)
+                self._grant(waiter)
+
+    async def acquire(self, site: str, transport: str) -> None:
+        waiter = Waiter(site=site, transport=transport)
+        self._waiters.append(waiter)
+        self._wake_up()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # the slot was granted right before the cancellation
+                self.release(site, transport)
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, site: str, transport: str) -> None:
+        self._active -= 1
+        self._active_by_site[site] -= 1
+        if not self._active_by_site[site]:
+            del self._active_by_site[site]
+        self._active_by_transport[transport] -= 1
+        if not self._active_by_transport[transport]:
+            del self._active_by_transport[transport]
+        self._wake_up()
+
+    @asynccontextmanager
+    async def slot(self, site: str, transport: str) -> AsyncIterator[None]:
+        await self.acquire(site, transport)
+        try:
+            yield
+        finally:
+            self.release(site, transport)
+
+    async def run(self, fn: Callable[[], Awaitable[T]], site: str, transport: str) -> T:
+        async with self.slot(site=site, transport=transport):
+            return await fn()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest_wait = now - self._waiters[0].enqueued_at if self._waiters else 0.0
+        return {
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "active_by_site": dict(self._active_by_site),
+            "active_by_transport": dict(self._active_by_transport),
+            "limits": {
+                "global": self.global_limit,
+                "site": self.site_limit,
+                "transport": self.transport_limits,
+            },
+            "granted": self._granted,
+            "wait_time_avg": (
+                self._wait_time_total / self._granted if self._granted else 0.0
+            ),
+            "wait_time_max": self._wait_time_max,
+            "oldest_wait": oldest_wait,
+        }
+
+
+scheduler = Scheduler.from_settings()
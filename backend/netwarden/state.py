@@ -0,0 +1,111 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StateEntry(NamedTuple):
+    value: Any
+    version: int
+    updated_at: float  # UNIX timestamp
+
+
+# called with device name, key and the new entry, or None if it was removed
+StateListener = Callable[[str, str, Optional[StateEntry]], None]
+
+
+class StateStore:
+    """In-memory store of the latest data collected from the devices
+
+    Every write increments the version of the store, the entry keeps the version
+    at which it was written, so consumers can tell what changed since they last
+    looked. Writing the same value again only refreshes updated_at. Listeners
+    are notified about changed and removed entries.
+
+    Entries older than the max age of their key are not fresh, e.g. because
+    the device stopped answering, and must not be served as current data.
+    """
+
+    def __init__(
+        self,
+        max_ages: Optional[Mapping[str, float]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.version = 0
+        # key -> seconds after which its entries are stale, no limit if missing
+        self.max_ages: Dict[str, float] = dict(max_ages or {})
+        self.clock = clock
+        self._entries: Dict[Tuple[str, str], StateEntry] = {}
+        self._listeners: List[StateListener] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, device_key: Tuple[str, str]) -> bool:
+        return device_key in self._entries
+
+    def get(self, device_name: str, key: str) -> Optional[StateEntry]:
+        return self._entries.get((device_name, key))
+
+    def is_fresh(self, key: str, entry: StateEntry) -> bool:
+        max_age = self.max_ages.get(key)
+        return max_age is None or self.clock() - entry.updated_at <= max_age
+
+    def get_fresh(self, device_name: str, key: str) -> Optional[StateEntry]:
+        """Returns the entry unless it is older than the max age of the key"""
+        entry = self._entries.get((device_name, key))
+        if entry is None or not self.is_fresh(key, entry):
+            return None
+        return entry
+
+    def set(self, device_name: str, key: str, value: Any) -> StateEntry:
+        old_entry = self._entries.get((device_name, key))
+        if old_entry is not None and old_entry.value == value:
+            entry = old_entry._replace(updated_at=self.clock())
+            self._entries[(device_name, key)] = entry
+            return entry
+        self.version += 1
+        entry = StateEntry(value=value, version=self.version, updated_at=self.clock())
+        self._entries[(device_name, key)] = entry
+        self._notify(device_name, key, entry)
+        return entry
+
+    def add_listener(self, listener: StateListener) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, device_name: str, key: str, entry: Optional[StateEntry]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(device_name, key, entry)
+            except Exception:
+                logger.error(
+                    "State listener failed for %r, %r", device_name, key, exc_info=True
+                )
+
+    def get_key(self, key: str) -> Dict[str, StateEntry]:
+        """Returns entries of all devices for the key: device name -> entry"""
+        return {
+            device_name: entry
+            for (device_name, entry_key), entry in self._entries.items()
+            if entry_key == key
+        }
+
+    def changed_since(self, version: int) -> Dict[Tuple[str, str], StateEntry]:
+        return {
+            device_key: entry
+            for device_key, entry in self._entries.items()
+            if entry.version > version
+        }
+
+    def remove(self, device_name: str, key: str) -> None:
+        if self._entries.pop((device_name, key), None) is None:
+            return
+        self.version += 1
+        self._notify(device_name, key, None)
+
+    def remove_device(self, device_name: str) -> None:
+        for device_key in [k for k in self._entries if k[0] == device_name]:
+            del self._entries[device_key]
+            self._notify(device_name, device_key[1], None)
+        self.version += 1
@@ -1,4 +1,6 @@
-from typing import Dict, Any, TypeVar
+import importlib
+from functools import lru_cache
+from typing import Dict, Any, Mapping, Tuple, TypeVar
 
 T = TypeVar("T")
 
@@ -18,3 +20,39 @@ def merge_dicts(*dicts: Dict[str, Any]) -> Dict[str, Any]:
 
 def no_op(value: T) -> T:
     return value
+
+
+def make_request_key(key: str, kwargs: Mapping[str, Any]) -> Tuple[Any, ...]:
+    """Builds hashable key from the requested key and its arguments
+
+    Argument values are not guaranteed to be hashable, so their repr is used
+
+    Args:
+        key: type of requested information, e.g. "version_sn"
+        kwargs: arguments of the request
+
+    Returns:
+        tuple which can be used as a dictionary key
+    """
+    return (key, tuple(sorted((name, repr(v)) for name, v in kwargs.items())))
+
+
+@lru_cache(maxsize=None)
+def import_string(dotted_path: str) -> Any:
+    """Imports an object by its path, the module is imported on first use
+
+    Args:
+        dotted_path: "package.module:name" or "package.module.name"
+
+    Returns:
+        the imported object
+    """
+    if ":" in dotted_path:
+        module_name, _, attr_name = dotted_path.partition(":")
+    else:
+        module_name, _, attr_name = dotted_path.rpartition(".")
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, attr_name)
+    except AttributeError:
+        raise ImportError(f"{module_name!r} does not define {attr_name!r}") from None
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from netwarden.connections import base
+from netwarden.connections.base import Connection
+from netwarden.connections.registry import HandlerRegistry
+
+
+class FakeConnection(Connection):
+    NAME = "fake"
+    max_concurrent_handlers = 2
+
+    def __init__(self) -> None:
+        super().__init__(
+            name="fake", host="r1", username="u", password="p", platform="fake_os"
+        )
+        self.running = 0
+        self.max_running = 0
+        self.requests = 0
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def update_availability(self) -> None:
+        self._enabled = True
+
+    async def handle(self, handler, endpoint, delay, **kwargs):
+        self.requests += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(delay)
+        self.running -= 1
+        return handler({endpoint: delay})
+
+
+def register_handlers(monkeypatch, concurrent: bool):
+    handlers = [
+        {"endpoint": "/a", "delay": 0.03},
+        {"endpoint": "/b", "delay": 0.01},
+        {"endpoint": "/c", "delay": 0.02},
+    ]
+    registry = HandlerRegistry()
+    registry.register_transport("fake", ["endpoint"])
+    registry.register_platform("fake_os")
+    registry.register("fake_key", "fake_os", "fake", handlers, concurrent=concurrent)
+    monkeypatch.setattr(base, "registry", registry)
+    return handlers
+
+
+@pytest.mark.parametrize("concurrent,max_running", [(False, 1), (True, 2)])
+@pytest.mark.asyncio
+async def test_parse_runs_independent_handlers_concurrently(
+    monkeypatch, concurrent, max_running
+):
+    handlers = register_handlers(monkeypatch, concurrent)
+    conn = FakeConnection()
+    result = await conn.parse("fake_key")
+    assert list(result) == ["/a", "/b", "/c"]
+    assert conn.max_running == max_running
+    assert "handler" not in handlers[0]
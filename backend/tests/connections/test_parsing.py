@@ -0,0 +1,79 @@
+import pytest
+
+from netwarden.connections.ssh import parsing
+from netwarden.connections.ssh.constants import SSHParseMethod
+from netwarden.connections.ssh.parsing import ParserPool
+from netwarden.connections.ssh.platforms.cisco_iosxe import parse_show_run
+
+SHOW_RUN = """Building configuration...
+
+Current configuration : 1234 bytes
+!
+hostname R1
+!
+end"""
+
+
+class FakeResponse:
+    def __init__(self, channel_input: str, result: str) -> None:
+        self.channel_input = channel_input
+        self.result = result
+        self.textfsm_platform = "cisco_ios"
+        self.genie_platform = "iosxe"
+
+
+@pytest.mark.asyncio
+async def test_parser_pool_parses_in_worker_process():
+    pool = ParserPool(max_workers=1, inline_max_size=0)
+    response = FakeResponse("show run", SHOW_RUN)
+    try:
+        result = await pool.parse(response, parse_show_run, SSHParseMethod.NULL)
+    finally:
+        pool.close()
+    assert result == {"cfg": "hostname R1\n!\nend"}
+
+
+@pytest.mark.asyncio
+async def test_small_output_is_parsed_inline():
+    pool = ParserPool(max_workers=1)
+    response = FakeResponse("show run", SHOW_RUN)
+    assert pool.is_inline(response.result, SSHParseMethod.NULL)
+    assert not pool.is_inline(response.result, SSHParseMethod.GENIE)
+    result = await pool.parse(response, parse_show_run, SSHParseMethod.NULL)
+    assert result["cfg"].startswith("hostname R1")
+    assert pool._executor is None
+
+
+SHOW_LLDP = """Local Intf: Gi0/1
+Chassis id: 0011.2233.4455
+Port id: Gi0/2
+Port Description: uplink
+System Name: R2
+
+System Description:
+Cisco IOS Software
+
+Time remaining: 100 seconds
+System Capabilities: B,R
+Enabled Capabilities: R
+Management Addresses:
+    IP: 10.0.0.2
+Auto Negotiation - not supported
+Physical media capabilities - not advertised
+Media Attachment Unit type - not advertised
+Vlan ID: - not advertised
+
+Total entries displayed: 1
+"""
+
+
+def test_textfsm_template_is_compiled_once():
+    parsing.get_textfsm_parser.cache_clear()
+    for _ in range(2):
+        result = parsing.textfsm_parse(
+            "cisco_ios", "show lldp neighbors detail", SHOW_LLDP
+        )
+        assert len(result) == 1
+        assert result[0]["local_interface"] == "Gi0/1"
+    cache_info = parsing.get_textfsm_parser.cache_info()
+    assert (cache_info.misses, cache_info.hits) == (1, 1)
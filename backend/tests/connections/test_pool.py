@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from netwarden.connections.base import Connection, ConnectionError
+from netwarden.connections.pool import SessionPool
+
+
+class FakeSession(Connection):
+    NAME = "ssh"
+    SESSION_BASED = True
+
+    def __init__(self, host: str, fail_open: bool = False) -> None:
+        super().__init__(
+            name="ssh", host=host, username="u", password="p", platform="cisco_iosxe"
+        )
+        self.fail_open = fail_open
+        self.opened = 0
+        self.alive = True
+
+    async def open(self) -> None:
+        if self.fail_open:
+            raise OSError("connection refused")
+        self.opened += 1
+        self.is_open = True
+
+    async def close(self) -> None:
+        self.is_open = False
+
+    async def is_alive(self) -> bool:
+        return self.alive
+
+    async def update_availability(self) -> None:
+        pass
+
+    async def handle(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused_and_requests_are_serialized():
+    pool = SessionPool()
+    conn = FakeSession("r1")
+    in_session = 0
+    max_in_session = 0
+
+    async def request():
+        nonlocal in_session, max_in_session
+        async with pool.session(conn):
+            in_session += 1
+            max_in_session = max(max_in_session, in_session)
+            await asyncio.sleep(0)
+            in_session -= 1
+
+    await asyncio.gather(*(request() for _ in range(3)))
+    assert conn.opened == 1
+    assert max_in_session == 1
+    assert conn in pool
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_idle_session_is_evicted():
+    pool = SessionPool(max_sessions=2)
+    r1, r2, r3 = FakeSession("r1"), FakeSession("r2"), FakeSession("r3")
+    for conn in (r1, r2, r1, r3):
+        async with pool.session(conn):
+            pass
+    assert len(pool) == 2
+    assert r2 not in pool and not r2.is_open
+    assert r1 in pool and r3 in pool
+
+
+@pytest.mark.asyncio
+async def test_idle_and_dead_sessions_are_handled_by_check():
+    pool = SessionPool(idle_timeout=60)
+    idle, dead = FakeSession("idle"), FakeSession("dead")
+    for conn in (idle, dead):
+        async with pool.session(conn):
+            pass
+    idle.last_used -= 120
+    dead.alive = False
+    await pool.check_sessions()
+    assert idle not in pool
+    assert dead in pool and dead.opened == 2
+    await pool.close()
+    assert len(pool) == 0 and not dead.is_open
+
+
+@pytest.mark.asyncio
+async def test_failed_connection_backs_off():
+    pool = SessionPool(backoff_base=10)
+    conn = FakeSession("r1", fail_open=True)
+    with pytest.raises(ConnectionError, match="failed"):
+        async with pool.session(conn):
+            pass
+    conn.fail_open = False
+    with pytest.raises(ConnectionError, match="backing off"):
+        async with pool.session(conn):
+            pass
+    conn.retry_at = 0
+    async with pool.session(conn):
+        pass
+    assert conn.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_release_waits_for_the_request_and_forgets_the_session():
+    pool = SessionPool()
+    conn = FakeSession("r1")
+    entered = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def request():
+        async with pool.session(conn):
+            entered.set()
+            await finish.wait()
+            assert conn.is_open
+
+    task = asyncio.create_task(request())
+    await entered.wait()
+    release = asyncio.create_task(pool.release(conn))
+    await asyncio.sleep(0)
+    assert not release.done() and conn.is_open
+    finish.set()
+    await asyncio.gather(task, release)
+    assert conn not in pool and not conn.is_open
@@ -0,0 +1,80 @@
+import pytest
+
+from netwarden.connections import handlers
+from netwarden.connections.registry import HandlerRegistry
+from netwarden.connections.ssh.constants import SSHParseMethod
+from netwarden.connections.ssh.platforms.cisco_iosxe import parse_show_run
+from netwarden.utils import merge_dicts, no_op
+
+
+@pytest.fixture
+def registry():
+    registry = HandlerRegistry()
+    handlers.register(registry)
+    return registry
+
+
+def test_builtin_handlers_are_resolved_once(registry):
+    handler_set = registry.get("cfg", "cisco_iosxe", "ssh")
+    handler_infos = handler_set.handler_infos
+    assert handler_infos[0]["handler"] is parse_show_run
+    assert handler_set.handler_infos is handler_infos
+    assert handler_set.collect_fn is merge_dicts
+    restconf_handlers = registry.get("cfg", "cisco_iosxe", "restconf")
+    assert restconf_handlers.concurrent
+    assert all(info["handler"] is no_op for info in restconf_handlers.handler_infos)
+    assert registry.get_transports("lldp", "cisco_iosxe") == ("restconf", "ssh")
+    assert registry.get_transports("lldp", "unknown") == ()
+
+
+def test_handler_decorator_appends_handlers(registry):
+    # as a plugin would do it
+    registry.register_platform(
+        "juniper_junos", ssh_driver="scrapli.driver.core:AsyncJunosDriver"
+    )
+
+    @registry.handler(
+        "lldp",
+        "juniper_junos",
+        "ssh",
+        command="show lldp neighbors",
+        parse_method=SSHParseMethod.NULL,
+    )
+    def parse_lldp(data):
+        return {"lldp": data}
+
+    @registry.handler(
+        "lldp",
+        "juniper_junos",
+        "ssh",
+        command="show lldp local-information",
+        parse_method=SSHParseMethod.NULL,
+    )
+    def parse_local(data):
+        return {"local": data}
+
+    handler_set = registry.get("lldp", "juniper_junos", "ssh")
+    assert [info["handler"] for info in handler_set.handler_infos] == [
+        parse_lldp,
+        parse_local,
+    ]
+    assert registry.get_transports("lldp", "juniper_junos") == ("ssh",)
+
+
+@pytest.mark.parametrize(
+    "platform,transport,handler_info",
+    [
+        (
+            "unknown_os",
+            "ssh",
+            {"command": "show run", "parse_method": SSHParseMethod.NULL},
+        ),
+        ("cisco_iosxe", "telnet", {"command": "show run"}),
+        ("cisco_iosxe", "ssh", {"command": "show run"}),
+        ("cisco_iosxe", "ssh", {"command": "show run", "parse_method": "textfsm"}),
+        ("cisco_iosxe", "restconf", {"endpoint": "/data/native", "handler": "no_op"}),
+    ],
+)
+def test_invalid_specs_are_rejected(registry, platform, transport, handler_info):
+    with pytest.raises(ValueError):
+        registry.register("cfg", platform, transport, [handler_info])
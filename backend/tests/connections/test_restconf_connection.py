@@ -0,0 +1,36 @@
+import httpx
+import pytest
+
+from netwarden.connections.base import ConnectionError
+from netwarden.connections.restconf.connection import RESTCONF, RETRY_BACKOFF_MAX
+from netwarden.connections.restconf.transport import restconf_transport
+
+
+@pytest.mark.asyncio
+async def test_restconf_is_checked_again_after_backoff(monkeypatch):
+    calls = []
+
+    async def get_root(host, auth):
+        calls.append(host)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused")
+        return "/restconf"
+
+    monkeypatch.setattr(restconf_transport, "get_root", get_root)
+    conn = RESTCONF(
+        name="restconf",
+        host="10.0.0.1",
+        username="u",
+        password="p",
+        platform="cisco_iosxe",
+    )
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await conn.raise_for_error()
+    assert len(calls) == 1 and conn.retry_at > 0
+
+    # the backoff expired and the device recovered
+    conn.retry_at -= RETRY_BACKOFF_MAX
+    await conn.raise_for_error()
+    assert len(calls) == 2
+    assert conn.root == "/restconf" and conn.retry_at == 0.0
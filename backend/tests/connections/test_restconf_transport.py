@@ -0,0 +1,37 @@
+import httpx
+import pytest
+
+from netwarden.connections.restconf.transport import RESTCONFTransport
+
+HOST_META = b"""<XRD xmlns='http://docs.oasis-open.org/ns/xri/xrd-1.0'>
+    <Link rel='restconf' href='/restconf'/>
+</XRD>"""
+
+
+@pytest.mark.asyncio
+async def test_restconf_root_is_discovered_once_per_host():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=HOST_META)
+
+    transport = RESTCONFTransport(http2=False, transport=httpx.MockTransport(handler))
+    auth = ("cisco", "cisco")
+    assert await transport.get_root("10.0.0.1", auth=auth) == "/restconf"
+    assert await transport.get_root("10.0.0.1", auth=auth) == "/restconf"
+    assert await transport.get_root("10.0.0.2", auth=auth) == "/restconf"
+    assert [request.url.host for request in requests] == ["10.0.0.1", "10.0.0.2"]
+    assert transport.roots == {"10.0.0.1": "/restconf", "10.0.0.2": "/restconf"}
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_missing_restconf_link_raises():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"<XRD/>")
+
+    transport = RESTCONFTransport(http2=False, transport=httpx.MockTransport(handler))
+    with pytest.raises(ValueError):
+        await transport.get_root("10.0.0.1", auth=("cisco", "cisco"))
+    await transport.close()
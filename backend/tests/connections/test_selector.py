@@ -0,0 +1,54 @@
+from netwarden.connections.selector import CircuitState, TransportSelector
+
+
+class FakeConnection:
+    def __init__(self, name: str, priority: int) -> None:
+        self.name = name
+        self.priority = priority
+
+
+RESTCONF = FakeConnection("restconf", 700)
+SSH = FakeConnection("ssh", 500)
+
+
+def names(conns):
+    return [conn.name for conn in conns]
+
+
+def test_faster_transport_is_preferred():
+    selector = TransportSelector()
+    assert names(selector.order("R1", "lldp", [SSH, RESTCONF])) == ["restconf", "ssh"]
+
+    selector.record_success("R1", "restconf", "lldp", 3.0)
+    selector.record_success("R1", "ssh", "lldp", 0.5)
+    assert names(selector.order("R1", "lldp", [SSH, RESTCONF])) == ["ssh", "restconf"]
+    # statistics are kept per key
+    assert names(selector.order("R1", "version_sn", [SSH, RESTCONF]))[0] == "restconf"
+
+
+def test_single_failure_does_not_demote_transport_for_good():
+    selector = TransportSelector()
+    selector.record_success("R1", "restconf", "lldp", 0.2)
+    selector.record_success("R1", "ssh", "lldp", 1.0)
+    selector.record_failure("R1", "restconf", "lldp")
+    assert names(selector.order("R1", "lldp", [SSH, RESTCONF]))[0] == "restconf"
+
+
+def test_circuit_opens_and_recovers_after_half_open_probe(clock):
+    selector = TransportSelector(failure_threshold=2, open_timeout=30, clock=clock)
+    selector.record_success("R1", "ssh", "lldp", 1.0)
+    for _ in range(2):
+        selector.record_failure("R1", "restconf", "lldp")
+    stats = selector.get_stats("R1", "restconf", "lldp")
+    assert stats is not None and stats.state is CircuitState.OPEN
+    assert names(selector.order("R1", "lldp", [RESTCONF, SSH])) == ["ssh", "restconf"]
+
+    clock.now = 31
+    assert names(selector.order("R1", "lldp", [SSH, RESTCONF]))[0] == "restconf"
+    assert stats.state is CircuitState.HALF_OPEN
+    # only one probe at a time
+    assert names(selector.order("R1", "lldp", [SSH, RESTCONF]))[0] == "ssh"
+
+    selector.record_success("R1", "restconf", "lldp", 0.1)
+    assert stats.state is CircuitState.CLOSED
+    assert names(selector.order("R1", "lldp", [SSH, RESTCONF]))[0] == "restconf"
@@ -0,0 +1,74 @@
+from typing import List, NamedTuple
+
+import pytest
+
+from netwarden.connections.pool import session_pool
+from netwarden.connections.registry import HandlerRegistry
+from netwarden.connections.ssh.connection import SSH
+from netwarden.connections.ssh.constants import SSHParseMethod
+
+
+class FakeResponse(NamedTuple):
+    channel_input: str
+    result: str
+    textfsm_platform: str = "cisco_ios"
+    genie_platform: str = "iosxe"
+
+
+class FakeScrapli:
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def isalive(self) -> bool:
+        return True
+
+    async def send_commands(self, commands: List[str]) -> List[FakeResponse]:
+        self.batches.append(commands)
+        return [FakeResponse(command, f"output of {command}") for command in commands]
+
+
+def parse_output(data):
+    return {"output": data}
+
+
+def parse_broken(data):
+    raise ValueError("unexpected output")
+
+
+@pytest.mark.asyncio
+async def test_failed_parse_only_fails_its_key(monkeypatch):
+    registry = HandlerRegistry()
+    registry.register_platform("cisco_iosxe")
+    for key, handler in (("good", parse_output), ("broken", parse_broken)):
+        registry.register(
+            key,
+            "cisco_iosxe",
+            "ssh",
+            [
+                {
+                    "command": f"show {key}",
+                    "handler": handler,
+                    "parse_method": SSHParseMethod.NULL,
+                }
+            ],
+        )
+    conn = SSH(
+        name="ssh", host="r1", username="u", password="p", platform="cisco_iosxe"
+    )
+    scrapli = FakeScrapli()
+    conn._scrapli_conn = scrapli  # type: ignore
+    monkeypatch.setattr(
+        conn, "get_handlers", lambda key: registry.get(key, "cisco_iosxe", "ssh")
+    )
+
+    results = await conn.parse_many(["good", "broken"])
+    assert scrapli.batches == [["show good", "show broken"]]
+    assert results["good"] == {"output": "output of show good"}
+    assert isinstance(results["broken"], ValueError)
+    await session_pool.release(conn)
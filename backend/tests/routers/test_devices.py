@@ -1,11 +1,18 @@
+import asyncio
+import json
+
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 import pytest
 
 
 from netwarden.app import app
+from netwarden.archive import ConfigArchive
 from netwarden.inventory.inventory import Inventory
 from netwarden.inventory.device import Device
+from netwarden.models.graph import LLDPNeighborInterface
+from netwarden.models.topology import Topology
+from netwarden.routers import devices
 
 INVENTORY = Inventory(
     {
@@ -106,3 +113,188 @@ async def test_get_devices():
         response = await client.get("/api/devices")
     assert response.status_code == 200
     assert len(response.json()) == len(INVENTORY)
+
+
+@pytest.mark.asyncio
+async def test_stream_devices(monkeypatch):
+    async def get_data(self, key, **kwargs):
+        if self.name == "R2":
+            raise ConnectionError("unreachable")
+        return {"software_version": "17.3.1a", "serial_number": self.name}
+
+    monkeypatch.setattr(Device, "get_data", get_data)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/devices/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    devices = [record["data"] for record in records if record["type"] == "device"]
+    summary = records[-1]
+    assert len(devices) == len(INVENTORY) - 1
+    assert all(device["serial_number"] == device["name"] for device in devices)
+    assert summary["type"] == "summary"
+    assert summary["failed"] == 1
+    assert summary["failures"][0]["name"] == "R2"
+
+
+@pytest.mark.asyncio
+async def test_get_devices_returns_partial_results_after_deadline(monkeypatch):
+    async def get_data(self, key, **kwargs):
+        if self.name == "R3":
+            await asyncio.sleep(10)
+        elif self.name == "R4":
+            raise ValueError("unexpected output")
+        return {"software_version": "17.3.1a", "serial_number": self.name}
+
+    monkeypatch.setattr(Device, "get_data", get_data)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/devices", params={"deadline": 0.1})
+    assert response.status_code == 200
+    name_to_device = {device["name"]: device for device in response.json()}
+    assert len(name_to_device) == len(INVENTORY)
+    assert name_to_device["R1"]["status"] == "ok"
+    assert name_to_device["R1"]["serial_number"] == "R1"
+    assert name_to_device["R3"]["status"] == "timeout"
+    assert name_to_device["R3"]["elapsed"] >= 0.1
+    assert name_to_device["R4"]["status"] == "error"
+
+
+def test_lldp_graph_updates_snapshot():
+    with client.websocket_connect("/api/network/lldp/ws") as websocket:
+        message = websocket.receive_json()
+    assert message["type"] == "snapshot"
+    assert {"version", "nodes", "edges"} <= message.keys()
+
+
+@pytest.mark.asyncio
+async def test_query_devices_batches_keys_per_device(monkeypatch):
+    from netwarden.connections.base import Connection
+
+    inventory = Inventory(
+        {
+            name: Device(
+                name=name,
+                host=f"192.0.2.{i}",
+                username="cisco",
+                password="cisco",
+                platform="cisco_iosxe",
+                site=site,
+            )
+            for i, (name, site) in enumerate([("A1", "a"), ("A2", "a"), ("B1", "b")])
+        }
+    )
+    batches = []
+
+    async def parse_many(self, keys, **kwargs):
+        batches.append((self.host, list(keys)))
+        return {
+            key: ValueError("no lldp") if key == "lldp" else {"key": key}
+            for key in keys
+        }
+
+    async def fetch_data(self, key, **kwargs):
+        return {"fallback": key}
+
+    monkeypatch.setattr(Connection, "parse_many", parse_many)
+    monkeypatch.setattr(Device, "fetch_data", fetch_data)
+    monkeypatch.setattr(app.state, "inventory", inventory)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post(
+            "/api/devices/query",
+            json={"devices": {"site": "a"}, "keys": ["version_sn", "lldp"]},
+        )
+        bad_response = await client.post("/api/devices/query", json={"keys": ["x"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert sorted(results) == ["A1", "A2"]
+    assert results["A1"] == {
+        "version_sn": {"key": "version_sn"},
+        "lldp": {"fallback": "lldp"},
+    }
+    assert sorted(batches) == [
+        ("192.0.2.0", ["version_sn", "lldp"]),
+        ("192.0.2.1", ["version_sn", "lldp"]),
+    ]
+    assert bad_response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_devices_filters_and_pages(monkeypatch):
+    async def get_data(self, key, **kwargs):
+        return {"software_version": "17.3.1a", "serial_number": self.name}
+
+    monkeypatch.setattr(Device, "get_data", get_data)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get(
+            "/api/devices",
+            params={"platform": "cisco_iosxe", "offset": 2, "limit": 3},
+        )
+        empty_response = await client.get("/api/devices", params={"site": "nowhere"})
+    assert response.status_code == 200
+    assert response.headers["x-total-count"] == str(len(INVENTORY))
+    assert [device["name"] for device in response.json()] == ["R2", "R3", "R4"]
+    assert empty_response.json() == []
+    assert empty_response.headers["x-total-count"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_get_devices_projects_fields_without_querying(monkeypatch):
+    async def get_data(self, key, **kwargs):
+        raise AssertionError("devices must not be queried")
+
+    monkeypatch.setattr(Device, "get_data", get_data)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get(
+            "/api/devices", params={"fields": "site", "sort": "-name", "limit": 2}
+        )
+        next_response = await client.get(
+            "/api/devices",
+            params={
+                "fields": "site",
+                "sort": "-name",
+                "limit": 2,
+                "cursor": response.headers["x-next-cursor"],
+            },
+        )
+        bad_response = await client.get("/api/devices", params={"fields": "password"})
+    assert response.json() == [
+        {"name": "R9", "site": "N/A"},
+        {"name": "R8", "site": "N/A"},
+    ]
+    assert [device["name"] for device in next_response.json()] == ["R7", "R6"]
+    assert bad_response.status_code == 400
+
+
+def test_lldp_analytics(monkeypatch):
+    topology = Topology()
+    topology.update_device(
+        "R1",
+        {
+            "Gi1": [LLDPNeighborInterface("Gi1", "R2")],
+            "Gi2": [LLDPNeighborInterface("Gi1", "R3")],
+        },
+    )
+    monkeypatch.setattr(app.state, "topology", topology, raising=False)
+
+    response = client.get("/api/network/lldp/path?source=R2&target=R3.lab")
+    assert response.json()["nodes"] == [2, 1, 3]
+    assert client.get("/api/network/lldp/path?source=R2&target=R9").status_code == 404
+    assert client.get("/api/network/lldp/critical").json()["nodes"] == [1]
+    response = client.get("/api/network/lldp/impact?node=R1")
+    assert response.json()["isolated"] == [3]
+    assert client.get("/api/network/lldp/impact").status_code == 400
+
+
+def test_get_archived_config(monkeypatch, tmp_path):
+    archive = ConfigArchive(tmp_path)
+    monkeypatch.setattr(devices, "config_archive", archive)
+    assert client.get("/api/devices/R1/cfg?archived=true").status_code == 404
+
+    entry = archive.archive("R1", "hostname R1\nend", "ssh")
+    response = client.get("/api/devices/R1/cfg?archived=true")
+    assert response.json()["cfg"] == "hostname R1\nend\n"
+    assert response.json()["digest"] == entry.digest
+    history = client.get("/api/devices/R1/cfg/history").json()["history"]
+    assert [item["digest"] for item in history] == [entry.digest]
+    response = client.get(f"/api/devices/R1/cfg/{entry.digest[:12]}")
+    assert response.json()["transport"] == "ssh"
@@ -0,0 +1,53 @@
+import pytest
+
+from netwarden.models.adjacency import Adjacency
+from netwarden.models.analytics import TopologyAnalytics
+
+# 1 - 2 - 3 = 4 with a triangle 3, 5, 6 and a separate link 7 - 8
+EDGES = [
+    (1, 2, 10),
+    (2, 3, 11),
+    (3, 4, 12),
+    (3, 4, 13),
+    (3, 5, 14),
+    (5, 6, 15),
+    (6, 3, 16),
+    (7, 8, 17),
+]
+
+
+@pytest.fixture
+def analytics():
+    return TopologyAnalytics(Adjacency(range(1, 9), EDGES))
+
+
+def test_shortest_path_and_reachability(analytics):
+    path = analytics.shortest_path(1, 6)
+    assert path.node_ids == [1, 2, 3, 6]
+    assert path.edge_ids == [10, 11, 16]
+    assert analytics.shortest_path(4, 4).node_ids == [4]
+    assert analytics.shortest_path(1, 8) is None
+    assert analytics.is_reachable(7, 8)
+    with pytest.raises(KeyError):
+        analytics.shortest_path(1, 100)
+
+
+def test_articulation_points_and_bridges(analytics):
+    assert analytics.components == [[1, 2, 3, 4, 5, 6], [7, 8]]
+    assert analytics.articulation_points == [2, 3]
+    # parallel links between 3 and 4 protect each other
+    assert analytics.bridges == [10, 11, 17]
+
+
+def test_removal(analytics):
+    removal = analytics.remove_node(3)
+    assert removal.components == [[1, 2], [5, 6], [4]]
+    assert removal.isolated == [4, 5, 6]
+    assert analytics.remove_node(5) == ([[1, 2, 3, 4, 6]], [])
+
+    removal = analytics.remove_edge(11)
+    assert removal.components == [[3, 4, 5, 6], [1, 2]]
+    assert removal.isolated == [1, 2]
+    assert analytics.remove_edge(12).isolated == []
+    with pytest.raises(KeyError):
+        analytics.remove_edge(100)
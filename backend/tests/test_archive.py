@@ -0,0 +1,40 @@
+import os
+
+from netwarden.archive import ConfigArchive, normalize_config
+
+CFG = "hostname R1\n!\ninterface GigabitEthernet1\n ip address dhcp\n!\nend"
+
+
+def count_objects(archive):
+    return sum(len(files) for _, _, files in os.walk(archive.path / "objects"))
+
+
+def test_identical_configs_are_stored_once(tmp_path):
+    archive = ConfigArchive(tmp_path, use_zstd=False)
+    entry = archive.archive("R1", CFG, "ssh")
+    polled = "! Last configuration change at 10:00:00 UTC Mon\n" + CFG + "  \r\n"
+    assert archive.archive("R1", polled, "ssh") == entry
+    archive.archive("R2", CFG, "netconf")
+    assert count_objects(archive) == 1
+    assert len(archive.history("R1")) == 1
+
+    archive.archive("R1", CFG.replace("dhcp", "10.0.0.1 255.255.255.0"), "ssh")
+    archive.archive("R1", CFG, "ssh")
+    assert count_objects(archive) == 2
+    assert [e.digest for e in archive.history("R1")][::2] == [entry.digest] * 2
+
+    # history survives a restart
+    restarted = ConfigArchive(tmp_path, use_zstd=False)
+    assert restarted.history("R1") == archive.history("R1")
+    snapshot = restarted.latest("R1")
+    assert snapshot.cfg == normalize_config(CFG)
+    assert restarted.get("R1", entry.digest[:8]).entry.digest == entry.digest
+    assert restarted.latest("R3") is None
+
+
+def test_structured_configs_are_returned_as_parsed(tmp_path):
+    archive = ConfigArchive(tmp_path)
+    cfg = {"native": {"hostname": "R1"}, "interfaces": {"interface": []}}
+    entry = archive.archive("R1", cfg, "restconf")
+    assert archive.archive("R1", dict(reversed(cfg.items())), "restconf") == entry
+    assert archive.latest("R1").cfg == cfg
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from netwarden.cache import ResultCache
+
+
+class Fetcher:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_is_served_from_cache(clock):
+    cache = ResultCache(ttls={"lldp": 10}, clock=clock)
+    fetch = Fetcher()
+    assert await cache.get_or_fetch("lldp", fetch) == 1
+    assert await cache.get_or_fetch("lldp", fetch) == 1
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_kwargs_are_part_of_the_key(clock):
+    cache = ResultCache(ttls={"lldp": 10}, clock=clock)
+    fetch = Fetcher()
+    await cache.get_or_fetch("lldp", fetch, vrf="a")
+    await cache.get_or_fetch("lldp", fetch, vrf="b")
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing(clock):
+    cache = ResultCache(ttls={"lldp": 10}, max_stale=100, clock=clock)
+    fetch = Fetcher()
+    await cache.get_or_fetch("lldp", fetch)
+    clock.now = 20
+    results = [await cache.get_or_fetch("lldp", fetch) for _ in range(3)]
+    assert results == [1, 1, 1]
+    await asyncio.sleep(0)
+    assert fetch.calls == 2
+    assert await cache.get_or_fetch("lldp", fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_too_old_entry_and_force_refresh_fetch_synchronously(clock):
+    cache = ResultCache(ttls={"lldp": 10}, max_stale=5, clock=clock)
+    fetch = Fetcher()
+    await cache.get_or_fetch("lldp", fetch)
+    clock.now = 20
+    assert await cache.get_or_fetch("lldp", fetch) == 2
+    assert await cache.get_or_fetch("lldp", fetch, force_refresh=True) == 3
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from netwarden.connections.pool import session_pool
+from netwarden.connections.restconf.connection import RESTCONF
+from netwarden.inventory.device import Device
+from netwarden.inventory.inventory import Inventory
+
+
+def test_connections_are_created_lazily_and_released_when_idle():
+    device = Device(
+        name="R1",
+        host="192.0.2.1",
+        username="u",
+        password="p",
+        platform="cisco_iosxe",
+    )
+    inventory = Inventory({"R1": device}, connection_idle_timeout=60)
+    assert [spec.name for spec in device.connection_specs] == [
+        "restconf",
+        "ssh",
+        "netconf",
+    ]
+    assert device.connections == []
+
+    ssh = device.get_connection("ssh")
+    assert device.get_connection("ssh") is ssh
+    assert device.connections == [ssh]
+    assert inventory.release_idle_connections() == 0
+
+    ssh.last_used = time.monotonic() - 61
+    ssh.is_open = True
+    assert inventory.release_idle_connections() == 0
+    ssh.is_open = False
+    assert inventory.release_idle_connections() == 1
+    assert device.connections == []
+    assert device.get_connection("ssh") is not ssh
+
+
+@pytest.mark.asyncio
+async def test_closing_device_releases_its_sessions():
+    device = Device(
+        name="R1",
+        host="192.0.2.1",
+        username="u",
+        password="p",
+        platform="cisco_iosxe",
+    )
+    Inventory({"R1": device})
+    ssh = device.get_connection("ssh")
+    ssh.is_open = True
+    session_pool._open[ssh] = None
+    await device.close()
+    assert ssh not in session_pool and not ssh.is_open
+
+
+def test_connection_port_is_passed_to_the_connection():
+    device = Device(
+        name="R1",
+        host="192.0.2.1",
+        username="u",
+        password="p",
+        platform="cisco_iosxe",
+    )
+    Inventory({"R1": device})
+    device.create_connection(RESTCONF, port=8443)
+    restconf = device.get_connection("restconf")
+    assert restconf.port == 8443
+    restconf.root = "/restconf"
+    assert restconf.build_url("/data") == "https://192.0.2.1:8443/restconf/data"
+    assert device.get_connection("ssh").port is None
@@ -0,0 +1,50 @@
+from netwarden.inventory.device import Device
+from netwarden.inventory.index import InventoryIndex
+
+
+def make_device(name, site, model="C8000V", tags=(), netbox_id=None):
+    return Device(
+        name=name,
+        host="192.0.2.1",
+        username="u",
+        password="p",
+        platform="cisco_iosxe",
+        vendor="Cisco",
+        site=site,
+        model=model,
+        tags=list(tags),
+        netbox_id=netbox_id,
+    )
+
+
+def test_select_intersects_indexes():
+    index = InventoryIndex(
+        [
+            make_device("R3", "ams", tags=["core"]),
+            make_device("R1", "ams", tags=["core", "edge"], netbox_id=1),
+            make_device("R2", "fra", model="ASR1001", tags=["core"]),
+        ]
+    )
+    assert index.select() == ["R1", "R2", "R3"]
+    assert index.select(site="ams") == ["R1", "R3"]
+    assert index.select(platform="cisco_iosxe", tags=["core"]) == ["R1", "R2", "R3"]
+    assert index.select(site="ams", tags=["edge"]) == ["R1"]
+    assert index.select(names=["R2", "R9"], vendor="Cisco") == ["R2"]
+    assert index.select(site="ams", model="ASR1001") == []
+    assert index.select(site="nyc") == []
+    assert index.counts("site") == {"ams": 2, "fra": 1}
+    assert index.get_name_by_netbox_id(1) == "R1"
+
+
+def test_rows_are_updated_and_reused():
+    index = InventoryIndex([make_device("R1", "ams", netbox_id=1)])
+    index.add(make_device("R1", "fra", tags=["edge"]))
+    assert index.select(site="ams") == []
+    assert index.select(site="fra", tags=["edge"]) == ["R1"]
+    assert index.get_name_by_netbox_id(1) is None
+    index.remove("R1")
+    index.add(make_device("R2", "ams"))
+    assert len(index) == 1
+    assert index.select() == ["R2"]
+    assert index.select(tags=["edge"]) == []
+    assert index.counts("site") == {"ams": 1}
@@ -0,0 +1,75 @@
+import base64
+import json
+
+import pytest
+
+from netwarden.inventory.device import Device
+from netwarden.inventory.inventory import Inventory
+from netwarden.inventory.query import get_device_page
+
+
+@pytest.fixture
+def inventory():
+    sites = {"R1": "ams", "R2": "fra", "R3": "ams", "R4": "fra", "R5": "ams"}
+    return Inventory(
+        {
+            name: Device(
+                name=name,
+                host="192.0.2.1",
+                username="u",
+                password="p",
+                platform="cisco_iosxe",
+                site=site,
+            )
+            for name, site in sites.items()
+        }
+    )
+
+
+def names(page):
+    return [device.name for device in page.devices]
+
+
+def test_sort_and_offset(inventory):
+    page = get_device_page(inventory, sort="-site", offset=1, limit=3)
+    assert names(page) == ["R4", "R1", "R3"]
+    assert page.total == 5
+    page = get_device_page(inventory, {"site": "ams"}, sort="-name")
+    assert names(page) == ["R5", "R3", "R1"]
+    assert page.next_cursor is None
+
+
+def test_cursor_survives_removed_devices(inventory):
+    first_page = get_device_page(inventory, sort="site", limit=2)
+    assert names(first_page) == ["R1", "R3"]
+    inventory.remove_device("R1")
+    second_page = get_device_page(
+        inventory, sort="site", limit=2, cursor=first_page.next_cursor
+    )
+    assert names(second_page) == ["R5", "R2"]
+    last_page = get_device_page(
+        inventory, sort="site", limit=2, cursor=second_page.next_cursor
+    )
+    assert names(last_page) == ["R4"]
+    assert last_page.next_cursor is None
+    with pytest.raises(ValueError):
+        get_device_page(inventory, sort="name", cursor=first_page.next_cursor)
+    with pytest.raises(ValueError):
+        get_device_page(inventory, sort="password")
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        ["name", "R1"],
+        [["name"], ["R1"]],
+        ["name", [1]],
+        ["site", ["Lab"]],
+        ["password", ["secret", "R1"]],
+        {"sort": "name"},
+    ],
+)
+def test_malformed_cursor_is_rejected(inventory, data):
+    cursor = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+    with pytest.raises(ValueError, match="cursor|sort"):
+        get_device_page(inventory, cursor=cursor)
@@ -0,0 +1,223 @@
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from netwarden.connections.selector import transport_selector
+from netwarden.inventory.inventory import Inventory
+from netwarden.inventory.snapshot import InventorySnapshot, SnapshotFile
+from netwarden.inventory.sync import NetBoxSync
+from netwarden.netbox import NetBox
+
+
+def make_device_data(id: int, name: str, model: str = "CSR1000v") -> Dict[str, Any]:
+    return {
+        "id": id,
+        "name": name,
+        "site": {"name": "Lab", "slug": "lab"},
+        "primary_ip": {"address": f"10.0.0.{id}/24"},
+        "device_type": {"manufacturer": {"name": "Cisco"}, "model": model},
+        "platform": {"slug": "cisco_iosxe", "name": "Cisco IOS-XE"},
+    }
+
+
+def make_netbox(handler) -> NetBox:
+    netbox = NetBox(url="http://netbox", token="token", page_size=1000)
+    netbox.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return netbox
+
+
+@pytest.mark.asyncio
+async def test_list_fetches_all_pages():
+    devices = [make_device_data(id, f"R{id}") for id in range(1, 251)]
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        # NetBox caps the requested page size with MAX_PAGE_SIZE
+        limit = min(int(request.url.params["limit"]), 100)
+        offset = int(request.url.params["offset"])
+        next_url = "next" if offset + limit < len(devices) else None
+        page = {
+            "count": len(devices),
+            "next": next_url,
+            "results": devices[offset : offset + limit],
+        }
+        return httpx.Response(200, json=page)
+
+    netbox = make_netbox(handler)
+    result = await netbox.devices.list()
+    assert [device["id"] for device in result] == list(range(1, 251))
+    assert sorted(int(r.url.params["offset"]) for r in requests) == [0, 100, 200]
+
+
+@pytest.mark.asyncio
+async def test_sync_applies_deltas_to_inventory():
+    devices = {1: make_device_data(1, "R1"), 2: make_device_data(2, "R2")}
+    deleted: List[Dict[str, Any]] = []
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/extras/object-changes"):
+            results = deleted
+        else:
+            results = list(devices.values())
+            if "last_updated__gte" in request.url.params:
+                results = results[1:]
+        return httpx.Response(
+            200, json={"count": len(results), "next": None, "results": results}
+        )
+
+    inventory = Inventory()
+    netbox_sync = NetBoxSync(make_netbox(handler), inventory)
+    result = await netbox_sync.sync()
+    assert result.full
+    assert result.added == ["R1", "R2"]
+    r1 = inventory.get_device("R1")
+    assert r1.connection_specs
+    assert not r1.connections
+
+    # R2 was renamed and its model changed, R1 was deleted
+    devices[2] = make_device_data(2, "R2-new", model="CSR1000v-2")
+    deleted.append({"changed_object_id": 1, "action": {"value": "delete"}})
+    result = await netbox_sync.sync()
+    assert not result.full
+    assert result.updated == ["R2-new"]
+    assert result.removed == ["R1"]
+    assert [device.name for device in inventory.devices] == ["R2-new"]
+    assert inventory.get_device("R2-new").model == "CSR1000v-2"
+    delta_params = [request.url.params for request in requests[-2:]]
+    assert any("last_updated__gte" in params for params in delta_params)
+    assert any("time_after" in params for params in delta_params)
+
+
+@pytest.mark.asyncio
+async def test_devices_with_changed_credentials_are_requested_in_chunks():
+    devices = {id: make_device_data(id, f"R{id}") for id in range(1, 251)}
+    device_requests: List[httpx.Request] = []
+    password = "admin123"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/get-session-key/"):
+            return httpx.Response(200, json={"session_key": "s3cr3t"})
+        if path.endswith("/extras/object-changes"):
+            results: List[Dict[str, Any]] = []
+        elif path.endswith("/secrets/secrets"):
+            results = [
+                {
+                    "device": {"id": id},
+                    "role": {"slug": "login-credentials"},
+                    "name": "admin",
+                    "plaintext": password,
+                }
+                for id in devices
+            ]
+        else:
+            device_requests.append(request)
+            ids = request.url.params.get_list("id")
+            if ids:
+                results = [devices[int(id)] for id in ids]
+            elif "last_updated__gte" in request.url.params:
+                results = []
+            else:
+                results = list(devices.values())
+        return httpx.Response(
+            200, json={"count": len(results), "next": None, "results": results}
+        )
+
+    netbox = NetBox(url="http://netbox", token="token", private_key="private key")
+    netbox.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    inventory = Inventory()
+    netbox_sync = NetBoxSync(netbox, inventory)
+    await netbox_sync.sync()
+    device_requests.clear()
+
+    # the password of every device changed, the devices themselves did not
+    password = "admin456"
+    result = await netbox_sync.sync()
+    assert not result.full
+    id_counts = sorted(
+        len(request.url.params.get_list("id")) for request in device_requests
+    )
+    assert id_counts == [0, 50, 100, 100]
+    assert len(result.updated) == 250
+
+
+@pytest.mark.asyncio
+async def test_session_key_is_cached_in_encrypted_file(tmp_path):
+    session_key_file = tmp_path / "session_key"
+    session_key_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/get-session-key/"):
+            session_key_requests.append(request)
+            return httpx.Response(200, json={"session_key": "s3cr3t"})
+        assert request.headers["X-Session-Key"] == "s3cr3t"
+        secret = {
+            "device": {"id": 1},
+            "role": {"slug": "login-credentials"},
+            "name": "admin",
+            "plaintext": "admin123",
+        }
+        return httpx.Response(200, json={"count": 1, "next": None, "results": [secret]})
+
+    for _ in range(2):
+        netbox = NetBox(
+            url="http://netbox",
+            token="token",
+            private_key="private key",
+            session_key_file=str(session_key_file),
+        )
+        netbox.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        secrets = await netbox.secrets.list()
+    assert len(session_key_requests) == 1
+    assert b"s3cr3t" not in session_key_file.read_bytes()
+    login_creds = NetBox.build_device_id_to_login_creds(secrets)
+    assert login_creds == {1: {"username": "admin", "password": "admin123"}}
+
+
+@pytest.mark.asyncio
+async def test_inventory_is_restored_from_snapshot(tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        results = [make_device_data(1, "R1")]
+        return httpx.Response(
+            200, json={"count": len(results), "next": None, "results": results}
+        )
+
+    snapshot_file = SnapshotFile(tmp_path / "snapshot.json")
+    netbox_sync = NetBoxSync(
+        make_netbox(handler), Inventory(), snapshot_file=snapshot_file
+    )
+    await netbox_sync.sync()
+    transport_selector.record_success("R1", "ssh", "version_sn", 0.5)
+    await netbox_sync.save_snapshot()
+    transport_selector.remove_device("R1")
+
+    inventory = Inventory()
+    restored_sync = NetBoxSync(
+        make_netbox(None), inventory, snapshot_file=snapshot_file
+    )
+    assert restored_sync.restore()
+    device = inventory.get_device("R1")
+    assert device.host == "10.0.0.1"
+    assert device.netbox_id == 1
+    assert device.password == "cisco"
+    assert b"password" not in (tmp_path / "snapshot.json").read_bytes()
+    stats = transport_selector.get_stats("R1", "ssh", "version_sn")
+    assert stats is not None and stats.latency == 0.5
+    transport_selector.remove_device("R1")
+
+
+def test_snapshot_is_encrypted_with_private_key(tmp_path):
+    device_data = {"id": 1, "name": "R1", "username": "admin", "password": "s3cr3t"}
+    snapshot = InventorySnapshot(
+        devices=[device_data], restconf_roots={}, transport_stats={}, created_at=0.0
+    )
+    SnapshotFile(tmp_path / "snapshot.json", private_key="key").save(snapshot)
+    assert b"s3cr3t" not in (tmp_path / "snapshot.json").read_bytes()
+    assert SnapshotFile(tmp_path / "snapshot.json", private_key="key").load() == (
+        snapshot
+    )
+    assert SnapshotFile(tmp_path / "snapshot.json", private_key="other").load() is None
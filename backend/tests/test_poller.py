@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from netwarden.collector import fetch_device_data
+from netwarden.poller import Poller
+from netwarden.state import StateStore
+
+
+class FakeDevice:
+    def __init__(self, name: str, fail: bool = False) -> None:
+        self.name = name
+        self.fail = fail
+        self.calls = 0
+
+    async def get_data(self, key, force_refresh=False):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("unreachable")
+        return {"key": key, "device": self.name}
+
+
+class FakeInventory:
+    def __init__(self, *devices: FakeDevice) -> None:
+        self.name_to_device = {device.name: device for device in devices}
+
+    @property
+    def devices(self):
+        return self.name_to_device.values()
+
+    def get_device(self, device_name):
+        return self.name_to_device[device_name]
+
+
+@pytest.mark.asyncio
+async def test_poller_keeps_state_store_warm():
+    inventory = FakeInventory(FakeDevice("R1"), FakeDevice("R2"))
+    store = StateStore()
+    poller = Poller(
+        inventory, store, intervals={"lldp": 0.02, "version_sn": 10}, jitter=0
+    )
+    poller.start()
+    await asyncio.sleep(0.1)
+    await poller.stop()
+
+    assert store.get("R1", "lldp").value == {"key": "lldp", "device": "R1"}
+    assert store.get("R2", "version_sn").value["device"] == "R2"
+    assert inventory.get_device("R1").calls > 2
+    assert store.version >= len(store) == 4
+
+
+@pytest.mark.asyncio
+async def test_failing_device_backs_off_and_removed_device_is_dropped():
+    failing = FakeDevice("R1", fail=True)
+    inventory = FakeInventory(failing, FakeDevice("R2"))
+    store = StateStore()
+    poller = Poller(inventory, store, intervals={"lldp": 1}, jitter=0)
+    poller.sync_targets()
+    for target in list(poller._targets.values()):
+        await poller.poll(target)
+
+    target = poller._targets[("R1", "lldp")]
+    assert target.failures == 1
+    assert poller._next_interval(target) == 2
+    assert poller.stats()["failing"][0]["name"] == "R1"
+
+    del inventory.name_to_device["R2"]
+    poller.sync_targets()
+    assert ("R2", "lldp") not in store
+    assert poller.stats()["targets"] == 1
+
+
+@pytest.mark.asyncio
+async def test_device_failing_after_successful_poll_is_not_served():
+    now = [1000.0]
+    device = FakeDevice("R1")
+    store = StateStore(clock=lambda: now[0])
+    removed = []
+    store.add_listener(lambda name, key, entry: entry or removed.append(name))
+    poller = Poller(FakeInventory(device), store, intervals={"lldp": 60}, jitter=0)
+    poller.sync_targets()
+    target = poller._targets[("R1", "lldp")]
+    await poller.poll(target)
+
+    result = await fetch_device_data(device, "lldp", store=store)
+    assert (result.status, result.updated_at) == ("ok", 1000.0)
+    assert device.calls == 1
+
+    device.fail = True
+    now[0] += 60 * 3 + 1
+    # stale data is not served, the device is asked and its error is reported
+    result = await fetch_device_data(device, "lldp", store=store)
+    assert result.status == "error"
+    assert device.calls == 2
+
+    await poller.poll(target)
+    assert ("R1", "lldp") not in store
+    assert removed == ["R1"]
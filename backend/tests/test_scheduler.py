@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from netwarden.scheduler import Scheduler
+
+
+@pytest.mark.asyncio
+async def test_global_site_and_transport_limits_are_respected():
+    scheduler = Scheduler(global_limit=3, site_limit=2, transport_limits={"ssh": 1})
+    running = []
+    max_running = {"total": 0, "site1": 0, "ssh": 0}
+
+    async def work(site, transport):
+        async with scheduler.slot(site=site, transport=transport):
+            running.append((site, transport))
+            max_running["total"] = max(max_running["total"], len(running))
+            max_running["site1"] = max(
+                max_running["site1"], sum(s == "site1" for s, _ in running)
+            )
+            max_running["ssh"] = max(
+                max_running["ssh"], sum(t == "ssh" for _, t in running)
+            )
+            await asyncio.sleep(0.01)
+            running.remove((site, transport))
+
+    jobs = [
+        work(site, transport)
+        for site in ("site1", "site2")
+        for transport in ("ssh", "restconf", "restconf")
+    ]
+    await asyncio.gather(*jobs)
+    assert max_running == {"total": 3, "site1": 2, "ssh": 1}
+    stats = scheduler.stats()
+    assert stats["active"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["granted"] == 6
+
+
+@pytest.mark.asyncio
+async def test_slots_are_granted_in_fifo_order():
+    scheduler = Scheduler(global_limit=1)
+    order = []
+
+    async def work(i):
+        async with scheduler.slot(site="site", transport="ssh"):
+            order.append(i)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(work(i) for i in range(5)))
+    assert order == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = Scheduler(global_limit=1)
+    await scheduler.acquire("site", "ssh")
+    waiter = asyncio.create_task(scheduler.acquire("site", "ssh"))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.queue_depth == 0
+    scheduler.release("site", "ssh")
+    assert scheduler.active == 0
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from netwarden.connections.base import Connection
+from netwarden.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_future():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    single_flight = SingleFlight()
+    results = await asyncio.gather(*(single_flight.do("lldp", fetch) for _ in range(5)))
+    assert results == [1] * 5
+    assert calls == 1
+    assert len(single_flight) == 0
+    assert await single_flight.do("lldp", fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_work():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    single_flight = SingleFlight()
+    first = asyncio.create_task(single_flight.do("lldp", fetch))
+    second = asyncio.create_task(single_flight.do("lldp", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+
+
+class CountingConnection(Connection):
+    NAME = "counting"
+
+    def __init__(self) -> None:
+        super().__init__(
+            name="counting", host="r1", username="u", password="p", platform="os"
+        )
+        self.calls = 0
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def update_availability(self) -> None:
+        self._enabled = True
+
+    async def handle(self) -> None:
+        pass
+
+    async def _parse(self, key, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {key: kwargs}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_parse_calls_are_coalesced():
+    conn = CountingConnection()
+    results = await asyncio.gather(
+        *(conn.parse("lldp", vrf="a") for _ in range(3)), conn.parse("lldp", vrf="b")
+    )
+    assert results == [{"lldp": {"vrf": "a"}}] * 3 + [{"lldp": {"vrf": "b"}}]
+    assert conn.calls == 2
@@ -0,0 +1,148 @@
+import pytest
+
+from netwarden.models.graph import Graph, LLDPNeighborInterface
+from netwarden.models.topology import Topology
+from netwarden.state import StateStore
+
+R1_LLDP = {
+    "Gi1": [LLDPNeighborInterface("Gi1", "R2.lab.local")],
+    "Gi2": [LLDPNeighborInterface("Gi1", "R3.lab.local")],
+}
+R2_LLDP = {"Gi1": [LLDPNeighborInterface("GigabitEthernet1", "R1.lab.local")]}
+
+
+def test_update_device_keeps_ids_stable():
+    topology = Topology()
+    diff = topology.update_device("R1", R1_LLDP)
+    assert [node["label"] for node in diff.nodes_added] == ["R1", "R2", "R3"]
+    assert len(diff.edges_added) == 2
+    assert topology.version == 1
+    dump = topology.dump()
+
+    # the same link reported by the other side and the same data again
+    assert not topology.update_device("R2", R2_LLDP)
+    assert not topology.update_device("R1", dict(R1_LLDP))
+    assert topology.version == 1
+    assert topology.dump() == dump
+
+
+def test_update_device_removes_links_and_orphan_nodes():
+    topology = Topology()
+    topology.update_device("R1", R1_LLDP)
+    topology.update_device("R2", R2_LLDP)
+    r3_link_id = next(
+        edge["id"] for edge in topology.dump()["edges"] if "R3" in edge["title"]
+    )
+
+    diff = topology.update_device("R1", {"Gi1": R1_LLDP["Gi1"]})
+    assert diff.edges_removed == [r3_link_id]
+    assert diff.nodes_removed == [3]
+    # R2 still reports the link to R1
+    diff = topology.remove_device("R1")
+    assert not diff.edges_removed
+    assert [node["label"] for node in topology.dump()["nodes"]] == ["R1", "R2"]
+
+    diff = topology.remove_device("R2")
+    assert len(diff.edges_removed) == 1
+    assert topology.dump() == {"version": topology.version, "nodes": [], "edges": []}
+
+
+@pytest.mark.asyncio
+async def test_state_store_changes_are_published():
+    topology = Topology()
+    store = StateStore()
+    store.add_listener(topology.on_state_change)
+    queue = topology.subscribe()
+
+    store.set("R1", "lldp", R1_LLDP)
+    store.set("R1", "lldp", R1_LLDP)
+    store.set("R1", "version_sn", {"version": "17.3"})
+    store.remove_device("R1")
+
+    added = queue.get_nowait().dump()
+    assert len(added["nodes"]["added"]) == 3
+    removed = queue.get_nowait().dump()
+    assert sorted(removed["nodes"]["removed"]) == [1, 2, 3]
+    assert queue.empty()
+    assert store.version == 3
+
+
+def test_adjacency_is_compact_snapshot_of_links():
+    topology = Topology()
+    topology.update_device("R1", R1_LLDP)
+    adjacency = topology.adjacency()
+    assert adjacency is topology.adjacency()
+    assert adjacency.edge_count == 2
+    r1 = adjacency.index[topology.name_to_node["R1"].id]
+    edge_ids = {edge["id"] for edge in topology.dump()["edges"]}
+    assert {edge_id for _, edge_id in adjacency.neighbors(r1)} == edge_ids
+    assert sorted(adjacency.node_ids[i] for i, _ in adjacency.neighbors(r1)) == [2, 3]
+
+    topology.update_device("R1", {"Gi1": R1_LLDP["Gi1"]})
+    adjacency = topology.adjacency()
+    assert adjacency.edge_count == 1
+    assert len(adjacency) == 2
+
+
+def test_graph_edge_ids_are_link_ids():
+    graph = Graph.from_lldp_data([("R1", R1_LLDP), ("R2", R2_LLDP)])
+    edges = list(graph.iter_edges())
+    assert sorted(edge_id for _, _, edge_id in edges) == [1, 2]
+    assert list(graph.iter_edges()) == edges
+    assert {edge_id for _, _, edge_id in edges} == set(graph.link_ids.values())
+
+
+def test_interface_names_are_normalized_once_per_node():
+    topology = Topology()
+    topology.update_device("R1", R1_LLDP)
+    topology.update_device("R2", R2_LLDP)
+    r2 = topology.name_to_node["R2"]
+    assert list(r2.name_to_interface) == ["GigabitEthernet1"]
+    assert len(topology.links) == 2
+
+
+def test_nodes_are_laid_out_by_site():
+    sites = {"R1": "hq", "R2": "hq", "R3": "branch"}
+    topology = Topology(get_site=sites.get, node_spacing=10)
+    diff = topology.update_device("R1", R1_LLDP)
+    positions = {node["label"]: (node["x"], node["y"]) for node in diff.nodes_added}
+    assert positions["R1"] == (0, 0)
+    assert positions["R2"] != positions["R1"]
+    # sites are further apart than nodes of the same site
+    assert abs(positions["R3"][0]) + abs(positions["R3"][1]) > 20
+    r2_r1 = abs(positions["R2"][0]) + abs(positions["R2"][1])
+    assert r2_r1 <= 20
+
+    # existing nodes keep their coordinates
+    diff = topology.update_device("R2", {"Gi2": [LLDPNeighborInterface("Gi1", "R4")]})
+    assert [node["label"] for node in diff.nodes_added] == ["R4"]
+    assert not diff.nodes_changed
+    dump = {node["label"]: (node["x"], node["y"]) for node in topology.dump()["nodes"]}
+    assert {name: dump[name] for name in positions} == positions
+
+
+def test_layout_is_spread_out_when_a_site_grows():
+    topology = Topology(node_spacing=10)
+    topology.update_device("R1", R1_LLDP)
+    before = {node["id"]: (node["x"], node["y"]) for node in topology.dump()["nodes"]}
+    lldp = {f"Gi{i}": [LLDPNeighborInterface("Gi1", f"S{i}")] for i in range(3, 10)}
+    diff = topology.update_device("R1", {**R1_LLDP, **lldp})
+    assert {node["id"] for node in diff.nodes_changed} == set(before)
+    positions = [(node["x"], node["y"]) for node in topology.dump()["nodes"]]
+    assert len(set(positions)) == len(positions)
+
+
+def test_nodes_move_when_their_site_becomes_known():
+    sites = {"R1": "hq", "R2": "hq"}
+    topology = Topology(get_site=sites.get, node_spacing=10)
+    topology.update_device("R1", R1_LLDP)
+    r3 = topology.name_to_node["R3"]
+    unknown_position = topology.layout.positions[r3.id]
+
+    # R3 was seen over LLDP before NetBox sync added it
+    sites["R3"] = "branch"
+    diff = topology.update_sites(["R1", "R3"])
+    assert [node["label"] for node in diff.nodes_changed] == ["R3"]
+    assert topology.layout.positions[r3.id] != unknown_position
+    assert topology.version == diff.version
+    assert not topology.update_sites(["R1", "R3"])
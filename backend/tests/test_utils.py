@@ -9,3 +9,10 @@ from netwarden import utils
 )
 def test_merge_dicts(input_dicts, output_dict):
     utils.merge_dicts(*input_dicts) == output_dict
+
+
+def test_import_string():
+    assert utils.import_string("netwarden.utils:merge_dicts") is utils.merge_dicts
+    assert utils.import_string("netwarden.utils.no_op") is utils.no_op
+    with pytest.raises(ImportError):
+        utils.import_string("netwarden.utils:missing")